@@ -0,0 +1,197 @@
+"""
+Compressão das respostas (gzip e, se instalado, brotli) negociada pelo
+cabeçalho Accept-Encoding de cada requisição.
+
+CompressionMiddleware comprime as respostas dinâmicas, inclusive as listas
+em streaming (bloco a bloco, sem esperar o fim). Os documentos que ficam em
+cache (loja, bootstrap do cardápio, respostas de cache_response) guardam as
+variantes comprimidas feitas uma única vez no preenchimento do cache
+(precompress) e são servidos como estão (precompressed_response): um acerto
+no cache não gasta CPU recomprimindo o mesmo corpo.
+
+HTML não é comprimido: as páginas (admin, API navegável) levam o token CSRF
+no corpo, e comprimi-lo junto com dados refletidos da requisição abre espaço
+para ataques como o BREACH.
+"""
+import gzip
+import zlib
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ordem de preferência quando o cliente aceita mais de uma com o mesmo peso
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Corpos menores que isso não compensam os cabeçalhos extras
+MIN_LENGTH = 200
+
+# Por resposta o nível é moderado; no preenchimento do cache a compressão
+# roda uma vez por versão do documento, então vale usar o máximo (ou quase)
+LEVELS = {'br': 5, 'gzip': 6}
+PRECOMPRESS_LEVELS = {'br': 10, 'gzip': 9}
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/msgpack', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/css', 'text/csv', 'text/javascript', 'text/plain', 'text/xml',
+)
+
+
+def accepted_encodings(request):
+    """
+    Retorna {codificação: peso} do cabeçalho Accept-Encoding.
+    """
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        accepted[coding] = weight
+    return accepted
+
+
+def negotiate(request):
+    """
+    Retorna a codificação a usar na resposta ('br', 'gzip') ou None.
+    """
+    accepted = accepted_encodings(request)
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = accepted.get(encoding, accepted.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body, encoding, level=None):
+    level = LEVELS[encoding] if level is None else level
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    # mtime fixo: o mesmo corpo sempre gera os mesmos bytes
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """
+    Comprime uma sequência de blocos, enviando cada um assim que chega.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=LEVELS['br'])
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(LEVELS['gzip'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def precompress(body):
+    """
+    Retorna {codificação: corpo comprimido} com todas as codificações
+    disponíveis, para guardar junto do documento em cache.
+    """
+    if len(body) < MIN_LENGTH:
+        return {}
+    variants = {}
+    for encoding in ENCODINGS:
+        compressed = compress(body, encoding, PRECOMPRESS_LEVELS[encoding])
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+
+def renders_compact_json(request):
+    """
+    Verifica se a resposta do DRF será o JSON compacto padrão (o corpo que
+    as variantes em cache guardam), e não outro formato ou JSON indentado.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return isinstance(renderer, JSONRenderer) and getattr(request, 'accepted_media_type', None) == renderer.media_type
+
+
+def precompressed_response(request, variants, content_type='application/json', status=200, headers=None):
+    """
+    Responde com a variante já comprimida aceita pelo cliente, ou retorna
+    None quando ele não aceita nenhuma (a view responde normalmente).
+    """
+    encoding = negotiate(request)
+    if encoding not in variants:
+        return None
+    response = HttpResponse(variants[encoding], content_type=content_type, status=status, headers=headers)
+    response['Content-Encoding'] = encoding
+    response.precompressed = True
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+def _weaken_etag(response):
+    # A variante comprimida não é idêntica byte a byte à original
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime as respostas com a codificação negociada (ver negotiate).
+    Respostas que já vêm comprimidas (precompressed_response) passam direto.
+    """
+
+    def process_response(self, request, response):
+        if getattr(response, 'precompressed', False):
+            _weaken_etag(response)
+            return response
+        if response.has_header('Content-Encoding') or not _compressible(response):
+            return response
+        # Um trecho (Range) não pode ser comprimido isoladamente
+        if response.status_code == 206 or response.has_header('Content-Range'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < MIN_LENGTH:
+                return response
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        _weaken_etag(response)
+        response['Content-Encoding'] = encoding
+        return response
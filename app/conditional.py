@@ -0,0 +1,105 @@
+"""
+Requisições condicionais (ETag / Last-Modified) a partir dos carimbos de versão.
+
+As views com ConditionalMixin respondem If-None-Match e If-Modified-Since
+com 304 depois da autenticação e das permissões, mas antes de consultar o
+banco ou serializar qualquer coisa: conferir a versão custa um os.stat por
+carimbo (ver app.versioning).
+"""
+import hashlib
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from app import versioning
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = 'Não modificado.'
+    default_code = 'not_modified'
+
+
+def etag_matches(request, etag):
+    """
+    Verifica se o cliente já tem a versão `etag` (cabeçalho If-None-Match).
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag.strip('"') in (tag.removeprefix('W/').strip('"') for tag in etags)
+
+
+def not_modified_since(request, last_modified):
+    """
+    Verifica o cabeçalho If-Modified-Since (só usado sem If-None-Match).
+    """
+    if last_modified is None or request.META.get('HTTP_IF_NONE_MATCH'):
+        return False
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+class ConditionalMixin:
+    """
+    Mixin para views do DRF que adiciona ETag e Last-Modified às respostas de
+    leitura e responde 304 quando o cliente já tem a versão atual.
+
+    `conditional_stamps` lista os carimbos dos quais a resposta depende
+    (padrão: o carimbo do model do queryset). A ETag combina a versão dos
+    carimbos com a URL, o host e o formato pedido, então filtros e formatos
+    diferentes têm validadores diferentes.
+    """
+    conditional_stamps = None
+
+    def get_conditional_stamps(self):
+        if self.conditional_stamps is not None:
+            return tuple(self.conditional_stamps)
+        return (versioning.model_stamp(self.queryset.model),)
+
+    def get_validators(self, request):
+        """
+        Retorna (etag, last_modified) da resposta atual.
+        """
+        cached = getattr(request, '_conditional_validators', None)
+        if cached is None:
+            stamps = self.get_conditional_stamps()
+            key = '|'.join((
+                versioning.version(*stamps),
+                request.get_host(),
+                request.get_full_path(),
+                request.META.get('HTTP_ACCEPT', ''),
+            ))
+            etag = '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+            cached = request._conditional_validators = (etag, versioning.last_modified(*stamps))
+        return cached
+
+    def _validator_headers(self, request):
+        etag, last_modified = self.get_validators(request)
+        headers = {'ETag': etag}
+        if last_modified is not None:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+        return headers
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            etag, last_modified = self.get_validators(request)
+            if etag_matches(request, etag) or not_modified_since(request, last_modified):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=self._validator_headers(self.request))
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in SAFE_METHODS and response.status_code == status.HTTP_200_OK:
+            for header, value in self._validator_headers(request).items():
+                response.setdefault(header, value)
+        return response
@@ -0,0 +1,279 @@
+"""
+Variantes das imagens enviadas (produtos, promoções, foto da loja).
+
+As imagens originais costumam ser fotos de celular com vários megabytes.
+Para cada campo registrado com track(), toda vez que a imagem muda são
+geradas, ao lado do original:
+
+    <nome>.<largura>w.jpg   (ou .png, se a imagem tiver transparência)
+    <nome>.<largura>w.webp  (se o Pillow tiver suporte a WebP)
+
+nas larguras de VARIANT_WIDTHS menores que a original, além de um
+placeholder minúsculo (PLACEHOLDER_SIZE px) em data URI, para a loja mostrar
+enquanto a foto carrega. O mapa das variantes fica no campo JSON
+`<campo>_variants` do model, e srcset() o converte nas URLs que os
+serializers retornam.
+
+O processamento roda depois do commit em um pool de processos (IMAGE_WORKERS,
+0 processa na hora), fora do request e sem disputar o GIL com os workers web.
+Quando a instância é removida, as variantes dela são liberadas depois do commit.
+O processo do pool grava o mapa com save(update_fields=...), então os
+carimbos de versão e o cache de respostas são atualizados pelos sinais de
+sempre. Use o comando build_image_variants para processar imagens antigas.
+"""
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings as django_settings
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete, post_save
+from PIL import Image, ImageOps, features
+
+from app.storage import is_content_addressed
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+PLACEHOLDER_SIZE = 16
+ORIENTATION_TAG = 0x0112
+
+JPEG_OPTIONS = {'quality': 80, 'optimize': True, 'progressive': True}
+WEBP_OPTIONS = {'quality': 75, 'method': 4}
+PNG_OPTIONS = {'optimize': True}
+
+# (model, campo) registrados com track()
+TRACKED = []
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variants_field(field_name):
+    """
+    Nome do campo JSON com o mapa das variantes de `field_name`.
+    """
+    return f'{field_name}_variants'
+
+
+def _encode(image, format, options):
+    buffer = io.BytesIO()
+    image.save(buffer, format, **options)
+    return buffer.getvalue()
+
+
+def _open(storage, name, max_width):
+    """
+    Abre a imagem já na orientação do EXIF. Retorna (imagem, tamanho original).
+    """
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        width, height = image.size
+        if image.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        # JPEG: decodifica já reduzido (escala DCT), bem mais rápido em fotos
+        # grandes; o resultado ainda tem pelo menos max_width de cada lado
+        image.draft('RGB', (max_width, max_width))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image, (width, height)
+
+
+def build_variants(storage, name):
+    """
+    Gera as variantes da imagem `name` no `storage` e retorna o mapa:
+
+        {'source': name, 'width': ..., 'height': ...,
+         'placeholder': 'data:image/webp;base64,...',
+         'jpeg': [[largura, nome], ...], 'webp': [[largura, nome], ...]}
+
+    A chave de formato do original é 'png' quando a imagem tem transparência.
+    """
+    image, (width, height) = _open(storage, name, VARIANT_WIDTHS[-1])
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    formats = [('png', 'PNG', PNG_OPTIONS) if has_alpha else ('jpeg', 'JPEG', JPEG_OPTIONS)]
+    if features.check('webp'):
+        formats.append(('webp', 'WEBP', WEBP_OPTIONS))
+
+    root = os.path.splitext(name)[0]
+    widths = sorted({w for w in VARIANT_WIDTHS if w < width} | {min(width, VARIANT_WIDTHS[-1])}, reverse=True)
+    variants = {'source': name, 'width': width, 'height': height}
+    for key, _, _ in formats:
+        variants[key] = []
+
+    # Da maior para a menor, reduzindo sempre a partir da anterior
+    resized = image
+    for target in widths:
+        resized = resized.resize((target, max(1, round(height * target / width))), Image.LANCZOS, reducing_gap=3.0)
+        for key, format, options in formats:
+            extension = 'jpg' if key == 'jpeg' else key
+            variant = f'{root}.{target}w.{extension}'
+            # As variantes anteriores são liberadas por process(), depois de gravar o mapa novo
+            saved = storage.save(variant, ContentFile(_encode(resized, format, options)))
+            variants[key].append([target, saved])
+    for key, _, _ in formats:
+        variants[key].reverse()
+
+    placeholder = resized.copy()
+    placeholder.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    key, format, options = formats[-1]
+    encoded = base64.b64encode(_encode(placeholder, format, options)).decode('ascii')
+    variants['placeholder'] = f'data:image/{key};base64,{encoded}'
+    return variants
+
+
+def _variant_names(variants):
+    return {name for key, value in variants.items() if isinstance(value, list) for _, name in value}
+
+
+def _release(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def process(label, pk, field_name, force=False):
+    """
+    Gera as variantes da imagem atual de uma instância e grava o mapa,
+    removendo as variantes da imagem anterior. Roda no pool de processos.
+    Com `force`, gera de novo mesmo se o mapa já for da imagem atual.
+    """
+    model = apps.get_model(label)
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return
+    file = getattr(instance, field_name)
+    old = getattr(instance, variants_field(field_name)) or {}
+    if not force and old.get('source') == (file.name or None):
+        return
+    try:
+        variants = build_variants(file.storage, file.name) if file else {}
+    except (OSError, Image.DecompressionBombError):
+        # Arquivo que não é imagem (ou corrompido): registra para não tentar de novo
+        logger.warning('Não foi possível gerar as variantes de %s', file.name, exc_info=True)
+        variants = {'source': file.name}
+    setattr(instance, variants_field(field_name), variants)
+    try:
+        with transaction.atomic():
+            instance.save(update_fields=[variants_field(field_name)])
+    except DatabaseError:
+        # O mapa não foi gravado (em geral, a instância foi removida durante
+        # o processamento): ninguém usa as variantes novas
+        _release(file.storage, _variant_names(variants))
+        if model._default_manager.filter(pk=pk).exists():
+            raise
+        return
+    # No storage endereçado por conteúdo, uma variante igual à anterior tem o
+    # mesmo nome e cada save() somou uma referência: todas as antigas são
+    # liberadas. Nomes comuns só são removidos se o mapa novo não os usa.
+    current = _variant_names(variants)
+    for name in _variant_names(old):
+        if is_content_addressed(name) or name not in current:
+            file.storage.delete(name)
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def create_pool(max_workers=None):
+    """
+    Cria um pool de processos para gerar variantes. Usa spawn: cada processo
+    inicia o Django do zero, sem herdar as conexões do banco do processo pai.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+    )
+
+
+def get_executor():
+    """
+    Pool compartilhado pelos uploads, criado na primeira imagem.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = create_pool(getattr(django_settings, 'IMAGE_WORKERS', 2))
+    return _executor
+
+
+def _log_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error('Erro ao gerar as variantes de imagem', exc_info=exc)
+
+
+def schedule(label, pk, field_name):
+    """
+    Agenda a geração das variantes de uma instância.
+    """
+    if getattr(django_settings, 'IMAGE_WORKERS', 2) == 0:
+        try:
+            process(label, pk, field_name)
+        except Exception:
+            logger.exception('Erro ao gerar as variantes de %s %s', label, pk)
+        return
+    get_executor().submit(process, label, pk, field_name).add_done_callback(_log_failure)
+
+
+def track(model, field_name):
+    """
+    Agenda a geração das variantes sempre que a imagem `field_name` de uma
+    instância mudar (inclusive quando é removida), depois do commit, e libera
+    as variantes quando a instância é removida.
+    """
+    label = model._meta.label
+    TRACKED.append((model, field_name))
+
+    def handler(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        name = getattr(instance, field_name).name or None
+        if (getattr(instance, variants_field(field_name)) or {}).get('source') != name:
+            pk = instance.pk
+            transaction.on_commit(lambda: schedule(label, pk, field_name))
+
+    def delete_handler(sender, instance, **kwargs):
+        names = _variant_names(getattr(instance, variants_field(field_name)) or {})
+        if names:
+            storage = getattr(instance, field_name).storage
+            transaction.on_commit(lambda: _release(storage, names))
+
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'images:{label}:{field_name}')
+    post_delete.connect(delete_handler, sender=model, weak=False, dispatch_uid=f'images:{label}:{field_name}:delete')
+
+
+def srcset(variants, storage, request=None):
+    """
+    Converte o mapa das variantes no formato retornado pelos serializers:
+
+        {'width': ..., 'height': ..., 'placeholder': 'data:...',
+         'srcset': {'webp': 'url 160w, url 320w, ...', 'jpeg': '...'}}
+
+    As URLs são absolutas quando há `request`, como as das imagens originais.
+    Retorna None enquanto não houver variantes (imagem ainda sendo
+    processada, inválida, ou sem imagem).
+    """
+    if not variants or 'placeholder' not in variants:
+        return None
+
+    def url(name):
+        return request.build_absolute_uri(storage.url(name)) if request else storage.url(name)
+
+    return {
+        'width': variants['width'],
+        'height': variants['height'],
+        'placeholder': variants['placeholder'],
+        'srcset': {
+            key: ', '.join(f'{url(name)} {width}w' for width, name in value)
+            for key, value in variants.items() if isinstance(value, list)
+        },
+    }
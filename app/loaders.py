@@ -0,0 +1,144 @@
+"""
+Carregamento em lote para SerializerMethodFields (estilo DataLoader).
+
+Um método que precisa de dados de outra tabela pede-os a um BatchLoader
+em vez de consultar o banco direto:
+
+    def get_total_price(self, obj):
+        return get_loader(self, ingredient_prices).load(obj.pk)
+
+A função de lote (ex: ingredient_prices) recebe todas as chaves pendentes e
+devolve {chave: valor} com uma única consulta. Antes de renderizar uma
+lista, o BatchListSerializer chama prime(instances) no serializer filho, que
+registra as chaves de todas as linhas (e das listas aninhadas já
+pré-carregadas com prefetch_related); a primeira leitura resolve todas de
+uma vez. Os resultados ficam guardados no request (ou no serializer raiz,
+quando não há request) até o fim dele.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+
+
+class BatchLoader:
+    """
+    Resolve chaves em lote com `batch_fn(keys) -> {chave: valor}` e guarda os
+    resultados. Chaves ausentes do resultado valem `default`.
+    """
+
+    def __init__(self, batch_fn, default=None):
+        self.batch_fn = batch_fn
+        self.default = default
+        self._cache = {}
+        self._pending = {}
+
+    def prime(self, keys):
+        """
+        Registra chaves para a próxima consulta em lote.
+        """
+        for key in keys:
+            if key not in self._cache:
+                self._pending[key] = None
+
+    def dispatch(self):
+        """
+        Resolve todas as chaves pendentes em uma chamada da função de lote.
+        """
+        if not self._pending:
+            return
+        keys = list(self._pending)
+        self._pending.clear()
+        results = self.batch_fn(keys)
+        for key in keys:
+            self._cache[key] = results.get(key, self.default)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._pending[key] = None
+            self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        self.dispatch()
+        return [self._cache[key] for key in keys]
+
+
+def get_loader(serializer, batch_fn, default=None):
+    """
+    Retorna o BatchLoader de `batch_fn` no escopo do request do serializer.
+    """
+    scope = serializer.context.get('request')
+    if scope is None:
+        scope = serializer.root
+    loaders = scope.__dict__.setdefault('_batch_loaders', {})
+    loader = loaders.get(batch_fn)
+    if loader is None:
+        loader = loaders[batch_fn] = BatchLoader(batch_fn, default)
+    return loader
+
+
+def _related_instances(instances, field, many):
+    """
+    Objetos relacionados já carregados em memória (prefetch_related ou
+    select_related), ou None se algum deles ainda exigiria consulta.
+    """
+    if field.source == '*' or '.' in field.source:
+        return None
+    related = []
+    for instance in instances:
+        if many:
+            cache = getattr(instance, '_prefetched_objects_cache', {})
+            if field.source not in cache:
+                return None
+            related.extend(cache[field.source])
+        else:
+            try:
+                model_field = instance._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.is_relation or not model_field.is_cached(instance):
+                return None
+            value = getattr(instance, field.source)
+            if value is not None:
+                related.append(value)
+    return related
+
+
+class BatchLoadingMixin:
+    """
+    Mixin para serializers com campos que usam loaders. Subclasses
+    sobrescrevem register(instances) para registrar as chaves que os
+    get_<campo> vão pedir.
+    """
+
+    def register(self, instances):
+        pass
+
+    def prime(self, instances):
+        self.register(instances)
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            many = isinstance(field, serializers.ListSerializer)
+            child = field.child if many else field
+            if not isinstance(child, BatchLoadingMixin):
+                continue
+            related = _related_instances(instances, field, many)
+            if related:
+                child.prime(related)
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer que registra as chaves de todas as linhas antes de renderizar.
+    Use em Meta.list_serializer_class dos serializers com BatchLoadingMixin.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        instances = list(iterable)
+        if isinstance(self.child, BatchLoadingMixin):
+            self.child.prime(instances)
+        return [self.child.to_representation(item) for item in instances]
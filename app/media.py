@@ -0,0 +1,208 @@
+"""
+Entrega dos arquivos de mídia (MEDIA_URL).
+
+A view confere o acesso (caminho dentro de MEDIA_ROOT, arquivo regular,
+sem os arquivos internos do storage) e repassa a transmissão ao servidor
+da frente, conforme MEDIA_SENDFILE:
+
+    'x-accel-redirect'  nginx: cabeçalho X-Accel-Redirect com o caminho sob
+                        MEDIA_ACCEL_PREFIX (uma location internal que
+                        aponta para MEDIA_ROOT)
+    'x-sendfile'        Apache (mod_xsendfile) / lighttpd: cabeçalho
+                        X-Sendfile com o caminho absoluto
+    None                o próprio Django responde com FileResponse; o
+                        servidor WSGI usa os.sendfile quando oferece
+                        wsgi.file_wrapper (ex: gunicorn sem TLS)
+
+Nos dois primeiros casos o servidor da frente cuida de Range e das
+requisições condicionais e o worker Python é liberado na hora. Sem ele, a
+view responde If-None-Match / If-Modified-Since com 304 e Range (um
+intervalo) com 206, enviando só o trecho pedido.
+
+Arquivos com nome de conteúdo (ver app.storage) nunca mudam, então saem com
+cache de um ano marcado como immutable e com o hash como ETag. Arquivos
+com nomes antigos podem ter o conteúdo trocado sob o mesmo nome e são
+sempre revalidados.
+"""
+import mimetypes
+import os
+import posixpath
+import stat
+from urllib.parse import quote
+
+from django.conf import settings as django_settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import REFS_SUFFIX, is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+class RangeFile:
+    """
+    Trecho [start, start + length) de um arquivo, com fileno() para o
+    servidor WSGI poder usar sendfile a partir da posição atual.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.start = start
+        self.length = length
+        self.name = file.name
+        file.seek(start)
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell() - self.start
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_END:
+            offset += self.length
+        elif whence == os.SEEK_CUR:
+            offset += self.tell()
+        self.file.seek(self.start + min(max(offset, 0), self.length))
+        return self.tell()
+
+    def read(self, size=-1):
+        remaining = self.length - self.tell()
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.file.read(size) if size > 0 else b''
+
+    def close(self):
+        self.file.close()
+
+
+def _resolve(path):
+    """
+    Retorna (caminho absoluto, os.stat) do arquivo de mídia, ou 404.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    parts = path.split('/')
+    # Arquivos internos do storage (contadores, temporários) e ocultos não são mídia
+    if path.endswith(REFS_SUFFIX) or any(part.startswith('.') for part in parts):
+        raise Http404
+    try:
+        full_path = safe_join(django_settings.MEDIA_ROOT, *parts)
+        status = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404
+    if not stat.S_ISREG(status.st_mode):
+        raise Http404
+    return full_path, status
+
+
+def _byte_range(header, size):
+    """
+    Interpreta um Range com um único intervalo. Retorna (início, tamanho),
+    None para ignorar o cabeçalho (enviar tudo) ou False se for impossível
+    atender (416).
+    """
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        # Outras unidades e vários intervalos: o arquivo inteiro é uma resposta válida
+        return None
+    first, _, last = ranges.strip().partition('-')
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return False
+            start = max(size - length, 0)
+            end = size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start < 0 or start >= size or end < start:
+        return False
+    return start, end - start + 1
+
+
+def _if_range_matches(request, etag, last_modified):
+    header = request.META.get('HTTP_IF_RANGE')
+    if not header:
+        return True
+    if header.startswith(('"', 'W/')):
+        return etag is not None and not header.startswith('W/') and parse_etags(header) == [etag]
+    return parse_http_date_safe(header) == last_modified
+
+
+def _validators(path, status):
+    last_modified = int(status.st_mtime)
+    if is_content_addressed(path):
+        etag = '"%s"' % posixpath.basename(path).split('.')[0]
+    else:
+        etag = '"%x-%x"' % (status.st_mtime_ns, status.st_size)
+    return etag, last_modified
+
+
+def _send_file(request, full_path, relative, status, content_type, encoding, headers):
+    """
+    Responde pelo próprio Django: 304/412, 206 (Range), 416 ou o arquivo inteiro.
+    """
+    etag, last_modified = _validators(relative, status)
+    size = status.st_size
+    headers['ETag'] = etag
+    headers['Last-Modified'] = http_date(last_modified)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for name, value in headers.items():
+            response.headers.setdefault(name, value)
+        return response
+
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and _if_range_matches(request, etag, last_modified):
+        byte_range = _byte_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type, headers=headers)
+    else:
+        start, length = byte_range
+        response = FileResponse(RangeFile(file, start, length), content_type=content_type, status=206, headers=headers)
+        response['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+    response['Content-Length'] = str(size if byte_range is None else byte_range[1])
+    response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve um arquivo de MEDIA_ROOT (ver a documentação do módulo).
+    """
+    full_path, status = _resolve(path)
+    relative = os.path.relpath(full_path, django_settings.MEDIA_ROOT).replace(os.sep, '/')
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    headers = {
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if is_content_addressed(relative) else REVALIDATE_CACHE_CONTROL,
+    }
+
+    backend = getattr(django_settings, 'MEDIA_SENDFILE', None)
+    if backend == 'x-accel-redirect':
+        prefix = getattr(django_settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative)
+        return HttpResponse(content_type=content_type, headers=headers)
+    if backend == 'x-sendfile':
+        headers['X-Sendfile'] = full_path
+        return HttpResponse(content_type=content_type, headers=headers)
+
+    return _send_file(request, full_path, relative, status, content_type, encoding, headers)
@@ -0,0 +1,324 @@
+"""
+Serialização rápida de listas a partir de QuerySet.values().
+
+Uma Projection é montada uma única vez a partir dos campos de um serializer
+existente e gera exatamente o mesmo resultado que ele, mas lendo dicionários
+de values() em vez de instâncias de model e sem instanciar serializers e
+campos do DRF a cada linha:
+
+    campos do model         coluna do values() + to_representation do campo
+    'categoria.nome'        coluna 'categoria__nome' (FKs obrigatórias)
+    get_<campo>_display     coluna do campo + rótulo das choices
+    FK com serializer       uma consulta para todos os ids da página
+    lista (FK reversa)      uma consulta para todos os pais da página
+    SerializerMethodField   método get_<campo>(row) na própria Projection
+
+Os métodos recebem a linha crua (colunas do values(), mais as colunas extras
+declaradas em `columns` e as linhas dos relacionamentos aninhados). Consultas
+em lote para esses métodos ficam em prepare(rows), chamado uma vez por nível.
+
+Campos que a Projection não sabe ler geram ImproperlyConfigured na primeira
+utilização, em vez de uma resposta diferente da do serializer.
+"""
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .serializers import SparseFields
+
+FIELD = 'field'
+MANY = 'many'
+METHOD = 'method'
+RENDERED = '__rendered'
+
+# Campos do DRF cujo to_representation equivale a uma conversão simples
+FAST_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+    serializers.BooleanField: bool,
+}
+
+
+class Projection:
+    """
+    Projeção de um ModelSerializer sobre values(). Subclasses definem:
+
+        serializer_class    serializer de referência
+        nested              {campo: Projection} para serializers aninhados
+                            que precisam de métodos próprios
+        columns             colunas extras lidas para os get_<campo>
+    """
+    serializer_class = None
+    nested = {}
+    columns = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.model = self.serializer_class.Meta.model
+        self.pk_column = self.model._meta.pk.attname
+        self._plan = []
+        self._relations = []
+        for name, kind, column, spec in self.compiled():
+            if kind == METHOD:
+                self._plan.append((name, METHOD, None, getattr(self, spec)))
+            elif callable(spec):
+                self._plan.append((name, FIELD, column, spec))
+            elif spec[0] == 'file':
+                self._plan.append((name, FIELD, column, self._file_converter(column)))
+            elif spec[0] == 'datetime':
+                self._plan.append((name, FIELD, column, self._datetime_converter(spec[1])))
+            else:
+                relation, projection_class = spec[1]
+                child = projection_class(self.context)
+                self._relations.append((name, kind, column, relation, child))
+                if kind == MANY:
+                    self._plan.append((name, MANY, name, child.render))
+                else:
+                    self._plan.append((name, FIELD, name, child.render_shared))
+        self._columns = self._value_columns()
+
+    @classmethod
+    def compiled(cls):
+        """
+        Retorna o plano da projeção (nome, tipo, coluna, detalhe), montado na
+        primeira chamada a partir dos campos do serializer.
+        """
+        plan = cls.__dict__.get('_compiled')
+        if plan is None:
+            plan = cls._compile()
+            cls._compiled = plan
+        return plan
+
+    @classmethod
+    def _compile(cls):
+        model = cls.serializer_class.Meta.model
+        # Sem request no contexto, os serializers devolvem todos os campos
+        fields = cls.serializer_class().fields
+        plan = []
+        for name, field in fields.items():
+            if field.write_only:
+                continue
+            if name in cls.nested:
+                plan.append(cls._compile_relation(model, name, field, cls.nested[name]))
+            elif hasattr(cls, f'get_{name}'):
+                plan.append((name, METHOD, None, f'get_{name}'))
+            elif isinstance(field, serializers.ListSerializer):
+                plan.append(cls._compile_relation(model, name, field, projection_for(type(field.child))))
+            elif isinstance(field, serializers.BaseSerializer):
+                plan.append(cls._compile_relation(model, name, field, projection_for(type(field))))
+            else:
+                plan.append(cls._compile_field(model, name, field))
+        return plan
+
+    @classmethod
+    def _unsupported(cls, name):
+        return ImproperlyConfigured(
+            f"{cls.__name__}: o campo '{name}' de {cls.serializer_class.__name__} não pode ser lido "
+            f"de values(); defina get_{name}(row) na projeção"
+        )
+
+    @classmethod
+    def _compile_relation(cls, model, name, field, projection_class):
+        source = name if field.source == '*' else field.source
+        try:
+            relation = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            raise cls._unsupported(name)
+        if relation.one_to_many:
+            return (name, MANY, relation.field.attname, ('relation', (relation, projection_class)))
+        if (relation.many_to_one or relation.one_to_one) and relation.concrete:
+            return (name, FIELD, relation.attname, ('relation', (relation, projection_class)))
+        raise cls._unsupported(name)
+
+    @classmethod
+    def _compile_field(cls, model, name, field):
+        attrs = field.source_attrs
+        if isinstance(field, serializers.RelatedField):
+            if not isinstance(field, serializers.PrimaryKeyRelatedField) or len(attrs) != 1:
+                raise cls._unsupported(name)
+            model_field = model._meta.get_field(attrs[0])
+            convert = field.pk_field.to_representation if field.pk_field else _identity
+            return (name, FIELD, model_field.attname, convert)
+
+        if isinstance(field, serializers.FileField):
+            if len(attrs) != 1:
+                raise cls._unsupported(name)
+            return (name, FIELD, model._meta.get_field(attrs[0]).attname, ('file', None))
+
+        convert = FAST_CONVERTERS.get(type(field), field.to_representation)
+        if len(attrs) == 1 and attrs[0].startswith('get_') and attrs[0].endswith('_display'):
+            model_field = model._meta.get_field(attrs[0][4:-8])
+            if not model_field.choices:
+                raise cls._unsupported(name)
+            labels = dict(model_field.flatchoices)
+            return (name, FIELD, model_field.attname, lambda value: convert(str(labels.get(value, value))))
+
+        # Caminho por FKs obrigatórias ('category.name' -> 'category__name')
+        current = model
+        for attr in attrs[:-1]:
+            try:
+                relation = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise cls._unsupported(name)
+            if not (relation.many_to_one or relation.one_to_one) or not relation.concrete or relation.null:
+                raise cls._unsupported(name)
+            current = relation.related_model
+        try:
+            model_field = current._meta.get_field(attrs[-1])
+        except FieldDoesNotExist:
+            raise cls._unsupported(name)
+        # Uma FK só é aceita pelo nome da coluna (ex: 'category_id')
+        if not model_field.concrete or (model_field.is_relation and attrs[-1] != model_field.attname):
+            raise cls._unsupported(name)
+        column = '__'.join(attrs[:-1] + [model_field.attname])
+        if type(field) is serializers.DateTimeField:
+            return (name, FIELD, column, ('datetime', field))
+        return (name, FIELD, column, convert)
+
+    def _datetime_converter(self, field):
+        # Mesmo resultado de DateTimeField.to_representation, com o fuso lido uma vez
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if not isinstance(output_format, str) or output_format.lower() != ISO_8601 or tz is None:
+            return field.to_representation
+
+        def convert(value):
+            if isinstance(value, str) or timezone.is_naive(value):
+                return field.to_representation(value)
+            value = value.astimezone(tz).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+
+    def _file_converter(self, column):
+        storage = self.model._meta.get_field(column).storage
+        request = self.context.get('request')
+
+        def convert(value):
+            # Mesmo resultado de serializers.FileField.to_representation
+            if not value:
+                return None
+            if not api_settings.UPLOADED_FILES_USE_URL:
+                return value
+            url = storage.url(value)
+            return request.build_absolute_uri(url) if request is not None else url
+        return convert
+
+    def _value_columns(self):
+        nested = {name for name, *_ in self._relations}
+        columns = [self.pk_column]
+        for name, kind, column, _ in self._plan:
+            if kind == FIELD and name not in nested and column not in columns:
+                columns.append(column)
+        for _, kind, column, _, _ in self._relations:
+            if kind == FIELD and column not in columns:
+                columns.append(column)
+        for column in self.columns:
+            if column not in columns:
+                columns.append(column)
+        return columns
+
+    def values(self, queryset, extra=()):
+        """
+        Retorna o values() com as colunas que a projeção lê.
+        """
+        columns = self._columns + [column for column in extra if column not in self._columns]
+        return queryset.prefetch_related(None).values(*columns)
+
+    def load(self, queryset, extra=()):
+        """
+        Lê as linhas e carrega os relacionamentos aninhados, em lote.
+        """
+        rows = list(self.values(queryset, extra) if isinstance(queryset, QuerySet) else queryset)
+        if rows:
+            for name, kind, column, relation, child in self._relations:
+                if kind == MANY:
+                    parents = {row[self.pk_column]: row for row in rows}
+                    for row in rows:
+                        row[name] = []
+                    queryset = relation.related_model._default_manager.filter(**{f'{column}__in': list(parents)})
+                    if not relation.related_model._meta.ordering:
+                        queryset = queryset.order_by('pk')
+                    for child_row in child.load(queryset, extra=(column,)):
+                        parents[child_row[column]][name].append(child_row)
+                else:
+                    ids = {row[column] for row in rows if row[column] is not None}
+                    found = {}
+                    if ids:
+                        queryset = relation.related_model._default_manager.filter(pk__in=ids)
+                        found = {child_row[child.pk_column]: child_row for child_row in child.load(queryset)}
+                    for row in rows:
+                        row[name] = found.get(row[column])
+            self.prepare(rows)
+        return rows
+
+    def prepare(self, rows):
+        """
+        Ponto de extensão para consultas em lote usadas pelos get_<campo>.
+        """
+
+    def render_shared(self, row):
+        # Linhas de FK são compartilhadas entre os pais: cada uma é convertida uma vez
+        data = row.get(RENDERED)
+        if data is None:
+            data = row[RENDERED] = self.render(row)
+        return data
+
+    def render(self, row):
+        data = {}
+        for name, kind, column, convert in self._plan:
+            if kind == FIELD:
+                value = row[column]
+                data[name] = None if value is None else convert(value)
+            elif kind == MANY:
+                data[name] = [convert(child) for child in row[column]]
+            else:
+                data[name] = convert(row)
+        return data
+
+    def serialize(self, queryset):
+        """
+        Equivale a serializer_class(queryset, many=True).data. Aceita um
+        QuerySet do model ou linhas já lidas com values() (ex: uma página).
+        """
+        return [self.render(row) for row in self.load(queryset)]
+
+
+def _identity(value):
+    return value
+
+
+_auto_projections = {}
+
+
+def projection_for(serializer_class):
+    """
+    Retorna uma Projection sem métodos próprios para o serializer.
+    """
+    projection_class = _auto_projections.get(serializer_class)
+    if projection_class is None:
+        projection_class = type(f'{serializer_class.__name__}Projection', (Projection,), {
+            'serializer_class': serializer_class,
+        })
+        _auto_projections[serializer_class] = projection_class
+    return projection_class
+
+
+class ProjectionListMixin:
+    """
+    Mixin para ViewSets que serve o list() pela `projection_class`. Com
+    ?fields=/?expand= a listagem volta para o serializer normal.
+    """
+    projection_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.projection_class is None or SparseFields.from_request(request):
+            return super().list(request, *args, **kwargs)
+        projection = self.projection_class(context=self.get_serializer_context())
+        queryset = projection.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.serialize(page))
+        return Response(projection.serialize(queryset))
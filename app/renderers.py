@@ -0,0 +1,118 @@
+"""
+Renderers e parsers opcionais mais rápidos para a API.
+
+    FastJSONRenderer / FastJSONParser
+        application/json com orjson; a saída é igual à do JSONRenderer
+        (mesmas regras do encoder do DRF para Decimal, datas, UUID etc.),
+        exceto pela escrita de floats com expoente (1e16 em vez de 1e+16,
+        mesmo número) e NaN/Infinity, que viram null em vez de erro
+    MessagePackRenderer / MessagePackParser
+        application/msgpack (?format=msgpack), com datas com fuso como
+        Timestamp do MessagePack
+
+As bibliotecas (orjson, msgpack) são opcionais: app/settings.py só registra
+estas classes quando elas estão instaladas. Sem elas, a API continua com o
+JSONRenderer/JSONParser do DRF.
+"""
+import json
+
+from django.conf import settings as django_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Tipos que as bibliotecas não conhecem (Decimal, textos traduzíveis, QuerySet...)
+# seguem as mesmas regras do JSON do DRF
+encode_default = JSONEncoder().default
+
+LINE_SEPARATORS = (b'\xe2\x80\xa8', b'\xe2\x80\xa9')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer com orjson. Com indentação pedida (?indent=/API navegável)
+    usa o JSONRenderer padrão.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encode_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            # Ex: inteiros com mais de 64 bits, que o orjson não aceita
+            return super().render(data, accepted_media_type, renderer_context)
+        # Mesmo escape do JSONRenderer, para o JSON continuar válido como JavaScript
+        if LINE_SEPARATORS[0] in ret or LINE_SEPARATORS[1] in ret:
+            ret = ret.replace(LINE_SEPARATORS[0], b'\\u2028').replace(LINE_SEPARATORS[1], b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser com orjson.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', django_settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        data = stream.read()
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+        # O json da biblioteca padrão aceita alguns casos que o orjson recusa
+        # (ex: inteiros com mais de 64 bits); o erro, se houver, vem dele
+        try:
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(data.decode(encoding), parse_constant=parse_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer MessagePack. Decimais saem como no JSON do DRF (número) e
+    datas com fuso como Timestamp.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True, datetime=True)
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parser MessagePack. Timestamps chegam como datetime em UTC.
+    """
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, timestamp=3, strict_map_key=False)
+        except Exception as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
@@ -0,0 +1,144 @@
+"""
+Cache de respostas da API com invalidação por tags.
+
+Cada resposta em cache depende de um conjunto de tags (ex: 'product',
+'product:12', 'settings'). Cada tag tem um token guardado no próprio cache;
+a chave da resposta inclui os tokens atuais das suas tags, então purgar uma
+tag (trocar o token) invalida de uma vez todas as respostas que dependem
+dela, sem precisar saber quais são.
+
+O backend é o cache do Django configurado em RESPONSE_CACHE_ALIAS. Para um
+único servidor, o backend em arquivo é compartilhado por todos os workers;
+para vários servidores, basta apontar o alias para um backend compartilhado
+(Redis, Memcached), sem mudar nada aqui.
+
+Quando a resposta é o JSON compacto padrão, a entrada guarda também as
+variantes comprimidas do corpo (ver app.compression), servidas como estão
+nos acertos seguintes.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings as django_settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.http import HttpRequest
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from app.compression import precompress, precompressed_response, renders_compact_json
+
+TAG_PREFIX = 'rc:tag:'
+# As entradas são (dados, variantes comprimidas)
+RESPONSE_PREFIX = 'rc:resp2:'
+
+
+def get_cache():
+    return caches[getattr(django_settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def tag_versions(tags):
+    """
+    Retorna os tokens atuais das tags, criando os que ainda não existem.
+    """
+    cache = get_cache()
+    keys = [TAG_PREFIX + tag for tag in tags]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # add() não sobrescreve um token criado por outro processo no meio tempo
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def purge(*tags):
+    """
+    Invalida todas as respostas em cache que dependem de qualquer uma das tags.
+    """
+    if tags:
+        get_cache().set_many({TAG_PREFIX + tag: uuid.uuid4().hex for tag in tags}, None)
+
+
+def model_tag(model):
+    """
+    Retorna a tag de um model (ex: 'product').
+    """
+    return model._meta.model_name
+
+
+def track(model):
+    """
+    Purga as tags do model ('product' e 'product:<pk>') sempre que uma
+    instância for salva ou removida, depois do commit da transação.
+    """
+    name = model_tag(model)
+
+    def handler(sender, instance, raw=False, **kwargs):
+        if not raw:
+            tags = (name, f'{name}:{instance.pk}')
+            transaction.on_commit(lambda: purge(*tags))
+
+    uid = f'response_cache:{name}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def _find_request(args):
+    for arg in args:
+        if isinstance(arg, (Request, HttpRequest)):
+            return arg
+    raise TypeError('cache_response precisa ser usado em uma view que recebe o request')
+
+
+def cache_response(ttl=60, tags=(), per_user=False):
+    """
+    Decorator para views do DRF (funções ou métodos de ViewSet) que guarda os
+    dados da resposta por `ttl` segundos.
+
+    `tags` aceita campos dos argumentos da URL, como 'product:{pk}'. Só
+    respostas 200 de GET/HEAD são guardadas; com `per_user`, cada usuário
+    tem sua própria cópia.
+    """
+    def decorator(view):
+        view_name = f'{view.__module__}.{view.__qualname__}'
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = _find_request(args)
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            resolved = sorted({tag.format(**kwargs) for tag in tags})
+            parts = [
+                view_name,
+                request.get_host(),
+                request.get_full_path(),
+                request.META.get('HTTP_ACCEPT', ''),
+                str(request.user.pk) if per_user and request.user.is_authenticated else '',
+            ]
+            parts += [f'{tag}={version}' for tag, version in zip(resolved, tag_versions(resolved))]
+            key = RESPONSE_PREFIX + hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+            cache = get_cache()
+            entry = cache.get(key)
+            if entry is not None:
+                data, variants = entry
+                if variants and renders_compact_json(request):
+                    response = precompressed_response(request, variants)
+                    if response is not None:
+                        return response
+                return Response(data)
+
+            response = view(*args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                # Guarda depois de renderizar, para comprimir o corpo que o cliente recebeu
+                def store(rendered):
+                    variants = precompress(rendered.content) if renders_compact_json(request) else {}
+                    cache.set(key, (response.data, variants), ttl)
+                response.add_post_render_callback(store)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,383 @@
+"""
+Índice de busca em memória para o cardápio (produtos, categorias e
+ingredientes).
+
+Os textos são quebrados em palavras e "dobrados" (minúsculas, sem acentos),
+então "pão" encontra "Pao", "PÃO" e "pão de queijo". Cada palavra aponta para
+os documentos em que aparece, com um peso que depende do campo (o nome pesa
+mais que a descrição). As palavras também ficam em uma trie, usada para
+completar a última palavra digitada: "x bac" encontra "X-Bacon".
+
+A busca exige todas as palavras da consulta (cada uma pode ser o começo de
+uma palavra do documento) e ordena pela soma dos pesos; palavras completas
+valem mais que prefixos, e nomes que começam com a consulta ganham um bônus.
+
+IndexStore mantém um índice por processo e o atualiza quando a versão do
+catálogo muda, reprocessando só os documentos que mudaram: o carregador
+devolve todos os documentos, mas os iguais aos já indexados não são
+quebrados em palavras de novo.
+
+A busca da vitrine (clientes.search) e a da administração (products.search)
+montam os documentos com product_document e named_document, então os pesos
+dos campos são os mesmos nas duas.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+WORD = re.compile(r'\w+')
+
+# Palavras que não ajudam a distinguir itens do cardápio
+STOPWORDS = frozenset({
+    'a', 'as', 'o', 'os', 'e', 'de', 'da', 'das', 'do', 'dos', 'com', 'em', 'na', 'nas', 'no', 'nos',
+    'para', 'ao', 'aos', 'um', 'uma',
+})
+
+# Peso de uma palavra do nome que começa a consulta (ex: "pizza" em "Pizza Calabresa")
+NAME_PREFIX_BONUS = 2.0
+# Quantas palavras um prefixo pode expandir (as mais curtas primeiro)
+MAX_EXPANSIONS = 64
+# Uma letra só casaria com boa parte do cardápio: conta como palavra completa
+MIN_PREFIX_LENGTH = 2
+# Máximo de resultados por consulta na API
+MAX_LIMIT = 50
+
+# Pesos dos campos nos documentos do cardápio
+NAME_WEIGHT = 4.0
+CATEGORY_WEIGHT = 1.5
+INGREDIENT_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def fold(text):
+    """
+    Remove acentos e converte para minúsculas: 'Pão Francês' -> 'pao frances'.
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def words(text):
+    """
+    Retorna as palavras de `text` como (palavra dobrada, forma original em minúsculas).
+    """
+    return [(fold(word), word.lower()) for word in WORD.findall(text or '')]
+
+
+class Trie:
+    """
+    Árvore de prefixos das palavras indexadas.
+    """
+
+    class Node:
+        __slots__ = ('children', 'terminal')
+
+        def __init__(self):
+            self.children = {}
+            self.terminal = False
+
+    def __init__(self):
+        self.root = self.Node()
+
+    def insert(self, word):
+        node = self.root
+        for char in word:
+            node = node.children.setdefault(char, self.Node())
+        node.terminal = True
+
+    def remove(self, word):
+        """
+        Remove a palavra e os nós que ficarem sem uso.
+        """
+        path = [self.root]
+        for char in word:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].terminal = False
+        for depth in range(len(word), 0, -1):
+            node = path[depth]
+            if node.terminal or node.children:
+                break
+            del path[depth - 1].children[word[depth - 1]]
+
+    def complete(self, prefix, limit=None):
+        """
+        Retorna as palavras que começam com `prefix`, das mais curtas para as
+        mais longas, no máximo `limit`.
+        """
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        found = []
+        level = [(prefix, node)]
+        while level and (limit is None or len(found) < limit):
+            next_level = []
+            for word, node in level:
+                if node.terminal:
+                    found.append(word)
+                    if limit is not None and len(found) >= limit:
+                        break
+                next_level.extend((word + char, child) for char, child in node.children.items())
+            level = next_level
+        return found
+
+
+class SearchIndex:
+    """
+    Índice invertido com trie de prefixos.
+
+    Um documento é um dicionário com 'type', 'id', 'name' e 'fields', uma
+    sequência de (texto, peso); as outras chaves saem como estão nos
+    resultados. A chave do documento é (type, id).
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.postings = {}
+        self.trie = Trie()
+        # Para cada palavra, as formas originais (com acento) e quantas vezes aparecem
+        self.surfaces = {}
+        self._terms = {}
+        # Nome dobrado de cada documento, para o bônus de prefixo
+        self._names = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _analyze(self, document):
+        terms = {}
+        surfaces = Counter()
+        for text, weight in document['fields']:
+            for term, surface in words(text):
+                if term in STOPWORDS:
+                    continue
+                terms[term] = terms.get(term, 0) + weight
+                surfaces[term, surface] += 1
+        return terms, surfaces
+
+    def add(self, document):
+        key = (document['type'], document['id'])
+        if key in self.documents:
+            self.remove(key)
+        terms, surfaces = self._analyze(document)
+        for term, weight in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                self.trie.insert(term)
+            posting[key] = weight
+        for (term, surface), count in surfaces.items():
+            forms = self.surfaces.setdefault(term, Counter())
+            forms[surface] += count
+        self.documents[key] = document
+        self._terms[key] = (terms, surfaces)
+        self._names[key] = ' '.join(term for term, _ in words(document['name']))
+
+    def remove(self, key):
+        if key not in self.documents:
+            return
+        terms, surfaces = self._terms.pop(key)
+        del self.documents[key]
+        del self._names[key]
+        for term in terms:
+            posting = self.postings[term]
+            del posting[key]
+            if not posting:
+                del self.postings[term]
+                del self.surfaces[term]
+                self.trie.remove(term)
+        for (term, surface), count in surfaces.items():
+            forms = self.surfaces.get(term)
+            if forms is not None:
+                forms[surface] -= count
+                if forms[surface] <= 0:
+                    del forms[surface]
+
+    def update(self, documents):
+        """
+        Deixa o índice com exatamente `documents`, reprocessando só os que
+        mudaram. Retorna quantos documentos foram adicionados, alterados ou
+        removidos.
+        """
+        current = {(document['type'], document['id']): document for document in documents}
+        changed = 0
+        for key in [key for key in self.documents if key not in current]:
+            self.remove(key)
+            changed += 1
+        for key, document in current.items():
+            if self.documents.get(key) != document:
+                self.add(document)
+                changed += 1
+        return changed
+
+    def _matches(self, token, prefix):
+        """
+        Retorna {chave: pontuação} dos documentos que contêm `token` (ou, com
+        `prefix`, uma palavra que começa com ele).
+        """
+        scores = {}
+        expansions = self.trie.complete(token, MAX_EXPANSIONS) if prefix else [token]
+        for term in expansions:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            # Prefixo vale proporcionalmente ao quanto da palavra já foi digitado
+            factor = 1.0 if term == token else 0.5 + 0.5 * len(token) / len(term)
+            for key, weight in posting.items():
+                score = weight * factor
+                if score > scores.get(key, 0):
+                    scores[key] = score
+        return scores
+
+    def _tokens(self, query):
+        """
+        Palavras da consulta; a última, se ainda está sendo digitada, conta
+        como prefixo.
+        """
+        tokens = [term for term, _ in words(query)]
+        if not tokens:
+            return []
+        last = tokens[-1]
+        last_is_prefix = not query[-1:].isspace() and len(last) >= MIN_PREFIX_LENGTH
+        result = [(term, False) for term in tokens[:-1] if term not in STOPWORDS]
+        # "do" pode ser o começo de "doce"; só é ignorado se não completar nada
+        if last not in STOPWORDS or (last_is_prefix and self.trie.complete(last, 1)):
+            result.append((last, last_is_prefix))
+        return result
+
+    def search(self, query, limit=20, types=None):
+        """
+        Retorna os documentos que contêm todas as palavras de `query`, do
+        mais relevante para o menos, com a pontuação em 'score'.
+        """
+        tokens = self._tokens(query)
+        if not tokens:
+            return []
+        scores = None
+        # As palavras menos comuns primeiro: a interseção encolhe mais rápido
+        for matches in sorted((self._matches(token, prefix) for token, prefix in tokens), key=len):
+            if scores is None:
+                scores = matches
+            else:
+                scores = {key: score + matches[key] for key, score in scores.items() if key in matches}
+            if not scores:
+                return []
+
+        folded = ' '.join(term for term, _ in words(query))
+        ranked = []
+        for key, score in scores.items():
+            if types and key[0] not in types:
+                continue
+            name = self._names[key]
+            if name.startswith(folded):
+                score += NAME_PREFIX_BONUS
+            ranked.append((-score, len(name), name, key))
+
+        results = []
+        for score, _, _, key in heapq.nsmallest(limit, ranked):
+            result = {name: value for name, value in self.documents[key].items() if name != 'fields'}
+            result['score'] = round(-score, 3)
+            results.append(result)
+        return results
+
+    def suggest(self, query, limit=5):
+        """
+        Completa a última palavra de `query` com as palavras mais frequentes
+        do índice, na forma original (com acentos).
+        """
+        tokens = words(query)
+        if not tokens or query[-1:].isspace() or len(tokens[-1][0]) < MIN_PREFIX_LENGTH:
+            return []
+        prefix = tokens[-1][0]
+        candidates = self.trie.complete(prefix, MAX_EXPANSIONS)
+        ranked = heapq.nlargest(limit, candidates, key=lambda term: (sum(self.postings[term].values()), -len(term)))
+        return [self.surfaces[term].most_common(1)[0][0] for term in ranked]
+
+
+def product_document(product_id, name, category_id, category_name, ingredient_names, description, **extra):
+    """
+    Documento de busca de um produto. As chaves de `extra` saem nos resultados.
+    """
+    return {
+        'type': 'product',
+        'id': product_id,
+        'name': name,
+        'category_id': category_id,
+        **extra,
+        'fields': (
+            (name, NAME_WEIGHT),
+            (category_name, CATEGORY_WEIGHT),
+            (' '.join(ingredient_names), INGREDIENT_WEIGHT),
+            (description, DESCRIPTION_WEIGHT),
+        ),
+    }
+
+
+def named_document(type, pk, name, description=None, **extra):
+    """
+    Documento de busca de uma categoria ou ingrediente: o nome e, se houver, a descrição.
+    """
+    fields = ((name, NAME_WEIGHT),)
+    if description is not None:
+        fields += ((description, DESCRIPTION_WEIGHT),)
+    return {'type': type, 'id': pk, 'name': name, **extra, 'fields': fields}
+
+
+class IndexStore:
+    """
+    Mantém um SearchIndex no processo, atualizado quando `version()` muda.
+
+    `load()` retorna todos os documentos da versão atual; só os que mudaram
+    desde a última atualização são reindexados. As consultas e as
+    atualizações usam a mesma trava, então um worker com várias threads
+    nunca lê o índice no meio de uma atualização.
+    """
+
+    def __init__(self, version, load):
+        self._version = version
+        self._load = load
+        self._lock = threading.Lock()
+        self.index = SearchIndex()
+        self.version = None
+
+    def _refresh(self):
+        current = self._version()
+        if current != self.version:
+            self.index.update(self._load())
+            self.version = current
+
+    def search(self, query, limit=20, types=None, suggestions=5):
+        """
+        Retorna {'results': [...], 'suggestions': [...]} para `query`.
+        """
+        with self._lock:
+            self._refresh()
+            return {
+                'results': self.index.search(query, limit, types),
+                'suggestions': self.index.suggest(query, suggestions) if suggestions else [],
+            }
+
+
+def search_request(store, request):
+    """
+    Executa a busca com os parâmetros da requisição: q (consulta), type
+    (tipos separados por vírgula) e limit. Levanta ValueError se forem
+    inválidos.
+    """
+    params = request.query_params
+    try:
+        limit = int(params.get('limit', 20))
+    except ValueError:
+        raise ValueError('limit deve ser um número inteiro')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit deve estar entre 1 e {MAX_LIMIT}')
+    types = {value.strip() for value in params.get('type', '').split(',') if value.strip()} or None
+    # Espaço no final: a última palavra está completa e não é tratada como prefixo
+    query = params.get('q', '')[:200]
+    return {'query': query.strip(), **store.search(query, limit, types)}
@@ -0,0 +1,150 @@
+"""
+Campos esparsos (?fields=) e expansão de relações (?expand=) para serializers.
+
+    ?fields=id,status,items.product_name,items.quantity
+        devolve só os campos pedidos; campos aninhados usam ponto.
+    ?expand=items.product
+        inclui relações marcadas em Meta.expandable_fields.
+
+Sem nenhum dos dois parâmetros a resposta continua completa, como antes.
+Quando algum deles é usado, as relações expansíveis que não foram pedidas
+em ?expand= (nem explicitamente em ?fields=) saem da resposta, ou viram só
+o id quando são uma chave estrangeira. Campos que não saem na resposta não
+são lidos, e as views usam prefetch_requested para também não consultar o banco.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+class SparseFields:
+    """
+    Campos e expansões pedidos na query string.
+    """
+
+    def __init__(self, fields=(), expand=()):
+        # Árvore dos campos pedidos; None em um nó significa "todos os campos abaixo"
+        self.tree = None
+        for path in fields:
+            self.tree = self.tree or {}
+            node = self.tree
+            parts = path.split('.')
+            for part in parts[:-1]:
+                if node.get(part, {}) is None:
+                    break
+                node = node.setdefault(part, {})
+            else:
+                node[parts[-1]] = None
+        self.expand = set(expand)
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None:
+            return cls()
+        spec = getattr(request, '_sparse_fields', None)
+        if spec is None:
+            params = getattr(request, 'query_params', request.GET)
+            spec = cls(_split(params.get('fields')), _split(params.get('expand')))
+            request._sparse_fields = spec
+        return spec
+
+    def __bool__(self):
+        return self.tree is not None or bool(self.expand)
+
+    def includes(self, path, expandable=False):
+        """
+        Verifica se o campo `path` (ex: 'items.product') sai na resposta.
+        """
+        if not self:
+            return True
+        explicit = True
+        node = self.tree
+        for part in path.split('.'):
+            if node is None:
+                explicit = False
+                break
+            if part not in node:
+                return False
+            node = node[part]
+        if expandable and not explicit:
+            return path in self.expand
+        return True
+
+
+class SparseFieldsMixin:
+    """
+    Mixin para ModelSerializer que aplica ?fields= e ?expand= do request
+    (contexto) nas leituras. Funciona também em serializers aninhados: cada
+    um descobre o próprio caminho pelos serializers pais.
+    """
+
+    def _sparse_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return ''.join(f'{name}.' for name in reversed(names))
+
+    def _collapse(self, name, field):
+        # Relação não expandida: chave estrangeira vira só o id
+        if isinstance(field, serializers.BaseSerializer) and not isinstance(field, serializers.ListSerializer):
+            try:
+                model_field = self.Meta.model._meta.get_field(field.source or name)
+            except FieldDoesNotExist:
+                return None
+            if isinstance(model_field, models.ForeignKey):
+                return serializers.PrimaryKeyRelatedField(source=field.source, read_only=True)
+        return None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+        spec = SparseFields.from_request(request)
+        if not spec:
+            return fields
+
+        prefix = self._sparse_path()
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+        for name in list(fields):
+            if fields[name].write_only:
+                continue
+            path = prefix + name
+            if spec.includes(path, expandable=name in expandable):
+                continue
+            collapsed = self._collapse(name, fields[name]) if name in expandable and spec.includes(path) else None
+            if collapsed is None:
+                del fields[name]
+            else:
+                fields[name] = collapsed
+        return fields
+
+
+def prefetch_requested(queryset, spec, select=(), prefetch=(), expandable=()):
+    """
+    Aplica select_related/prefetch_related apenas para os campos pedidos.
+
+    `select` e `prefetch` são listas de (caminho do campo, lookup);
+    `expandable` lista os caminhos que só saem quando expandidos.
+    """
+    select_lookups = []
+    for path, lookup in select:
+        if spec.includes(path, expandable=path in expandable) and lookup not in select_lookups:
+            select_lookups.append(lookup)
+    prefetch_lookups = []
+    for path, lookup in prefetch:
+        if spec.includes(path, expandable=path in expandable) and lookup not in prefetch_lookups:
+            prefetch_lookups.append(lookup)
+    if select_lookups:
+        queryset = queryset.select_related(*select_lookups)
+    if prefetch_lookups:
+        queryset = queryset.prefetch_related(*prefetch_lookups)
+    return queryset
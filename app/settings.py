@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -124,13 +126,39 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Entrega da mídia (ver app/media.py): None (FileResponse/sendfile pelo Django),
+# 'x-accel-redirect' (nginx) ou 'x-sendfile' (Apache/lighttpd). Com nginx:
+#     location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Uploads gravados pelo hash do conteúdo, sem duplicatas (ver app/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'app.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Os testes gravam carimbos, caches, snapshot e mídia em um diretório temporário
+TEST_RUNNER = 'app.testing.IsolatedTestRunner'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Renderers e parsers da API: orjson e msgpack são opcionais (ver app/renderers.py)
+API_RENDERERS = ['app.renderers.FastJSONRenderer' if find_spec('orjson') else 'rest_framework.renderers.JSONRenderer']
+API_PARSERS = ['app.renderers.FastJSONParser' if find_spec('orjson') else 'rest_framework.parsers.JSONParser']
+if find_spec('msgpack'):
+    API_RENDERERS.append('app.renderers.MessagePackRenderer')
+    API_PARSERS.append('app.renderers.MessagePackParser')
+API_RENDERERS.append('rest_framework.renderers.BrowsableAPIRenderer')
+API_PARSERS += ['rest_framework.parsers.FormParser', 'rest_framework.parsers.MultiPartParser']
+
 # REST Framework settings
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': API_RENDERERS,
+    'DEFAULT_PARSER_CLASSES': API_PARSERS,
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
@@ -194,6 +222,38 @@ CSRF_TRUSTED_ORIGINS = [
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 
+# Carimbos de versão usados para invalidar caches locais entre processos
+VERSION_STAMPS_DIR = os.path.join(BASE_DIR, 'var', 'versions')
+
+# Snapshot do cardápio compartilhado entre os workers (ver clientes.snapshot)
+CATALOG_SNAPSHOT_PATH = os.path.join(BASE_DIR, 'var', 'catalog.snapshot')
+
+# Cache
+# 'default' é local de cada processo; 'responses' (cache de respostas da API,
+# ver app.response_cache) fica em arquivo para ser compartilhado pelos workers.
+# Com mais de um servidor, aponte 'responses' para um backend compartilhado
+# (ex: django.core.cache.backends.redis.RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'var', 'cache', 'responses'),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+
+# Variantes das imagens (app/images.py): processos do pool; 0 gera na hora, no próprio processo
+IMAGE_WORKERS = 2
+
+# Dashboard em tempo real
+DASHBOARD_TOP_PRODUCTS_CAPACITY = 100  # Máximo de produtos monitorados por sketch
+DASHBOARD_SKETCH_FLUSH_SECONDS = 30    # Intervalo para gravar os sketches no banco
+
 # Logging configuration
 LOGGING = {
     'version': 1,
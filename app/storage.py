@@ -0,0 +1,199 @@
+"""
+Storage de mídia endereçado por conteúdo.
+
+Cada arquivo enviado é gravado sob o SHA-256 do seu conteúdo:
+
+    ab/cd/abcd...(64 hex).jpg
+
+então a mesma foto enviada duas vezes (ou usada em um produto e em uma
+promoção) ocupa o disco uma vez só, e um nome nunca muda de conteúdo: as
+respostas podem ter cache "immutable" de um ano (ver app.media).
+
+O upload nunca fica inteiro na memória: arquivos acima de
+FILE_UPLOAD_MAX_MEMORY_SIZE já chegam em um arquivo temporário, que só é lido
+em blocos para calcular o hash e depois movido; os menores são copiados em
+blocos para um temporário enquanto o hash é calculado.
+
+Ao lado de cada arquivo fica um contador de referências (<nome>.refs): cada
+save() do mesmo conteúdo soma um, cada delete() subtrai um, e o arquivo só
+é removido quando ninguém mais o usa. O contador é alterado com trava
+exclusiva no próprio arquivo, então vários processos podem gravar e remover
+ao mesmo tempo. Arquivos com nomes antigos (antes deste storage) continuam
+sendo lidos e removidos normalmente.
+
+O Django não remove o arquivo anterior quando a imagem de um registro é
+trocada ou o registro é removido. Cada campo registrado com track() libera
+a sua referência depois do commit, então o arquivo some do disco quando o
+último registro que o usava deixa de usá-lo.
+"""
+import contextlib
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+CONTENT_NAME = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?$')
+REFS_SUFFIX = '.refs'
+TEMP_DIR = '.tmp'
+
+
+def is_content_addressed(name):
+    """
+    Verifica se `name` é um nome gerado a partir do conteúdo (imutável).
+    """
+    return bool(CONTENT_NAME.match(name.replace('\\', '/')))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage que nomeia os arquivos pelo hash do conteúdo e
+    compartilha arquivos idênticos com contagem de referências.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # O nome final vem do conteúdo (ver _save); conteúdos iguais devem colidir
+        return name
+
+    def _spool(self, content):
+        """
+        Retorna (hash, caminho do arquivo com o conteúdo, se é um temporário nosso).
+        """
+        digest = hashlib.sha256()
+        if hasattr(content, 'temporary_file_path'):
+            for chunk in content.chunks():
+                digest.update(chunk)
+            return digest.hexdigest(), content.temporary_file_path(), False
+
+        directory = os.path.join(self.location, TEMP_DIR)
+        os.makedirs(directory, exist_ok=True)
+        # Mesmas permissões (0o666 menos a umask) de um arquivo do FileSystemStorage
+        path = os.path.join(directory, uuid.uuid4().hex)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    digest.update(chunk)
+                    tmp.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return digest.hexdigest(), path, True
+
+    @contextlib.contextmanager
+    def _references(self, name):
+        """
+        Trava o contador de `name` e entrega uma lista [contagem]; o valor
+        alterado é gravado ao sair. Contagem zero remove o contador.
+        """
+        path = self.path(name) + REFS_SUFFIX
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        while True:
+            file = open(path, 'a+')
+            locks.lock(file, locks.LOCK_EX)
+            # Outro processo pode ter removido o contador enquanto esperávamos a trava
+            try:
+                if os.path.samestat(os.fstat(file.fileno()), os.stat(path)):
+                    break
+            except FileNotFoundError:
+                pass
+            file.close()
+        with file:
+            file.seek(0)
+            count = [int(file.read().strip() or 0)]
+            yield count
+            if count[0] > 0:
+                file.seek(0)
+                file.truncate()
+                file.write(str(count[0]))
+                file.flush()
+            else:
+                os.remove(path)
+
+    def _save(self, name, content):
+        digest, source, temporary = self._spool(content)
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]+', extension):
+            extension = ''
+        name = f'{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+        full_path = self.path(name)
+
+        with self._references(name) as count:
+            if count[0] > 0 and os.path.exists(full_path):
+                # Conteúdo já gravado: só mais uma referência
+                if temporary:
+                    os.remove(source)
+            else:
+                if temporary:
+                    os.replace(source, full_path)
+                else:
+                    file_move_safe(source, full_path, allow_overwrite=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+            count[0] += 1
+        return name
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        if not is_content_addressed(name):
+            return super().delete(name)
+        with self._references(name) as count:
+            count[0] = max(count[0] - 1, 0)
+            if count[0] == 0:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.path(name))
+
+    def references(self, name):
+        """
+        Quantos save() ainda usam o arquivo `name`.
+        """
+        try:
+            with open(self.path(name) + REFS_SUFFIX) as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+
+def track(model, field_name):
+    """
+    Libera o arquivo do campo `field_name` depois do commit quando ele é
+    trocado por outro, removido do registro ou quando o registro é removido.
+    """
+    label = model._meta.label
+    attribute = f'_stored_{field_name}'
+
+    def remember(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or instance.pk is None or (update_fields is not None and field_name not in update_fields):
+            return
+        file = getattr(instance, field_name)
+        old = model._default_manager.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+        # Upload ainda não gravado: FileField.pre_save grava depois deste sinal
+        setattr(instance, attribute, (old, bool(file) and not file._committed))
+
+    def release_replaced(sender, instance, raw=False, **kwargs):
+        old, uploaded = instance.__dict__.pop(attribute, (None, False))
+        if not old:
+            return
+        file = getattr(instance, field_name)
+        # O mesmo conteúdo enviado de novo tem o mesmo nome, mas somou uma referência
+        if old != file.name or (uploaded and is_content_addressed(old)):
+            transaction.on_commit(lambda: file.storage.delete(old))
+
+    def release_deleted(sender, instance, **kwargs):
+        file = getattr(instance, field_name)
+        if file:
+            name = file.name
+            transaction.on_commit(lambda: file.storage.delete(name))
+
+    uid = f'storage:{label}:{field_name}'
+    pre_save.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(release_replaced, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(release_deleted, sender=model, weak=False, dispatch_uid=uid)
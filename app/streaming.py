@@ -0,0 +1,90 @@
+"""
+Respostas JSON em streaming para listagens grandes sem paginação.
+
+Em vez de montar a lista inteira em Python e depois o JSON inteiro em
+memória, stream_list lê o queryset com iterator() em blocos, serializa um
+bloco por vez e envia cada um assim que fica pronto (StreamingHttpResponse).
+O primeiro byte sai logo e o uso de memória depende do tamanho do bloco, não
+do total de linhas. O corpo é idêntico ao do renderer JSON negociado.
+
+Como o corpo é gerado depois que a view retorna, um erro no meio do envio
+não vira uma resposta 500: o cliente recebe um JSON incompleto.
+"""
+import logging
+from itertools import islice
+
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 200
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_chunks(renderer, chunks):
+    """
+    Recebe blocos de itens já serializados e gera os bytes da lista JSON,
+    codificando cada bloco com `renderer` (o JSONRenderer negociado).
+    """
+    yield b'['
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        # Mesmo JSON compacto do render(); a lista é aberta e fechada aqui
+        body = renderer.render(list(chunk))[1:-1]
+        yield body if first else b',' + body
+        first = False
+    yield b']'
+
+
+def stream_list(request, queryset, serialize, chunk_size=None, headers=None):
+    """
+    Responde com a lista JSON de `queryset`, serializando `chunk_size` objetos
+    por vez com `serialize(objetos) -> lista`. Quando o formato negociado
+    não é JSON (ex: API navegável), responde normalmente com Response.
+    """
+    if not isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer):
+        return Response(serialize(list(queryset)), headers=headers)
+
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    objects = queryset.iterator(chunk_size=chunk_size) if isinstance(queryset, QuerySet) else queryset
+    renderer = request.accepted_renderer
+
+    def content():
+        try:
+            yield from render_chunks(renderer, (serialize(chunk) for chunk in _chunks(objects, chunk_size)))
+        except Exception:
+            logger.exception('Erro ao gerar a resposta em streaming de %s', request.get_full_path())
+            raise
+
+    return StreamingHttpResponse(content(), content_type='application/json', headers=headers)
+
+
+class StreamingListMixin:
+    """
+    Mixin para ViewSets que envia o list() em streaming quando não há paginação.
+    """
+    stream_chunk_size = None
+
+    def stream_serializer(self):
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        return lambda objects: serializer_class(objects, many=True, context=context).data
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_list(request, queryset, self.stream_serializer(), self.stream_chunk_size)
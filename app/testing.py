@@ -0,0 +1,71 @@
+"""
+Apoio aos testes da aplicação.
+
+IsolatedTestRunner (TEST_RUNNER) aponta para um diretório temporário, durante
+toda a execução, tudo o que a aplicação mantém em disco: carimbos de versão,
+cache de respostas, snapshot do catálogo e mídia. A suíte nunca toca em var/
+e media/ do checkout, nem altera os carimbos de um servidor de
+desenvolvimento rodando nele.
+
+IsolatedTestCase começa cada teste do zero: altera os carimbos conhecidos
+(o que um teste deixou em memória no processo, como settings, snapshot e
+índice de busca, fica com uma versão antiga), esvazia os caches do Django e
+usa um MEDIA_ROOT vazio, para os contadores de referência do storage
+começarem do zero.
+"""
+import copy
+import os
+import shutil
+import tempfile
+
+from django.conf import settings as django_settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.test.runner import DiscoverRunner
+
+from app import versioning
+
+
+def isolated_settings(directory):
+    """
+    override_settings com os caminhos gravados pela aplicação dentro de `directory`.
+    """
+    cache_settings = copy.deepcopy(django_settings.CACHES)
+    for alias, options in cache_settings.items():
+        if options['BACKEND'].endswith('FileBasedCache'):
+            options['LOCATION'] = os.path.join(directory, 'cache', alias)
+    return override_settings(
+        VERSION_STAMPS_DIR=os.path.join(directory, 'versions'),
+        CACHES=cache_settings,
+        CATALOG_SNAPSHOT_PATH=os.path.join(directory, 'catalog.snapshot'),
+        MEDIA_ROOT=os.path.join(directory, 'media'),
+        # Vendas gravadas na hora, sem timers de fundo tocando no banco de testes
+        DASHBOARD_SKETCH_FLUSH_SECONDS=0,
+    )
+
+
+class IsolatedTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Antes do banco de testes: o createcachetable já instancia os caches
+        self._temp_dir = tempfile.mkdtemp(prefix='restaurant-tests-')
+        self._isolated = isolated_settings(self._temp_dir)
+        self._isolated.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._isolated.disable()
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+
+class IsolatedTestCase(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp(prefix='restaurant-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        versioning.bump(*versioning.STAMPS)
+        for cache in caches.all():
+            cache.clear()
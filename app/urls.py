@@ -14,11 +14,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
+from .media import serve_media
 from .views import CustomTokenObtainPairView, verify_token
 
 urlpatterns = [
@@ -36,8 +38,7 @@ urlpatterns = [
     path('api/settings/', include('settings.urls')),
     path('api/clientes/', include('clientes.urls')),
     path('api/client-orders/', include('client_orders.urls')),
-]
 
-# Servir arquivos de mídia em desenvolvimento
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Arquivos de mídia, com cache longo para os nomes de conteúdo (ver app.media)
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
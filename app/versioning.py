@@ -0,0 +1,126 @@
+"""
+Carimbos de versão compartilhados entre os processos do servidor.
+
+Cada carimbo é um arquivo vazio em VERSION_STAMPS_DIR. Alterar um carimbo
+cria um arquivo novo e o troca de lugar com os.replace, então a versão atual
+é lida com um único os.stat (inode + mtime), sem banco de dados nem cache
+externo, e todos os workers da mesma máquina enxergam a mudança na hora. O
+conteúdo nunca é lido: o arquivo novo é criado enquanto o antigo ainda
+existe, então nunca tem o mesmo inode da versão que substitui.
+"""
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from django.conf import settings as django_settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+_directory = None
+# Carimbos registrados com track()
+STAMPS = set()
+
+
+def stamps_dir():
+    global _directory
+    if _directory is None:
+        directory = getattr(
+            django_settings, 'VERSION_STAMPS_DIR',
+            os.path.join(django_settings.BASE_DIR, 'var', 'versions')
+        )
+        os.makedirs(directory, exist_ok=True)
+        _directory = str(directory)
+    return _directory
+
+
+def _path(name):
+    return os.path.join(stamps_dir(), name)
+
+
+def bump(*names):
+    """
+    Marca os carimbos `names` como alterados.
+    Dentro de uma transação, use bump_on_commit para que outros processos
+    não guardem em cache dados ainda não confirmados com a versão nova.
+    """
+    for name in names:
+        fd, tmp_path = tempfile.mkstemp(dir=stamps_dir(), prefix=f'.{name}.')
+        os.close(fd)
+        os.replace(tmp_path, _path(name))
+
+
+def bump_on_commit(*names):
+    """
+    Altera os carimbos depois do commit da transação atual (ou na hora,
+    se não houver transação).
+    """
+    transaction.on_commit(lambda: bump(*names))
+
+
+def _stat(name):
+    try:
+        return os.stat(_path(name))
+    except FileNotFoundError:
+        return None
+
+
+def get(name):
+    """
+    Retorna a versão atual de um carimbo ('0' se nunca foi alterado).
+    """
+    stat = _stat(name)
+    if stat is None:
+        return '0'
+    return f'{stat.st_ino:x}.{stat.st_mtime_ns:x}'
+
+
+def version(*names):
+    """
+    Retorna uma versão combinada de vários carimbos.
+    """
+    return '-'.join(get(name) for name in names)
+
+
+def last_modified(*names):
+    """
+    Retorna o instante (UTC) da alteração mais recente entre os carimbos,
+    ou None se nenhum deles foi alterado.
+    """
+    times = [stat.st_mtime for stat in map(_stat, names) if stat is not None]
+    if not times:
+        return None
+    return datetime.fromtimestamp(max(times), tz=timezone.utc)
+
+
+def model_stamp(model):
+    """
+    Retorna o nome do carimbo de um model (ex: 'products.product').
+    """
+    return model._meta.label_lower
+
+
+def track(model, *extra_names):
+    """
+    Altera o carimbo do model (e os carimbos extras) sempre que uma
+    instância for salva ou removida.
+    """
+    names = (model_stamp(model),) + extra_names
+    STAMPS.update(names)
+
+    def handler(sender, raw=False, **kwargs):
+        if not raw:
+            bump_on_commit(*names)
+
+    uid = f'versioning:{model_stamp(model)}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+
+
+def _reset_directory(setting, **kwargs):
+    global _directory
+    if setting in ('VERSION_STAMPS_DIR', 'BASE_DIR'):
+        _directory = None
+
+
+setting_changed.connect(_reset_directory, dispatch_uid='versioning:stamps_dir')
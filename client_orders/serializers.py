@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import ClientOrder
 from orders.models import Order, OrderItem, OrderItemIngredient
@@ -19,6 +20,7 @@ class ClientOrderCreateSerializer(serializers.ModelSerializer):
         fields = ('customer_name', 'customer_phone', 'customer_address', 'notes', 'items', 'total_amount', 'payment_method', 'change_amount')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
+    @transaction.atomic
     def create(self, validated_data):
         """
         Cria um novo pedido com seus itens e ingredientes.
@@ -0,0 +1,119 @@
+"""
+Cache dos documentos servidos à vitrine (store-info, loja por slug e bootstrap).
+
+Os documentos serializados ficam no cache do Django sob uma chave que inclui
+a versão atual das configurações; o catálogo do bootstrap vem do snapshot
+compartilhado. Qualquer alteração muda a versão, então as entradas antigas
+simplesmente deixam de ser usadas e expiram sozinhas.
+
+Junto de cada documento ficam as variantes comprimidas do corpo JSON (ver
+app.compression), feitas uma vez quando a entrada é criada.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from app import versioning
+from app.compression import precompress
+from settings.cache import SETTINGS_STAMPS, get_settings, get_schedule
+from settings.models import Settings
+from .serializers import SettingsSerializer
+from .snapshot import dumps, get_snapshot
+
+STORE_CACHE_TIMEOUT = 60 * 60 * 24
+# Marca slugs inexistentes, para que também não consultem o banco
+MISSING = 'missing'
+
+
+def _plain(data):
+    # Converte para tipos JSON puros (datas, decimais, ReturnDict)
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def _digest(data):
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+def _cache_key(request, business_slug, current):
+    # As URLs das fotos são absolutas, então o host faz parte da chave
+    origin = f'{request.scheme}://{request.get_host()}'
+    digest = hashlib.md5(f'{business_slug}|{origin}'.encode('utf-8')).hexdigest()
+    return f'clientes:store:{digest}:{current}'
+
+
+def _load_settings(business_slug):
+    settings = get_settings()
+    if business_slug is None or (settings is not None and settings.business_slug == business_slug):
+        return settings
+    return Settings.objects.prefetch_related('opening_hours').filter(business_slug=business_slug).first()
+
+
+def store_document(request, business_slug=None):
+    """
+    Retorna (dados, etag, variantes comprimidas do JSON) do documento da
+    loja, ou None se a loja não existir. Sem `business_slug`, usa as
+    configurações do sistema.
+    """
+    key = _cache_key(request, business_slug, versioning.version(*SETTINGS_STAMPS))
+    entry = cache.get(key)
+    if entry is None:
+        settings = _load_settings(business_slug)
+        if settings is None:
+            entry = MISSING
+        else:
+            data = _plain(SettingsSerializer(settings, context={'request': request}).data)
+            entry = (data, '"%s"' % _digest(data), precompress(JSONRenderer().render(data)))
+        cache.set(key, entry, STORE_CACHE_TIMEOUT)
+    return None if entry == MISSING else entry
+
+
+def _store_json(current):
+    # Informações da loja com URLs relativas à raiz, para qualquer host
+    key = 'clientes:bootstrap-store:%s' % hashlib.md5(current.encode('utf-8')).hexdigest()
+    entry = cache.get(key)
+    if entry is None:
+        settings = get_settings()
+        entry = MISSING if settings is None else dumps(SettingsSerializer(settings).data)
+        cache.set(key, entry, STORE_CACHE_TIMEOUT)
+    return None if entry == MISSING else entry
+
+
+def bootstrap_document():
+    """
+    Retorna (corpo JSON, etag, variantes comprimidas) do documento de abertura
+    da loja, ou None se o sistema não foi configurado.
+
+    O catálogo vem pronto do snapshot compartilhado (ver clientes.snapshot):
+    as seções são copiadas direto do arquivo mapeado, sem consultas nem
+    serialização. Só as informações da loja (em cache por versão) e o estado
+    aberta/fechada, calculado pela tabela de horários, entram por chamada.
+    As variantes comprimidas ficam em cache pela etag, que muda junto com o
+    corpo, então cada versão é comprimida uma vez por processo.
+    """
+    settings_version = versioning.version(*SETTINGS_STAMPS)
+    store = _store_json(settings_version)
+    if store is None:
+        return None
+    snapshot = get_snapshot()
+    version = f'{settings_version}-{snapshot.version}'
+    status = dumps(get_schedule().status())
+    body = b''.join((
+        b'{"version":', dumps(version),
+        b',"store":', store,
+        b',"status":', status,
+        b',"categories":', snapshot.raw('categories'),
+        b',"products":', snapshot.raw('products'),
+        b',"promotions":', snapshot.raw('promotions'),
+        b'}',
+    ))
+    etag = '"%s"' % hashlib.sha1(version.encode('utf-8') + status).hexdigest()
+    compressed_key = 'clientes:bootstrap-compressed:%s' % etag.strip('"')
+    variants = cache.get(compressed_key)
+    if variants is None:
+        variants = precompress(body)
+        cache.set(compressed_key, variants, STORE_CACHE_TIMEOUT)
+    return body, etag, variants
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from clientes.snapshot import build_snapshot, snapshot_path, CatalogSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Gera o snapshot do cardápio compartilhado entre os workers (rode antes de iniciar o servidor)'
+
+    def handle(self, *args, **options):
+        path = snapshot_path()
+        build_snapshot(path)
+        snapshot = CatalogSnapshot(path)
+        self.stdout.write(f'Produtos no snapshot: {len(snapshot.load("products"))}')
+        self.stdout.write(self.style.SUCCESS(f'Snapshot do cardápio gerado em {path}'))
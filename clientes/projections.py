@@ -0,0 +1,43 @@
+"""
+Projeções (ver app.projection) equivalentes aos serializers da vitrine.
+"""
+from django.conf import settings as django_settings
+
+from app.images import srcset
+from app.projection import Projection
+from products.models import Product
+from .serializers import ProductSerializer, ProductIngredientSerializer
+
+
+class ProductIngredientProjection(Projection):
+    serializer_class = ProductIngredientSerializer
+    columns = ('ingredient_id', 'ingredient__name', 'ingredient__price',
+               'ingredient__category_id', 'ingredient__category__name')
+
+    def get_ingredient(self, row):
+        return {
+            'id': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'price': str(row['ingredient__price']),
+            'category': {
+                'id': row['ingredient__category_id'],
+                'name': row['ingredient__category__name'],
+            }
+        }
+
+
+class ProductProjection(Projection):
+    serializer_class = ProductSerializer
+    nested = {'ingredients': ProductIngredientProjection}
+    columns = ('image', 'image_variants')
+
+    def get_image(self, row):
+        if row['image']:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(Product._meta.get_field('image').storage.url(row['image']))
+            return f"{django_settings.MEDIA_URL}{row['image']}"
+        return None
+
+    def get_image_variants(self, row):
+        return srcset(row['image_variants'], Product._meta.get_field('image').storage, self.context.get('request'))
@@ -0,0 +1,36 @@
+"""
+Busca da vitrine: produtos e categorias ativos e os ingredientes oferecidos
+neles, indexados a partir do snapshot do catálogo (ver clientes.snapshot e
+app.search). O índice acompanha a versão do snapshot.
+"""
+from app import versioning
+from app.search import IndexStore, named_document, product_document
+from products.signals import CATALOG_STAMPS
+from .snapshot import get_snapshot
+
+
+def catalog_documents():
+    """
+    Documentos de busca da versão atual do snapshot.
+    """
+    snapshot = get_snapshot()
+    documents = []
+    ingredients = {}
+    for product in snapshot.load('products'):
+        names = []
+        for item in product['ingredients']:
+            ingredient = item['ingredient']
+            names.append(ingredient['name'])
+            ingredients[ingredient['id']] = ingredient['name']
+        documents.append(product_document(
+            product['id'], product['name'], product['category_id'], product['category_name'],
+            names, product['description'],
+        ))
+    for category in snapshot.load('categories'):
+        documents.append(named_document('category', category['id'], category['name'], category['description']))
+    for ingredient_id, name in ingredients.items():
+        documents.append(named_document('ingredient', ingredient_id, name))
+    return documents
+
+
+catalog_index = IndexStore(lambda: versioning.version(*CATALOG_STAMPS), catalog_documents)
@@ -1,16 +1,22 @@
 from rest_framework import serializers
+from app.images import srcset
+from app.loaders import BatchLoadingMixin, BatchListSerializer, get_loader
+from app.serializers import SparseFieldsMixin
 from settings.models import Settings, OpeningHour
 from products.models import Category, Product, ProductIngredient, Ingredient, IngredientCategory
+from products.loaders import product_ingredients
 from django.conf import settings as django_settings
+from django.db.models import Prefetch
 
-class OpeningHourSerializer(serializers.ModelSerializer):
+class OpeningHourSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     day_of_week_display = serializers.CharField(source='get_day_of_week_display', read_only=True)
     class Meta:
         model = OpeningHour
         fields = ['id', 'day_of_week', 'day_of_week_display', 'opening_time', 'closing_time', 'is_open', 'is_holiday']
 
-class SettingsSerializer(serializers.ModelSerializer):
+class SettingsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     business_photo = serializers.SerializerMethodField()
+    business_photo_variants = serializers.SerializerMethodField()
     business_slug = serializers.CharField(read_only=True)
     opening_hours = OpeningHourSerializer(many=True, read_only=True)
 
@@ -22,6 +28,7 @@ class SettingsSerializer(serializers.ModelSerializer):
             'business_address',
             'business_email',
             'business_photo',
+            'business_photo_variants',
             'business_slug',
             'opening_hours',
             'delivery_available',
@@ -38,12 +45,15 @@ class SettingsSerializer(serializers.ModelSerializer):
             return f"{django_settings.MEDIA_URL}{obj.business_photo}"
         return None
 
-class CategorySerializer(serializers.ModelSerializer):
+    def get_business_photo_variants(self, obj):
+        return srcset(obj.business_photo_variants, obj.business_photo.storage, self.context.get('request'))
+
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'description']
 
-class ProductIngredientSerializer(serializers.ModelSerializer):
+class ProductIngredientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ingredient = serializers.SerializerMethodField()
 
     class Meta:
@@ -61,14 +71,32 @@ class ProductIngredientSerializer(serializers.ModelSerializer):
             }
         }
 
-class ProductSerializer(serializers.ModelSerializer):
+def with_ingredients(queryset):
+    """
+    Carrega a categoria e os ingredientes dos produtos em poucas consultas.
+    """
+    return queryset.select_related('category').prefetch_related(
+        Prefetch('ingredients', queryset=ProductIngredient.objects.select_related('ingredient', 'ingredient__category'))
+    )
+
+class ProductSerializer(BatchLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    category_id = serializers.IntegerField(read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     ingredients = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'image', 'category_name', 'is_active', 'ingredients']
+        fields = ['id', 'name', 'description', 'price', 'image', 'image_variants', 'category_id', 'category_name', 'is_active', 'ingredients']
+        expandable_fields = ('ingredients',)
+        list_serializer_class = BatchListSerializer
+
+    def register(self, instances):
+        if 'ingredients' in self.fields:
+            get_loader(self, product_ingredients, default=()).prime(
+                obj.pk for obj in instances if 'ingredients' not in getattr(obj, '_prefetched_objects_cache', {})
+            )
 
     def get_image(self, obj):
         if obj.image:
@@ -78,6 +106,13 @@ class ProductSerializer(serializers.ModelSerializer):
             return f"{django_settings.MEDIA_URL}{obj.image}"
         return None
 
+    def get_image_variants(self, obj):
+        return srcset(obj.image_variants, obj.image.storage, self.context.get('request'))
+
     def get_ingredients(self, obj):
-        product_ingredients = ProductIngredient.objects.filter(product=obj).select_related('ingredient', 'ingredient__category')
-        return ProductIngredientSerializer(product_ingredients, many=True).data 
\ No newline at end of file
+        # Usa os ingredientes pré-carregados (with_ingredients) quando disponíveis
+        if 'ingredients' in getattr(obj, '_prefetched_objects_cache', {}):
+            ingredients = obj.ingredients.all()
+        else:
+            ingredients = get_loader(self, product_ingredients, default=()).load(obj.pk)
+        return ProductIngredientSerializer(ingredients, many=True).data 
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Snapshot do cardápio compartilhado entre os workers via mmap.
+
+O catálogo da vitrine (categorias, produtos com preços e ingredientes,
+promoções) é serializado uma única vez em um arquivo binário compacto, com
+cada seção já em JSON. Cada worker mapeia o arquivo em modo somente leitura,
+então as páginas ficam no cache do sistema operacional e são compartilhadas
+por todos os processos; um worker recém-criado serve o cardápio sem
+precisar aquecer nada.
+
+Formato (little-endian):
+    cabeçalho   MAGIC (8 bytes) + número de seções (uint32)
+    seções      nome (16 bytes) + offset (uint64) + tamanho (uint64), cada
+    'meta'      JSON com a versão do catálogo e a data de geração
+    'categories', 'products', 'promotions'
+                listas JSON prontas para serem enviadas ao cliente
+
+A reconstrução grava um arquivo temporário e o troca de lugar com os.replace:
+quem já mapeou o arquivo antigo continua lendo-o normalmente, e a próxima
+consulta percebe o inode novo e mapeia a versão nova, sem locks entre leitores.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings as django_settings
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from app import versioning
+from products.models import Category, Product, ProductIngredient, Promotion
+from products.serializers import PromotionSerializer
+from products.signals import CATALOG_STAMPS
+from .serializers import CategorySerializer, ProductSerializer, with_ingredients
+
+MAGIC = b'CATSNAP1'
+HEADER = struct.Struct('<8sI')
+SECTION = struct.Struct('<16sQQ')
+
+
+def dumps(data):
+    """
+    Serializa em JSON compacto (bytes UTF-8).
+    """
+    return json.dumps(data, cls=JSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def snapshot_path():
+    return str(getattr(
+        django_settings, 'CATALOG_SNAPSHOT_PATH',
+        os.path.join(django_settings.BASE_DIR, 'var', 'catalog.snapshot')
+    ))
+
+
+def active_promotions():
+    product_ingredients = ProductIngredient.objects.select_related('ingredient', 'ingredient__category')
+    return Promotion.objects.filter(is_active=True).prefetch_related(
+        'items__product__category',
+        Prefetch('items__product__ingredients', queryset=product_ingredients),
+        'rewards__product__category',
+        Prefetch('rewards__product__ingredients', queryset=product_ingredients),
+    )
+
+
+def build_snapshot(path=None):
+    """
+    Gera o snapshot do catálogo a partir do banco e o publica atomicamente.
+    Retorna a versão gravada.
+    """
+    path = path or snapshot_path()
+    # A versão é lida antes das consultas: uma gravação no meio gera outra reconstrução
+    current = versioning.version(*CATALOG_STAMPS)
+
+    # Sem request no contexto, as URLs de mídia saem relativas à raiz (/media/...)
+    products = with_ingredients(Product.objects.filter(is_active=True)).order_by('created_at')
+    sections = [
+        ('meta', dumps({'version': current, 'built_at': timezone.now()})),
+        ('categories', dumps(CategorySerializer(Category.objects.filter(is_active=True), many=True).data)),
+        ('products', dumps(ProductSerializer(products, many=True).data)),
+        ('promotions', dumps(PromotionSerializer(active_promotions(), many=True).data)),
+    ]
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.catalog.')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            offset = HEADER.size + SECTION.size * len(sections)
+            tmp.write(HEADER.pack(MAGIC, len(sections)))
+            for name, content in sections:
+                tmp.write(SECTION.pack(name.encode('ascii'), offset, len(content)))
+                offset += len(content)
+            for _, content in sections:
+                tmp.write(content)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return current
+
+
+class CatalogSnapshot:
+    """
+    Leitura de um arquivo de snapshot mapeado em memória.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_file:
+            self.inode = os.fstat(snapshot_file.fileno()).st_ino
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo de snapshot inválido: {path}")
+        self.sections = {}
+        for number in range(count):
+            name, offset, length = SECTION.unpack_from(self._mmap, HEADER.size + number * SECTION.size)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = (offset, length)
+        self.meta = json.loads(self.raw('meta'))
+        self.version = self.meta['version']
+
+    def raw(self, name):
+        """
+        Retorna o conteúdo (JSON) de uma seção.
+        """
+        offset, length = self.sections[name]
+        return self._mmap[offset:offset + length]
+
+    def load(self, name):
+        return json.loads(self.raw(name))
+
+
+class SnapshotStore:
+    """
+    Mantém o snapshot mapeado no processo e o reconstrói quando a versão do
+    catálogo (carimbos de versão) muda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def _open(self, path):
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.inode == inode:
+            return snapshot
+        return CatalogSnapshot(path)
+
+    def get(self):
+        """
+        Retorna o snapshot da versão atual do catálogo.
+        """
+        current = versioning.version(*CATALOG_STAMPS)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == current:
+            return snapshot
+        with self._lock:
+            path = snapshot_path()
+            # Outro worker pode já ter publicado a versão atual
+            snapshot = self._open(path)
+            if snapshot is None or snapshot.version != current:
+                build_snapshot(path)
+                snapshot = self._open(path)
+            # O mapeamento antigo é liberado quando não houver mais referências
+            self._snapshot = snapshot
+        return snapshot
+
+
+snapshot_store = SnapshotStore()
+
+
+def get_snapshot():
+    """
+    Retorna o snapshot atual do catálogo (ver CatalogSnapshot).
+    """
+    return snapshot_store.get()
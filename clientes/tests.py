@@ -1,3 +1,449 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from settings.models import Settings
+
+from app import compression, response_cache
+from app.search import SearchIndex
+from app.testing import IsolatedTestCase
+from products.models import Category, Product, Ingredient, IngredientCategory, ProductIngredient
+from . import snapshot
+from .projections import ProductProjection
+from .serializers import ProductSerializer, with_ingredients
+
+
+class ProductProjectionTest(IsolatedTestCase):
+    """
+    A projeção da listagem de produtos deve gerar o mesmo JSON que o ProductSerializer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        burgers = Category.objects.create(name='Lanches')
+        drinks = Category.objects.create(name='Bebidas')
+        sauces = IngredientCategory.objects.create(name='Molhos')
+        cheese = Ingredient.objects.create(name='Queijo', price='3.50', category=sauces)
+        onion = Ingredient.objects.create(name='Cebola', price='1.00')
+        burger = Product.objects.create(name='X-Burguer', description='Pão e carne', price='25.90',
+                                        category=burgers, image='products/x.png', image_variants={
+                                            'source': 'products/x.png', 'width': 400, 'height': 300,
+                                            'placeholder': 'data:image/webp;base64,AAAA',
+                                            'png': [[160, 'products/x.160w.png'], [320, 'products/x.320w.png']],
+                                            'webp': [[160, 'products/x.160w.webp'], [320, 'products/x.320w.webp']],
+                                        })
+        Product.objects.create(name='Suco', description='', price='8.00', category=drinks)
+        Product.objects.create(name='Antigo', description='', price='1.00', category=drinks, is_active=False)
+        ProductIngredient.objects.create(product=burger, ingredient=cheese, group_name='Adicionais',
+                                         is_required=True, max_quantity=2)
+        ProductIngredient.objects.create(product=burger, ingredient=onion, group_name='Retirar')
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_matches_product_serializer(self):
+        queryset = with_ingredients(Product.objects.filter(is_active=True)).order_by('created_at')
+        self.assertEqual(
+            self.render(ProductProjection().serialize(queryset)),
+            self.render(ProductSerializer(queryset, many=True).data),
+        )
+
+    def test_list_endpoint(self):
+        for query in ('', '?category=%d' % Category.objects.get(name='Bebidas').pk):
+            response = APIClient().get('/api/clientes/products/' + query)
+            self.assertEqual(response.status_code, 200)
+            queryset = with_ingredients(Product.objects.filter(is_active=True)).order_by('created_at')
+            if query:
+                queryset = queryset.filter(category__name='Bebidas')
+            context = {'request': Request(response.wsgi_request)}
+            self.assertEqual(
+                self.render(response.data),
+                self.render(ProductSerializer(queryset, many=True, context=context).data),
+            )
+
+
+class CompressionTest(IsolatedTestCase):
+    """
+    As respostas devem sair comprimidas conforme o Accept-Encoding, e os
+    documentos em cache devem ser servidos com a variante já comprimida.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Settings.objects.create(business_name='Lanchonete', business_phone='1', business_address='Rua A, 1',
+                                business_email='loja@example.com', business_slug='lanchonete',
+                                opening_time=datetime.time(8), closing_time=datetime.time(22))
+        category = Category.objects.create(name='Lanches')
+        for i in range(10):
+            Product.objects.create(name=f'Produto {i}', description='Pão, carne e queijo', price='20.00',
+                                   category=category)
+
+    def get(self, url, encoding=None, **headers):
+        if encoding is not None:
+            headers['HTTP_ACCEPT_ENCODING'] = encoding
+        response = APIClient().get(url, HTTP_ACCEPT='application/json', **headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def content(self, response):
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def assertServedCompressed(self, url):
+        expected = self.get(url).content
+        first = self.get(url, 'gzip, deflate, br')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', first['Vary'])
+        self.assertEqual(gzip.decompress(first.content), expected)
+        # O acerto no cache usa a variante pronta, sem comprimir de novo
+        with mock.patch.object(compression, 'compress', side_effect=AssertionError('recomprimiu')):
+            second = self.get(url, 'gzip')
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(second.content), expected)
+        return second
+
+    def test_store_info(self):
+        response = self.assertServedCompressed('/api/clientes/store-info/')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        not_modified = APIClient().get('/api/clientes/store-info/', HTTP_IF_NONE_MATCH=response['ETag'],
+                                        HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_store_by_slug(self):
+        self.assertServedCompressed('/api/clientes/lanchonete/')
+
+    def test_bootstrap(self):
+        self.assertServedCompressed('/api/clientes/bootstrap/')
+
+    def test_cached_product_list(self):
+        self.assertServedCompressed('/api/clientes/products/')
+
+    def test_streaming_list(self):
+        expected = self.content(self.get('/api/products/products/'))
+        response = self.get('/api/products/products/', 'gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(self.content(response)), expected)
+
+    def test_negotiation(self):
+        for header in ('', 'identity', 'gzip;q=0', 'compress'):
+            response = self.get('/api/clientes/products/', header)
+            self.assertFalse(response.has_header('Content-Encoding'), header)
+            self.assertIn('Accept-Encoding', response['Vary'])
+        for header in ('*', 'br;q=0.5, gzip;q=0.8', 'GZIP'):
+            self.assertEqual(self.get('/api/clientes/products/', header)['Content-Encoding'], 'gzip', header)
+
+    def test_small_and_non_json_responses(self):
+        # Corpo pequeno demais para compensar
+        self.assertFalse(self.get('/api/clientes/store-status/', 'gzip').has_header('Content-Encoding'))
+        # HTML (API navegável) nunca é comprimido
+        response = APIClient().get('/api/clientes/products/', HTTP_ACCEPT='text/html', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class SearchIndexTest(IsolatedTestCase):
+    """
+    A busca não deve diferenciar acentos e deve completar a última palavra.
+    """
+
+    def document(self, pk, name, description='', type='product'):
+        return {'type': type, 'id': pk, 'name': name, 'fields': ((name, 4.0), (description, 1.0))}
+
+    def test_accent_folding_and_prefix(self):
+        index = SearchIndex()
+        index.update([
+            self.document(1, 'Pão de Queijo'),
+            self.document(2, 'X-Bacon', 'Pão, hambúrguer e bacon'),
+            self.document(3, 'Açaí'),
+        ])
+        self.assertEqual([r['id'] for r in index.search('PAO')], [1, 2])
+        self.assertEqual([r['id'] for r in index.search('x bac')], [2])
+        self.assertEqual([r['id'] for r in index.search('acai')], [3])
+        self.assertEqual(index.search('pao bacon'), [dict(id=2, type='product', name='X-Bacon', score=6.0)])
+        self.assertEqual(index.search('pizza'), [])
+        self.assertEqual(index.suggest('hamb'), ['hambúrguer'])
+        # Palavra completa (espaço no final) não é tratada como prefixo
+        self.assertEqual(index.search('ham '), [])
+
+    def test_incremental_update(self):
+        index = SearchIndex()
+        documents = [self.document(pk, f'Produto {pk}') for pk in range(5)]
+        self.assertEqual(index.update(documents), 5)
+        self.assertEqual(index.update(documents), 0)
+        documents[0] = self.document(0, 'Calabresa')
+        self.assertEqual(index.update(documents[:4]), 2)
+        self.assertEqual([r['id'] for r in index.search('calab')], [0])
+        self.assertEqual(index.search('4'), [])
+        # Palavras sem documentos saem da trie e das formas originais
+        self.assertEqual(index.trie.complete('calab'), ['calabresa'])
+        index.update([])
+        self.assertEqual((index.postings, index.surfaces, index.trie.root.children), ({}, {}, {}))
+
+
+class CatalogSearchTest(IsolatedTestCase):
+    """
+    A busca da vitrine deve usar o catálogo ativo e acompanhar as alterações.
+    """
+
+    def test_search_endpoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name='Lanches')
+            bacon = Ingredient.objects.create(name='Bacon', price='2.00')
+            product = Product.objects.create(name='X-Bacon', description='Pão e hambúrguer', price='20.00',
+                                             category=category)
+            ProductIngredient.objects.create(product=product, ingredient=bacon, group_name='Adicionais')
+            Product.objects.create(name='X-Bacon Antigo', description='', price='1.00', category=category,
+                                   is_active=False)
+
+        client = APIClient()
+        response = client.get('/api/clientes/products/search/', {'q': 'bac'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(r['type'], r['id']) for r in response.json()['results']],
+            [('ingredient', bacon.id), ('product', product.id)],
+        )
+        self.assertEqual(response.json()['suggestions'], ['bacon'])
+        response = client.get('/api/clientes/products/search/', {'q': 'hamburguer', 'type': 'category'})
+        self.assertEqual(response.json()['results'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'X-Tudo'
+            product.save()
+        results = client.get('/api/clientes/products/search/', {'q': 'tudo'}).json()['results']
+        self.assertEqual([r['id'] for r in results], [product.id])
+
+        self.assertEqual(client.get('/api/clientes/products/search/', {'q': 'x', 'limit': 0}).status_code, 400)
+
+
+class StoreDocumentTest(IsolatedTestCase):
+    """
+    Os documentos da loja ficam em cache pela versão das configurações.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings = Settings.objects.create(
+                business_name='Lanchonete', business_phone='1', business_address='Rua A, 1',
+                business_email='loja@example.com', business_slug='lanchonete',
+                opening_time=datetime.time(8), closing_time=datetime.time(22))
+        self.client = APIClient()
+
+    def test_cached_until_settings_change(self):
+        response = self.client.get('/api/clientes/store-info/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['business_name'], 'Lanchonete')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/clientes/store-info/').json(), response.json())
+            self.assertEqual(self.client.get('/api/clientes/lanchonete/').json(), response.json())
+            not_modified = self.client.get('/api/clientes/store-info/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings.business_name = 'Lanchonete do Zé'
+            self.settings.save()
+        response = self.client.get('/api/clientes/store-info/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['business_name'], 'Lanchonete do Zé')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_and_missing_slugs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Settings.objects.create(
+                business_name='Pizzaria', business_phone='2', business_address='Rua B, 2',
+                business_email='pizza@example.com', business_slug='pizzaria',
+                opening_time=datetime.time(18), closing_time=datetime.time(23))
+        self.assertEqual(self.client.get('/api/clientes/pizzaria/').json()['business_name'], 'Pizzaria')
+        self.assertEqual(self.client.get('/api/clientes/inexistente/').status_code, 404)
+        # Slugs inexistentes também ficam em cache
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/clientes/inexistente/').status_code, 404)
+
+    def test_not_configured(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings.delete()
+        self.assertEqual(self.client.get('/api/clientes/store-info/').status_code, 404)
+        self.assertEqual(self.client.get('/api/clientes/store-status/').status_code, 404)
+
+
+class BootstrapTest(IsolatedTestCase):
+    """
+    O documento de abertura da loja reúne configurações, estado e catálogo
+    ativo, e só muda de etag quando algum deles muda.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings = Settings.objects.create(
+                business_name='Lanchonete', business_phone='1', business_address='Rua A, 1',
+                business_email='loja@example.com', business_slug='lanchonete',
+                opening_time=datetime.time(8), closing_time=datetime.time(22))
+            self.category = Category.objects.create(name='Lanches')
+            self.product = Product.objects.create(name='X-Burguer', description='', price='20.00',
+                                                  category=self.category)
+            Product.objects.create(name='Antigo', description='', price='1.00', category=self.category,
+                                   is_active=False)
+        self.client = APIClient()
+
+    def get(self, **headers):
+        return self.client.get('/api/clientes/bootstrap/', **headers)
+
+    def test_document(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        document = response.json()
+        self.assertEqual(set(document), {'version', 'store', 'status', 'categories', 'products', 'promotions'})
+        self.assertEqual(document['store']['business_name'], 'Lanchonete')
+        self.assertEqual(set(document['status']), {'is_open', 'closes_at', 'next_open_at'})
+        self.assertEqual([c['name'] for c in document['categories']], ['Lanches'])
+        self.assertEqual([p['id'] for p in document['products']], [self.product.id])
+        self.assertEqual(document['promotions'], [])
+
+    def test_etag_follows_catalog_and_settings(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(0):
+            not_modified = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = '22.00'
+            self.product.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['products'][0]['price'], '22.00')
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings.business_name = 'Lanchonete do Zé'
+            self.settings.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['store']['business_name'], 'Lanchonete do Zé')
+
+    def test_not_configured(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings.delete()
+        self.assertEqual(self.get().status_code, 404)
+
+
+class ResponseCacheTest(IsolatedTestCase):
+    """
+    As respostas em cache devem ser invalidadas pelas tags das tabelas de que
+    dependem, e só por elas.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name='Lanches')
+            self.cheese = Ingredient.objects.create(name='Queijo', price='3.00')
+            self.burger = Product.objects.create(name='X-Burguer', description='', price='20.00', category=category)
+            self.juice = Product.objects.create(name='Suco', description='', price='8.00', category=category)
+            ProductIngredient.objects.create(product=self.burger, ingredient=self.cheese)
+        self.client = APIClient()
+        self.url = f'/api/clientes/products/{self.burger.pk}/'
+
+    def save(self, instance, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(instance, name, value)
+            instance.save()
+
+    def test_tags(self):
+        self.assertEqual(response_cache.tag_versions(['product']), response_cache.tag_versions(['product']))
+        before = response_cache.tag_versions(['product', 'product:1'])
+        response_cache.purge('product:1')
+        after = response_cache.tag_versions(['product', 'product:1'])
+        self.assertEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+
+    def test_detail_invalidation(self):
+        self.assertEqual(self.client.get(self.url).json()['price'], '20.00')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json()['price'], '20.00')
+        # Outro produto não invalida o detalhe
+        self.save(self.juice, price='9.00')
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        self.save(self.burger, price='22.00')
+        self.assertEqual(self.client.get(self.url).json()['price'], '22.00')
+        # Tabelas incluídas na representação também invalidam
+        self.save(self.cheese, name='Cheddar')
+        self.assertEqual(self.client.get(self.url).json()['ingredients'][0]['ingredient']['name'], 'Cheddar')
+
+    def test_list_invalidation(self):
+        self.assertEqual(len(self.client.get('/api/clientes/products/').json()), 2)
+        with self.assertNumQueries(0):
+            self.client.get('/api/clientes/products/')
+        self.save(self.juice, is_active=False)
+        self.assertEqual([p['id'] for p in self.client.get('/api/clientes/products/').json()], [self.burger.pk])
+
+
+class CatalogSnapshotTest(IsolatedTestCase):
+    """
+    O snapshot deve conter o catálogo ativo e ser reconstruído, por um único
+    processo, quando o catálogo muda.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Lanches')
+            Category.objects.create(name='Antigos', is_active=False)
+            self.product = Product.objects.create(name='X-Burguer', description='', price='20.00',
+                                                  category=self.category)
+            Product.objects.create(name='Antigo', description='', price='1.00', category=self.category,
+                                   is_active=False)
+
+    def test_sections(self):
+        directory = tempfile.mkdtemp(prefix='restaurant-snapshot-')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'catalog.snapshot')
+        version = snapshot.build_snapshot(path)
+        catalog = snapshot.CatalogSnapshot(path)
+        self.assertEqual(catalog.version, version)
+        self.assertEqual(set(catalog.sections), {'meta', 'categories', 'products', 'promotions'})
+        self.assertEqual([c['name'] for c in catalog.load('categories')], ['Lanches'])
+        products = with_ingredients(Product.objects.filter(is_active=True)).order_by('created_at')
+        self.assertEqual(catalog.raw('products'), snapshot.dumps(ProductSerializer(products, many=True).data))
+        self.assertEqual(catalog.load('promotions'), [])
+
+        with open(path, 'r+b') as snapshot_file:
+            snapshot_file.write(b'INVALIDO')
+        with self.assertRaises(ValueError):
+            snapshot.CatalogSnapshot(path)
+
+    def test_rebuilt_when_catalog_changes(self):
+        first = snapshot.get_snapshot()
+        with self.assertNumQueries(0):
+            self.assertIs(snapshot.get_snapshot(), first)
+            # Outro processo encontra o arquivo já publicado e não reconstrói
+            self.assertEqual(snapshot.SnapshotStore().get().inode, first.inode)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'X-Salada'
+            self.product.save()
+        second = snapshot.get_snapshot()
+        self.assertNotEqual(second.inode, first.inode)
+        self.assertEqual(second.load('products')[0]['name'], 'X-Salada')
+        # Quem ainda tem o mapeamento antigo continua lendo a versão anterior
+        self.assertEqual(first.load('products')[0]['name'], 'X-Burguer')
+
+    def test_management_command(self):
+        output = io.StringIO()
+        call_command('build_catalog_snapshot', stdout=output)
+        self.assertIn('Produtos no snapshot: 1', output.getvalue())
+        self.assertTrue(os.path.exists(snapshot.snapshot_path()))
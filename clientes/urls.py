@@ -9,5 +9,7 @@ router.register(r'products', views.ProductViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('store-info/', views.get_store_info, name='store-info'),
+    path('store-status/', views.get_store_status, name='store-status'),
+    path('bootstrap/', views.get_bootstrap, name='bootstrap'),
     path('<slug:business_slug>/', views.get_store_by_slug, name='store-by-slug'),
 ] 
\ No newline at end of file
@@ -1,26 +1,84 @@
-from django.shortcuts import render, get_object_or_404
+from django.http import HttpResponse
+from django.shortcuts import render
 from rest_framework import viewsets
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.pagination import PageNumberPagination
-from settings.models import Settings
+from settings.cache import get_settings, get_schedule
 from products.models import Category, Product
-from .serializers import SettingsSerializer, CategorySerializer, ProductSerializer
+from .serializers import CategorySerializer, ProductSerializer, with_ingredients
+from app.compression import precompressed_response, renders_compact_json
+from app.conditional import ConditionalMixin, etag_matches
+from app.response_cache import cache_response
+from app.search import search_request
+from app.serializers import SparseFields
+from app.projection import ProjectionListMixin
+from products.signals import CATALOG_STAMPS
+from .cache import store_document, bootstrap_document
+from .projections import ProductProjection
+from .search import catalog_index
 
 # Create your views here.
 
+def document_response(request, document):
+    """
+    Responde com um documento em cache (dados, etag, variantes comprimidas),
+    ou 304 se o cliente já o tiver.
+    """
+    if document is None:
+        return Response({'error': 'Configurações não encontradas'}, status=404)
+    data, etag, variants = document
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request, etag):
+        return Response(status=304, headers=headers)
+    if renders_compact_json(request):
+        response = precompressed_response(request, variants, headers=headers)
+        if response is not None:
+            return response
+    return Response(data, headers=headers)
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_store_info(request):
     """Retorna as informações da loja"""
     try:
-        settings = Settings.objects.first()
-        if not settings:
+        return document_response(request, store_document(request))
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_store_status(request):
+    """Retorna se a loja está aberta agora e quando fecha/abre"""
+    try:
+        if get_settings() is None:
+            return Response({'error': 'Configurações não encontradas'}, status=404)
+        return Response(get_schedule().status())
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_bootstrap(request):
+    """
+    Retorna em um único documento tudo o que a loja precisa ao abrir:
+    informações, estado (aberta/fechada), categorias, produtos com
+    ingredientes e promoções ativas. Use If-None-Match para revalidar.
+    """
+    try:
+        document = bootstrap_document()
+        if document is None:
             return Response({'error': 'Configurações não encontradas'}, status=404)
-        
-        serializer = SettingsSerializer(settings, context={'request': request})
-        return Response(serializer.data)
+        body, etag, variants = document
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag_matches(request, etag):
+            return Response(status=304, headers=headers)
+        response = precompressed_response(request, variants, headers=headers)
+        if response is not None:
+            return response
+        # O corpo já é JSON pronto (vindo do snapshot), então não passa pelo renderer
+        return HttpResponse(body, content_type='application/json', headers=headers)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
@@ -29,35 +87,52 @@ def get_store_info(request):
 def get_store_by_slug(request, business_slug):
     """Retorna as informações da loja pelo slug"""
     try:
-        settings = get_object_or_404(Settings, business_slug=business_slug)
-        serializer = SettingsSerializer(settings, context={'request': request})
-        return Response(serializer.data)
+        return document_response(request, store_document(request, business_slug))
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
+# Tabelas incluídas na representação de um produto para a vitrine
+PRODUCT_TAGS = ('category', 'productingredient', 'ingredient', 'ingredientcategory')
+
 class NoPagination(PageNumberPagination):
     page_size = None
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ConditionalMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet para listar categorias"""
     permission_classes = [AllowAny]
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
+    conditional_stamps = CATALOG_STAMPS
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+    @cache_response(ttl=300, tags=('category',))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(ttl=300, tags=('category:{pk}',))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class ProductViewSet(ConditionalMixin, ProjectionListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet para listar produtos"""
     permission_classes = [AllowAny]
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
+    projection_class = ProductProjection
+    conditional_stamps = CATALOG_STAMPS
     pagination_class = NoPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        # Os ingredientes só são carregados quando saem na resposta (?fields=/?expand=)
+        if SparseFields.from_request(self.request).includes('ingredients', expandable=True):
+            queryset = with_ingredients(queryset)
+        else:
+            queryset = queryset.select_related('category')
         category_id = self.request.query_params.get('category', None)
         if category_id:
             queryset = queryset.filter(category_id=category_id)
@@ -67,3 +142,23 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
+
+    @cache_response(ttl=300, tags=PRODUCT_TAGS + ('product',))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(ttl=300, tags=PRODUCT_TAGS + ('product:{pk}',))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Busca no cardápio (produtos, categorias e ingredientes) sem diferenciar
+        acentos, completando a última palavra digitada.
+        Parâmetros: q, type (product,category,ingredient) e limit.
+        """
+        try:
+            return Response(search_request(catalog_index, request))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
@@ -0,0 +1,238 @@
+import atexit
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings as django_settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from orders.models import OrderItem
+from products.models import Product
+from .models import ProductSketch
+from .sketches import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+MINUTE = '5m'
+DAY = 'day'
+BUCKET_MINUTES = 5
+WEEK_DAYS = 7
+MINUTE_RETENTION = timedelta(hours=2)
+WINDOWS = ('hour', 'today', 'week')
+
+
+def minute_bucket(moment):
+    """
+    Retorna o início do intervalo de 5 minutos que contém `moment`.
+    """
+    return moment.replace(minute=moment.minute - moment.minute % BUCKET_MINUTES, second=0, microsecond=0)
+
+
+def day_bucket(moment):
+    """
+    Retorna a meia-noite (no fuso do projeto) do dia que contém `moment`.
+    """
+    return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+NAME_PREFIX = 'name:'
+
+
+def product_key(product_id, product_name):
+    """
+    Chave do produto nos sketches: o id, para que renomear o produto não
+    divida as contagens. Itens sem produto (removido ou antigo) usam o nome.
+    """
+    return str(product_id) if product_id is not None else NAME_PREFIX + product_name
+
+
+def resolve_products(keys):
+    """
+    Retorna {chave: (id do produto, nome atual)} para chaves de product_key.
+    """
+    ids = {int(key) for key in keys if key.isdigit()}
+    names = dict(Product.objects.filter(pk__in=ids).values_list('id', 'name')) if ids else {}
+    resolved = {}
+    for key in keys:
+        if key.isdigit():
+            product_id = int(key)
+            resolved[key] = (product_id, names.get(product_id, f'Produto #{product_id}'))
+        else:
+            # Sketches gravados antes das chaves por id usam o nome puro
+            resolved[key] = (None, key.removeprefix(NAME_PREFIX))
+    return resolved
+
+
+class TopProductsTracker:
+    """
+    Mantém os produtos mais vendidos em tempo real com sketches Space-Saving.
+
+    Cada processo acumula os itens novos em sketches locais e, no máximo
+    DASHBOARD_SKETCH_FLUSH_SECONDS depois do primeiro item pendente, uma
+    thread de fundo combina esses sketches com os que estão salvos no banco
+    (ProductSketch). O que ainda estiver pendente é gravado quando o processo
+    termina normalmente. Com intervalo 0, cada item é gravado na hora. Como
+    os sketches são combináveis, vários workers podem gravar nos mesmos
+    buckets sem perder contagens.
+
+    As consultas não gravam nada: combinam os sketches do banco com as
+    contagens ainda pendentes deste processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        atexit.register(self._flush_quietly)
+
+    @property
+    def capacity(self):
+        return getattr(django_settings, 'DASHBOARD_TOP_PRODUCTS_CAPACITY', 100)
+
+    @property
+    def flush_seconds(self):
+        return getattr(django_settings, 'DASHBOARD_SKETCH_FLUSH_SECONDS', 30)
+
+    def _sketch(self, sketches, key):
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = SpaceSaving(capacity=self.capacity)
+        return sketch
+
+    def record(self, product_id, product_name, quantity=1, moment=None):
+        """
+        Registra a venda de `quantity` unidades de um produto.
+        """
+        moment = moment or timezone.now()
+        key = product_key(product_id, product_name)
+        with self._lock:
+            self._sketch(self._pending, (MINUTE, minute_bucket(moment))).add(key, quantity)
+            self._sketch(self._pending, (DAY, day_bucket(moment))).add(key, quantity)
+            immediate = self.flush_seconds <= 0
+            if not immediate:
+                self._schedule()
+        if immediate:
+            self._flush_quietly()
+
+    def _schedule(self):
+        # Chamado com a trava: um único timer pendente por processo
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_seconds, self._flush_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning("Erro ao persistir sketches de produtos: %s", e)
+
+    def _flush_later(self):
+        # Roda na thread do timer: as conexões abertas aqui são só desta thread
+        with self._lock:
+            self._timer = None
+        try:
+            self._flush_quietly()
+        finally:
+            connections.close_all()
+        with self._lock:
+            # Contagens devolvidas por uma falha são tentadas de novo no próximo ciclo
+            if self._pending:
+                self._schedule()
+
+    def flush(self, now=None):
+        """
+        Persiste os sketches locais no banco e remove buckets expirados.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        now = now or timezone.now()
+        try:
+            with transaction.atomic():
+                for (granularity, bucket_start), sketch in pending.items():
+                    row, _ = ProductSketch.objects.select_for_update().get_or_create(
+                        granularity=granularity,
+                        bucket_start=bucket_start
+                    )
+                    stored = SpaceSaving.from_dict(row.counters, capacity=self.capacity)
+                    row.counters = stored.merge(sketch).to_dict()
+                    row.save(update_fields=['counters', 'updated_at'])
+                self._prune(now)
+        except Exception:
+            # Devolve as contagens para a próxima tentativa
+            with self._lock:
+                for key, sketch in pending.items():
+                    self._sketch(self._pending, key).merge(sketch)
+            raise
+
+    def _prune(self, now):
+        ProductSketch.objects.filter(granularity=MINUTE, bucket_start__lt=now - MINUTE_RETENTION).delete()
+        ProductSketch.objects.filter(
+            granularity=DAY,
+            bucket_start__lt=day_bucket(now - timedelta(days=WEEK_DAYS - 1))
+        ).delete()
+
+    def _window(self, window, now):
+        """
+        Retorna (granularidade, início do primeiro bucket) da janela.
+        """
+        if window == 'hour':
+            return MINUTE, minute_bucket(now - timedelta(hours=1))
+        if window == 'today':
+            return DAY, day_bucket(now)
+        return DAY, day_bucket(now - timedelta(days=WEEK_DAYS - 1))
+
+    def top(self, window='today', limit=10, now=None):
+        """
+        Retorna os produtos mais vendidos na janela como
+        (id do produto, nome, quantidade, erro). O id é None para itens sem produto.
+        """
+        if window not in WINDOWS:
+            raise ValueError(f"Janela inválida: {window}")
+        granularity, since = self._window(window, now or timezone.now())
+        with self._lock:
+            pending = [
+                sketch.to_dict() for (kind, bucket_start), sketch in self._pending.items()
+                if kind == granularity and bucket_start >= since
+            ]
+        rows = ProductSketch.objects.filter(granularity=granularity, bucket_start__gte=since)
+
+        merged = SpaceSaving(capacity=self.capacity)
+        for counters in list(rows.values_list('counters', flat=True)) + pending:
+            merged.merge(SpaceSaving.from_dict(counters, capacity=self.capacity))
+        ranked = merged.top(limit)
+        products = resolve_products([key for key, _, _ in ranked])
+        return [products[key] + (count, error) for key, count, error in ranked]
+
+    def rebuild(self, now=None):
+        """
+        Reconstrói todos os sketches a partir do histórico de itens de pedido.
+        """
+        now = now or timezone.now()
+        since = day_bucket(now - timedelta(days=WEEK_DAYS - 1))
+        minute_since = now - MINUTE_RETENTION
+        sketches = {}
+        items = OrderItem.objects.filter(created_at__gte=since).values_list(
+            'product_id', 'product_name', 'quantity', 'created_at'
+        )
+        for product_id, product_name, quantity, created_at in items.iterator():
+            key = product_key(product_id, product_name)
+            self._sketch(sketches, (DAY, day_bucket(created_at))).add(key, quantity)
+            if created_at >= minute_since:
+                self._sketch(sketches, (MINUTE, minute_bucket(created_at))).add(key, quantity)
+
+        with self._lock:
+            self._pending = {}
+        with transaction.atomic():
+            ProductSketch.objects.all().delete()
+            ProductSketch.objects.bulk_create([
+                ProductSketch(granularity=granularity, bucket_start=bucket_start, counters=sketch.to_dict())
+                for (granularity, bucket_start), sketch in sketches.items()
+            ])
+        return len(sketches)
+
+
+product_tracker = TopProductsTracker()
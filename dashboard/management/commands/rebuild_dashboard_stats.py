@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from dashboard.live import product_tracker
+from dashboard.rollups import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói as estatísticas pré-calculadas do dashboard a partir do histórico de pedidos'
+
+    def handle(self, *args, **options):
+        days = rebuild_daily_stats()
+        self.stdout.write(f'Estatísticas diárias reconstruídas: {days} dias')
+
+        buckets = product_tracker.rebuild()
+        self.stdout.write(f'Sketches de produtos reconstruídos: {buckets} intervalos')
+
+        self.stdout.write(self.style.SUCCESS('Estatísticas do dashboard reconstruídas com sucesso!'))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('5m', '5 minutos'), ('day', 'Dia')], max_length=5, verbose_name='Granularidade')),
+                ('bucket_start', models.DateTimeField(verbose_name='Início do Intervalo')),
+                ('counters', models.JSONField(default=dict, verbose_name='Contadores')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sketch de Produtos',
+                'verbose_name_plural': 'Sketches de Produtos',
+                'ordering': ['-bucket_start'],
+                'unique_together': {('granularity', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_productsketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailystats',
+            name='customers_hll',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='Sketch de Clientes Distintos'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_promotion_image_alter_promotion_name_and_more'),
+        ('dashboard', '0003_dailystats_customers_hll'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('ingredient_name', models.CharField(max_length=100, verbose_name='Nome do Ingrediente')),
+                ('added_count', models.PositiveIntegerField(default=0, verbose_name='Vezes Adicionado')),
+                ('removed_count', models.PositiveIntegerField(default=0, verbose_name='Vezes Removido')),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Receita Total')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ingredient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_stats', to='products.ingredient', verbose_name='Ingrediente')),
+            ],
+            options={
+                'verbose_name': 'Estatística de Ingrediente',
+                'verbose_name_plural': 'Estatísticas de Ingredientes',
+                'ordering': ['-date', '-added_count'],
+                'unique_together': {('date', 'ingredient')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_ingredientstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentMethodStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('hour_start', models.DateTimeField(verbose_name='Início da Hora')),
+                ('payment_code', models.CharField(choices=[('cash', 'Dinheiro'), ('pix', 'Pix'), ('credit_card', 'Cartão de Crédito'), ('debit_card', 'Cartão de Débito'), ('card', 'Cartão'), ('voucher', 'Vale-Refeição'), ('other', 'Outros'), ('unknown', 'Não Informado')], max_length=20, verbose_name='Forma de Pagamento')),
+                ('total_orders', models.PositiveIntegerField(default=0, verbose_name='Total de Pedidos')),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Receita Total')),
+                ('cash_received', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Valor Recebido')),
+                ('change_given', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Troco Devolvido')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estatística de Forma de Pagamento',
+                'verbose_name_plural': 'Estatísticas de Formas de Pagamento',
+                'ordering': ['-hour_start'],
+                'indexes': [models.Index(fields=['date', 'payment_code'], name='dashboard_p_date_428b1e_idx')],
+                'unique_together': {('hour_start', 'payment_code')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_paymentmethodstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailystats',
+            name='items_histogram',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Histograma de Itens por Pedido'),
+        ),
+        migrations.AddField(
+            model_name='dailystats',
+            name='ticket_histogram',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Histograma do Valor dos Pedidos'),
+        ),
+    ]
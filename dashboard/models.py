@@ -1,5 +1,6 @@
 from django.db import models
 from orders.models import Order
+from products.models import Ingredient
 
 class DailyStats(models.Model):
     """
@@ -10,6 +11,9 @@ class DailyStats(models.Model):
     total_orders = models.PositiveIntegerField(default=0, verbose_name='Total de Pedidos')
     total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Receita Total')
     average_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Ticket Médio')
+    customers_hll = models.BinaryField(default=b'', blank=True, verbose_name='Sketch de Clientes Distintos')
+    ticket_histogram = models.JSONField(default=dict, blank=True, verbose_name='Histograma do Valor dos Pedidos')
+    items_histogram = models.JSONField(default=dict, blank=True, verbose_name='Histograma de Itens por Pedido')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -63,3 +67,89 @@ class CategoryStats(models.Model):
 
     def __str__(self):
         return f"{self.category_name} - {self.period_start} até {self.period_end}"
+
+class IngredientStats(models.Model):
+    """
+    Modelo que armazena o consumo diário de cada ingrediente.
+    Mantido incrementalmente a cada pedido, evitando o join completo
+    OrderItemIngredient -> OrderItem -> Order nos relatórios de compras.
+    """
+    date = models.DateField(verbose_name='Data')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_stats', verbose_name='Ingrediente')
+    ingredient_name = models.CharField(max_length=100, verbose_name='Nome do Ingrediente')
+    added_count = models.PositiveIntegerField(default=0, verbose_name='Vezes Adicionado')
+    removed_count = models.PositiveIntegerField(default=0, verbose_name='Vezes Removido')
+    total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Receita Total')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estatística de Ingrediente'
+        verbose_name_plural = 'Estatísticas de Ingredientes'
+        unique_together = ['date', 'ingredient']
+        ordering = ['-date', '-added_count']
+
+    def __str__(self):
+        return f"{self.ingredient_name} - {self.date}"
+
+class PaymentMethodStats(models.Model):
+    """
+    Modelo que armazena a receita por forma de pagamento em intervalos de uma hora.
+    Usado no relatório de formas de pagamento e no fechamento de caixa.
+    """
+    PAYMENT_CODE_CHOICES = [
+        ('cash', 'Dinheiro'),
+        ('pix', 'Pix'),
+        ('credit_card', 'Cartão de Crédito'),
+        ('debit_card', 'Cartão de Débito'),
+        ('card', 'Cartão'),
+        ('voucher', 'Vale-Refeição'),
+        ('other', 'Outros'),
+        ('unknown', 'Não Informado'),
+    ]
+
+    date = models.DateField(verbose_name='Data')
+    hour_start = models.DateTimeField(verbose_name='Início da Hora')
+    payment_code = models.CharField(max_length=20, choices=PAYMENT_CODE_CHOICES, verbose_name='Forma de Pagamento')
+    total_orders = models.PositiveIntegerField(default=0, verbose_name='Total de Pedidos')
+    total_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Receita Total')
+    cash_received = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Valor Recebido')
+    change_given = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Troco Devolvido')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estatística de Forma de Pagamento'
+        verbose_name_plural = 'Estatísticas de Formas de Pagamento'
+        unique_together = ['hour_start', 'payment_code']
+        indexes = [models.Index(fields=['date', 'payment_code'])]
+        ordering = ['-hour_start']
+
+    def __str__(self):
+        return f"{self.get_payment_code_display()} - {self.hour_start}"
+
+class ProductSketch(models.Model):
+    """
+    Modelo que armazena sketches Space-Saving dos produtos mais vendidos.
+    Cada linha cobre um intervalo (bucket) de 5 minutos ou de um dia, e as
+    janelas do dashboard são respondidas combinando alguns buckets.
+    """
+    GRANULARITY_CHOICES = [
+        ('5m', '5 minutos'),
+        ('day', 'Dia'),
+    ]
+
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES, verbose_name='Granularidade')
+    bucket_start = models.DateTimeField(verbose_name='Início do Intervalo')
+    counters = models.JSONField(default=dict, verbose_name='Contadores')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Sketch de Produtos'
+        verbose_name_plural = 'Sketches de Produtos'
+        unique_together = ['granularity', 'bucket_start']
+        ordering = ['-bucket_start']
+
+    def __str__(self):
+        return f"{self.get_granularity_display()} - {self.bucket_start}"
@@ -0,0 +1,413 @@
+"""
+Manutenção incremental das estatísticas diárias (DailyStats).
+
+Cada pedido é contabilizado uma única vez, depois do commit da sua criação,
+e as mesmas funções são usadas para reconstruir as estatísticas a partir do
+histórico completo de pedidos.
+
+Pedidos cancelados não entram nas estatísticas. Como os sketches de
+clientes e os histogramas não permitem subtrair um pedido, quando um pedido
+é cancelado (ou deixa de ser) ou removido, o dia dele é recalculado inteiro
+com rebuild_day.
+"""
+import re
+import unicodedata
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from orders.models import Order, OrderItemIngredient
+from .models import DailyStats, IngredientStats, PaymentMethodStats
+from .sketches import HyperLogLog, LogHistogram
+
+
+CANCELLED = 'cancelled'
+
+
+def counted_orders():
+    """
+    Pedidos que entram nas estatísticas (todos, menos os cancelados).
+    """
+    return Order.objects.exclude(status=CANCELLED)
+
+
+def customer_key(phone):
+    """
+    Normaliza o telefone do cliente para ser usado como identidade.
+    Mantém só os dígitos e remove o código do país (55).
+    """
+    digits = ''.join(ch for ch in phone or '' if ch.isdigit())
+    if len(digits) >= 12 and digits.startswith('55'):
+        digits = digits[2:]
+    return digits
+
+
+def order_rows(queryset):
+    """
+    Retorna os dados de cada pedido usados pelas estatísticas diárias.
+    O id agrupa a soma dos itens por pedido: sem ele, pedidos com os mesmos
+    valores nas outras colunas virariam uma linha só.
+    """
+    return queryset.values(
+        'id', 'created_at', 'total_amount', 'customer_phone', 'payment_method', 'change_amount',
+        client_phone=F('client_order__customer_phone')
+    ).annotate(item_count=Sum('items__quantity'))
+
+
+def apply_order(stats, row):
+    """
+    Soma um pedido (linha de `order_rows`) nas estatísticas de um dia.
+    """
+    stats.total_orders += 1
+    stats.total_revenue = Decimal(stats.total_revenue) + (row['total_amount'] or 0)
+    stats.average_order_value = (stats.total_revenue / stats.total_orders).quantize(Decimal('0.01'))
+
+    key = customer_key(row['client_phone'] or row['customer_phone'])
+    if key:
+        customers = HyperLogLog.from_bytes(stats.customers_hll)
+        customers.add(key)
+        stats.customers_hll = customers.to_bytes()
+
+    tickets = LogHistogram.from_dict(stats.ticket_histogram)
+    tickets.add(row['total_amount'] or 0)
+    stats.ticket_histogram = tickets.to_dict()
+
+    items = LogHistogram.from_dict(stats.items_histogram)
+    items.add(row['item_count'] or 0)
+    stats.items_histogram = items.to_dict()
+
+
+# Palavras-chave (sem acento) de cada forma de pagamento, na ordem de prioridade
+PAYMENT_KEYWORDS = [
+    ('pix', ('pix',)),
+    ('cash', ('dinheiro', 'cash', 'especie')),
+    ('voucher', ('vale', 'voucher', 'refeicao', 'alimentacao', 'vr', 'va')),
+    ('credit_card', ('credito', 'credit')),
+    ('debit_card', ('debito', 'debit')),
+    ('card', ('cartao', 'card', 'maquininha')),
+]
+
+
+def normalize_payment_method(value):
+    """
+    Converte a forma de pagamento digitada no pedido para um código fixo
+    (ver PaymentMethodStats.PAYMENT_CODE_CHOICES).
+    """
+    text = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode().lower()
+    tokens = re.findall(r'[a-z]+', text)
+    if not tokens:
+        return 'unknown'
+    for code, keywords in PAYMENT_KEYWORDS:
+        for token in tokens:
+            if any(token == keyword or (len(keyword) > 3 and token.startswith(keyword)) for keyword in keywords):
+                return code
+    return 'other'
+
+
+def hour_bucket(moment):
+    """
+    Retorna o início da hora (no fuso do projeto) que contém `moment`.
+    """
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def apply_payment(stats, row):
+    """
+    Soma um pedido (linha de `order_rows`) na estatística da sua forma de pagamento.
+    Em dinheiro, 'change_amount' é o valor entregue pelo cliente ("troco para"),
+    então o troco devolvido é a diferença para o total do pedido.
+    """
+    total = row['total_amount'] or Decimal('0')
+    received = max(row['change_amount'] or total, total)
+    stats.total_orders += 1
+    stats.total_revenue = Decimal(stats.total_revenue) + total
+    stats.cash_received = Decimal(stats.cash_received) + received
+    stats.change_given = Decimal(stats.change_given) + (received - total)
+
+
+def ingredient_rows(queryset):
+    """
+    Retorna as personalizações de ingredientes usadas no consumo diário.
+    """
+    return queryset.values(
+        'ingredient_id', 'is_added', 'price',
+        ingredient_name=F('ingredient__name'),
+        quantity=F('order_item__quantity'),
+        ordered_at=F('order_item__order__created_at')
+    )
+
+
+def apply_ingredient(stats, row):
+    """
+    Soma uma personalização (linha de `ingredient_rows`) no consumo do ingrediente.
+    A quantidade do item multiplica o consumo; a receita segue o preço
+    gravado no pedido, como em OrderItemSerializer.get_total_price.
+    """
+    if row['is_added']:
+        stats.added_count += row['quantity']
+        stats.total_revenue = Decimal(stats.total_revenue) + (row['price'] or 0)
+    else:
+        stats.removed_count += row['quantity']
+
+
+def record_order(order_id):
+    """
+    Contabiliza um pedido recém-criado nas estatísticas do seu dia.
+    """
+    row = order_rows(counted_orders().filter(pk=order_id).order_by('pk')).first()
+    if row is None:
+        return
+    with transaction.atomic():
+        stats, _ = DailyStats.objects.select_for_update().get_or_create(
+            date=timezone.localdate(row['created_at'])
+        )
+        apply_order(stats, row)
+        stats.save()
+
+        payment = PaymentMethodStats(date=stats.date)
+        apply_payment(payment, row)
+        payment_stats, _ = PaymentMethodStats.objects.get_or_create(
+            hour_start=hour_bucket(row['created_at']),
+            payment_code=normalize_payment_method(row['payment_method']),
+            defaults={'date': stats.date}
+        )
+        PaymentMethodStats.objects.filter(pk=payment_stats.pk).update(
+            total_orders=F('total_orders') + payment.total_orders,
+            total_revenue=F('total_revenue') + payment.total_revenue,
+            cash_received=F('cash_received') + payment.cash_received,
+            change_given=F('change_given') + payment.change_given
+        )
+
+        consumption = {}
+        customizations = OrderItemIngredient.objects.filter(order_item__order_id=order_id)
+        for ingredient in ingredient_rows(customizations):
+            delta = consumption.get(ingredient['ingredient_id'])
+            if delta is None:
+                delta = consumption[ingredient['ingredient_id']] = IngredientStats(
+                    ingredient_id=ingredient['ingredient_id'],
+                    ingredient_name=ingredient['ingredient_name']
+                )
+            apply_ingredient(delta, ingredient)
+
+        for delta in consumption.values():
+            ingredient_stats, _ = IngredientStats.objects.get_or_create(
+                date=stats.date,
+                ingredient_id=delta.ingredient_id,
+                defaults={'ingredient_name': delta.ingredient_name}
+            )
+            IngredientStats.objects.filter(pk=ingredient_stats.pk).update(
+                added_count=F('added_count') + delta.added_count,
+                removed_count=F('removed_count') + delta.removed_count,
+                total_revenue=F('total_revenue') + delta.total_revenue
+            )
+
+
+def aggregate(orders):
+    """
+    Calcula as estatísticas diárias, por forma de pagamento e de ingredientes
+    dos pedidos de `orders`. Retorna as três listas de models, sem gravar.
+    """
+    days = {}
+    payments = {}
+    for row in order_rows(orders.order_by()).iterator():
+        day = timezone.localdate(row['created_at'])
+        stats = days.get(day)
+        if stats is None:
+            stats = days[day] = DailyStats(date=day)
+        apply_order(stats, row)
+
+        key = (hour_bucket(row['created_at']), normalize_payment_method(row['payment_method']))
+        payment = payments.get(key)
+        if payment is None:
+            payment = payments[key] = PaymentMethodStats(date=day, hour_start=key[0], payment_code=key[1])
+        apply_payment(payment, row)
+
+    consumption = {}
+    customizations = OrderItemIngredient.objects.filter(order_item__order__in=orders).order_by()
+    for row in ingredient_rows(customizations).iterator():
+        key = (timezone.localdate(row['ordered_at']), row['ingredient_id'])
+        stats = consumption.get(key)
+        if stats is None:
+            stats = consumption[key] = IngredientStats(
+                date=key[0],
+                ingredient_id=row['ingredient_id'],
+                ingredient_name=row['ingredient_name']
+            )
+        apply_ingredient(stats, row)
+    return list(days.values()), list(payments.values()), list(consumption.values())
+
+
+def replace_stats(days, payments, consumption, date=None):
+    """
+    Troca as estatísticas gravadas (todas, ou só as da data `date`) pelas calculadas.
+    """
+    rows = {'date': date} if date is not None else {}
+    DailyStats.objects.filter(**rows).delete()
+    DailyStats.objects.bulk_create(days)
+    PaymentMethodStats.objects.filter(**rows).delete()
+    PaymentMethodStats.objects.bulk_create(payments)
+    IngredientStats.objects.filter(**rows).delete()
+    IngredientStats.objects.bulk_create(consumption)
+
+
+def rebuild_daily_stats():
+    """
+    Recalcula todas as estatísticas diárias a partir do histórico de pedidos.
+    """
+    days, payments, consumption = aggregate(counted_orders())
+    with transaction.atomic():
+        replace_stats(days, payments, consumption)
+    return len(days)
+
+
+def rebuild_day(date):
+    """
+    Recalcula as estatísticas de um dia, depois que um pedido dele foi
+    cancelado, reativado ou removido.
+    """
+    start = timezone.make_aware(datetime.combine(date, time.min))
+    with transaction.atomic():
+        # Trava o dia contra record_order enquanto ele é recalculado
+        list(DailyStats.objects.select_for_update().filter(date=date))
+        orders = counted_orders().filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+        replace_stats(*aggregate(orders), date=date)
+
+
+def unique_customers(start, end):
+    """
+    Retorna o número aproximado de clientes distintos entre `start` e `end`.
+    """
+    customers = HyperLogLog()
+    sketches = DailyStats.objects.filter(date__gte=start, date__lte=end).values_list('customers_hll', flat=True)
+    for data in sketches:
+        customers.merge(HyperLogLog.from_bytes(data))
+    return customers.count()
+
+
+INGREDIENT_ORDERING = {
+    'added': '-added',
+    'removed': '-removed',
+    'revenue': '-revenue',
+}
+
+
+def ingredient_consumption(start, end, order_by='added', limit=None):
+    """
+    Retorna o consumo de cada ingrediente entre `start` e `end`,
+    ordenado por vezes adicionado, vezes removido ou receita.
+    """
+    rows = IngredientStats.objects.filter(date__gte=start, date__lte=end).values('ingredient_id').annotate(
+        name=Max('ingredient_name'),
+        added=Sum('added_count'),
+        removed=Sum('removed_count'),
+        revenue=Sum('total_revenue')
+    ).order_by(INGREDIENT_ORDERING[order_by], 'name')
+    if limit:
+        rows = rows[:limit]
+    return [
+        {
+            'ingredient_id': row['ingredient_id'],
+            'ingredient_name': row['name'],
+            'added_count': row['added'],
+            'removed_count': row['removed'],
+            'total_revenue': row['revenue']
+        }
+        for row in rows
+    ]
+
+
+def _distribution(histogram, percentiles, as_integer=False):
+    def value(number):
+        if number is None:
+            return None
+        return int(round(number)) if as_integer else round(number, 2)
+
+    return {
+        'percentiles': {f"p{p:g}": value(histogram.quantile(p / 100)) for p in percentiles},
+        'histogram': [
+            {'lower': value(lower), 'upper': value(upper), 'count': count}
+            for lower, upper, count in histogram.buckets()
+        ]
+    }
+
+
+def order_distribution(start, end, percentiles=(50, 90, 99)):
+    """
+    Retorna percentis e histograma do valor dos pedidos e da quantidade de
+    itens por pedido entre `start` e `end`, combinando os histogramas diários.
+    """
+    tickets = LogHistogram()
+    items = LogHistogram()
+    rows = DailyStats.objects.filter(date__gte=start, date__lte=end).values_list(
+        'ticket_histogram', 'items_histogram'
+    )
+    for ticket_histogram, items_histogram in rows:
+        tickets.merge(LogHistogram.from_dict(ticket_histogram))
+        items.merge(LogHistogram.from_dict(items_histogram))
+    return {
+        'total_orders': tickets.total,
+        'ticket': _distribution(tickets, percentiles),
+        'items': _distribution(items, percentiles, as_integer=True)
+    }
+
+
+def _payment_breakdown(rows):
+    labels = dict(PaymentMethodStats.PAYMENT_CODE_CHOICES)
+    rows = rows.values('payment_code').annotate(
+        orders=Sum('total_orders'),
+        revenue=Sum('total_revenue'),
+        received=Sum('cash_received'),
+        change=Sum('change_given')
+    ).order_by('-revenue')
+    return [
+        {
+            'payment_code': row['payment_code'],
+            'payment_display': labels.get(row['payment_code'], row['payment_code']),
+            'total_orders': row['orders'],
+            'total_revenue': row['revenue'],
+            'cash_received': row['received'],
+            'change_given': row['change']
+        }
+        for row in rows
+    ]
+
+
+def payment_breakdown(start, end):
+    """
+    Retorna a receita por forma de pagamento entre as datas `start` e `end`.
+    """
+    return _payment_breakdown(PaymentMethodStats.objects.filter(date__gte=start, date__lte=end))
+
+
+def cash_reconciliation(start, end, opening_cash=Decimal('0')):
+    """
+    Calcula o fechamento de caixa de um turno entre os instantes `start` e `end`.
+    Usa os intervalos de uma hora das estatísticas, então o turno é ampliado
+    para horas inteiras: o início volta para o começo da sua hora e o fim
+    avança para o final da hora que o contém (10:20 vira 11:00). O período
+    retornado é o ampliado.
+    """
+    start = hour_bucket(start)
+    last_hour = hour_bucket(end)
+    end = last_hour if last_hour == end else last_hour + timedelta(hours=1)
+    breakdown = _payment_breakdown(
+        PaymentMethodStats.objects.filter(hour_start__gte=start, hour_start__lt=end)
+    )
+    cash = next((row for row in breakdown if row['payment_code'] == 'cash'), None) or {}
+    cash_received = cash.get('cash_received') or Decimal('0')
+    change_given = cash.get('change_given') or Decimal('0')
+    return {
+        'start': start,
+        'end': end,
+        'opening_cash': opening_cash,
+        'cash_orders': cash.get('total_orders') or 0,
+        'cash_revenue': cash.get('total_revenue') or Decimal('0'),
+        'cash_received': cash_received,
+        'change_given': change_given,
+        'expected_cash': opening_cash + cash_received - change_given,
+        'total_revenue': sum((row['total_revenue'] for row in breakdown), Decimal('0')),
+        'payment_methods': breakdown
+    }
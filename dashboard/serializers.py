@@ -1,18 +1,27 @@
 from rest_framework import serializers
 from .models import DailyStats, ProductStats, CategoryStats
+from .sketches import HyperLogLog
 
 class DailyStatsSerializer(serializers.ModelSerializer):
     """
     Serializer para o modelo DailyStats.
     Usado para exibir estatísticas diárias no dashboard.
     """
+    unique_customers = serializers.SerializerMethodField()
+
     class Meta:
         model = DailyStats
         fields = ('id', 'date', 'total_orders',
-                 'total_revenue', 'average_order_value',
+                 'total_revenue', 'average_order_value', 'unique_customers',
                  'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
+    def get_unique_customers(self, obj):
+        """
+        Retorna o número aproximado de clientes distintos no dia.
+        """
+        return HyperLogLog.from_bytes(obj.customers_hll).count()
+
 class ProductStatsSerializer(serializers.ModelSerializer):
     """
     Serializer para o modelo ProductStats.
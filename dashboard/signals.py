@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from .live import product_tracker
+from .rollups import CANCELLED, rebuild_day, record_order
+
+
+@receiver(post_save, sender=OrderItem)
+def track_order_item(sender, instance, created, raw=False, **kwargs):
+    """
+    Alimenta o sketch de produtos mais vendidos a cada item de pedido criado.
+    Só contabiliza depois do commit, para ignorar pedidos que falharam.
+    """
+    if not created or raw:
+        return
+    transaction.on_commit(
+        lambda: product_tracker.record(
+            instance.product_id, instance.product_name, instance.quantity, instance.created_at
+        )
+    )
+
+
+@receiver(post_save, sender=Order)
+def track_order(sender, instance, created, raw=False, **kwargs):
+    """
+    Contabiliza o pedido nas estatísticas diárias depois do commit,
+    quando os itens e os dados do cliente já foram gravados. Se o pedido
+    foi cancelado ou reativado, recalcula o dia dele.
+    """
+    if raw:
+        return
+    if created:
+        transaction.on_commit(lambda: record_order(instance.pk), robust=True)
+    elif (instance._loaded_status == CANCELLED) != (instance.status == CANCELLED):
+        # Cancelado ou reativado: o dia é recalculado sem (ou com) o pedido
+        date = timezone.localdate(instance.created_at)
+        transaction.on_commit(lambda: rebuild_day(date), robust=True)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    """
+    Guarda o status carregado do banco, para track_order saber se o pedido
+    foi cancelado ou reativado. Campos adiados (only/defer) não são lidos.
+    """
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_delete, sender=Order)
+def untrack_order(sender, instance, **kwargs):
+    """
+    Tira o pedido removido das estatísticas recalculando o seu dia.
+    """
+    if instance.status == CANCELLED:
+        return
+    date = timezone.localdate(instance.created_at)
+    transaction.on_commit(lambda: rebuild_day(date), robust=True)
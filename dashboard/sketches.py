@@ -0,0 +1,235 @@
+"""
+Estruturas de dados aproximadas (sketches) usadas pelas estatísticas do dashboard.
+
+Todas as estruturas aqui têm memória limitada, independente do volume de
+pedidos ou do tamanho do cardápio, e podem ser combinadas (merge) para
+responder a qualquer janela de tempo a partir de janelas menores.
+"""
+import hashlib
+import math
+
+
+class SpaceSaving:
+    """
+    Sketch Space-Saving para descobrir os itens mais frequentes de um fluxo.
+
+    Mantém no máximo `capacity` contadores. Quando um item novo chega com a
+    estrutura cheia, ele herda o menor contador existente, que passa a ser
+    o erro máximo da sua estimativa. A contagem estimada nunca é menor que a
+    contagem real e superestima em no máximo `error`.
+    """
+
+    def __init__(self, capacity=100, counters=None):
+        self.capacity = capacity
+        # item -> [contagem estimada, erro máximo]
+        self.counters = {}
+        for item, (count, error) in (counters or {}).items():
+            self.counters[item] = [count, error]
+
+    def __len__(self):
+        return len(self.counters)
+
+    def min_count(self):
+        """
+        Retorna o menor contador, que limita a contagem de qualquer item ausente.
+        """
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def add(self, item, weight=1):
+        """
+        Registra `weight` ocorrências de `item`.
+        """
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+            return
+        victim = min(self.counters, key=lambda key: self.counters[key][0])
+        floor = self.counters.pop(victim)[0]
+        self.counters[item] = [floor + weight, floor]
+
+    def merge(self, other):
+        """
+        Combina outro sketch neste, mantendo a garantia de superestimativa.
+        """
+        own_floor = self.min_count()
+        other_floor = other.min_count()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            count, error = self.counters.get(item, (own_floor, own_floor))
+            other_count, other_error = other.counters.get(item, (other_floor, other_floor))
+            merged[item] = [count + other_count, error + other_error]
+        if len(merged) > self.capacity:
+            kept = sorted(merged.items(), key=lambda entry: entry[1][0], reverse=True)
+            merged = dict(kept[:self.capacity])
+        self.counters = merged
+        return self
+
+    def top(self, limit=10):
+        """
+        Retorna os `limit` itens mais frequentes como (item, contagem, erro).
+        """
+        ranked = sorted(self.counters.items(), key=lambda entry: entry[1][0], reverse=True)
+        return [(item, count, error) for item, (count, error) in ranked[:limit]]
+
+    def to_dict(self):
+        return {item: [count, error] for item, (count, error) in self.counters.items()}
+
+    @classmethod
+    def from_dict(cls, data, capacity=100):
+        return cls(capacity=capacity, counters=data)
+
+
+class HyperLogLog:
+    """
+    Sketch HyperLogLog para contagem aproximada de elementos distintos.
+
+    Com a precisão padrão (2^12 registradores, 4 KB) o erro típico é de ~1,6%.
+    Dois sketches com a mesma precisão são combinados pelo máximo de cada
+    registrador, então o total de um período sai da união dos sketches diários.
+    """
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+
+    def add(self, value):
+        """
+        Registra um elemento (string) no sketch.
+        """
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        Combina outro sketch neste (união dos conjuntos).
+        """
+        if other.precision != self.precision:
+            raise ValueError("Não é possível combinar sketches com precisões diferentes")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """
+        Retorna a estimativa do número de elementos distintos.
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        # Correção para cardinalidades pequenas (linear counting)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data, precision=12):
+        if not data:
+            return cls(precision=precision)
+        data = bytes(data)
+        return cls(precision=len(data).bit_length() - 1, registers=data)
+
+
+class LogHistogram:
+    """
+    Histograma com buckets de largura relativa fixa para estimar percentis.
+
+    Cada bucket cobre o intervalo (gamma^(i-1), gamma^i], então qualquer
+    percentil é estimado com erro relativo de no máximo `relative_accuracy`.
+    Histogramas com a mesma precisão são combinados somando os buckets,
+    o que permite responder qualquer período a partir dos histogramas diários.
+    """
+
+    def __init__(self, relative_accuracy=0.02, counts=None, zero_count=0):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.counts = {int(index): count for index, count in (counts or {}).items()}
+        # Valores menores ou iguais a zero ficam num bucket separado
+        self.zero_count = zero_count
+
+    @property
+    def total(self):
+        return self.zero_count + sum(self.counts.values())
+
+    def add(self, value, count=1):
+        """
+        Registra `count` ocorrências de `value`.
+        """
+        value = float(value)
+        if value <= 0:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def merge(self, other):
+        """
+        Combina outro histograma neste.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Não é possível combinar histogramas com precisões diferentes")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.zero_count += other.zero_count
+        return self
+
+    def _value(self, index):
+        # Ponto do bucket com o menor erro relativo para todo o intervalo
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def quantile(self, q):
+        """
+        Retorna a estimativa do percentil `q` (entre 0 e 1), ou None se vazio.
+        """
+        total = self.total
+        if not total:
+            return None
+        # Método do posto mais próximo (nearest-rank)
+        rank = max(math.ceil(q * total) - 1, 0)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if rank < seen:
+                return self._value(index)
+        return self._value(max(self.counts))
+
+    def buckets(self):
+        """
+        Retorna os buckets não vazios como (limite inferior, limite superior, contagem).
+        """
+        result = [(0.0, 0.0, self.zero_count)] if self.zero_count else []
+        for index in sorted(self.counts):
+            result.append((self.gamma ** (index - 1), self.gamma ** index, self.counts[index]))
+        return result
+
+    def to_dict(self):
+        return {
+            'accuracy': self.relative_accuracy,
+            'zero': self.zero_count,
+            'counts': {str(index): count for index, count in self.counts.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(
+            relative_accuracy=data.get('accuracy', 0.02),
+            counts=data.get('counts'),
+            zero_count=data.get('zero', 0)
+        )
@@ -1,3 +1,453 @@
-from django.test import TestCase
+import random
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app.testing import IsolatedTestCase
+from orders.models import Order, OrderItem, OrderItemIngredient
+from products.models import Category, Ingredient, Product
+from . import live
+from .live import TopProductsTracker
+from .models import DailyStats, IngredientStats, ProductSketch
+from .rollups import (
+    cash_reconciliation, customer_key, ingredient_consumption, normalize_payment_method, order_distribution,
+    payment_breakdown, rebuild_daily_stats, unique_customers
+)
+from .sketches import HyperLogLog, LogHistogram, SpaceSaving
+
+
+class DashboardTestCase(IsolatedTestCase):
+    """
+    Cria pedidos como a API: as estatísticas são atualizadas depois do commit.
+    """
+
+    def order(self, phone='11999990000', total='30.00', payment='Pix', items=(('X-Burguer', 1),),
+              when=None, change=None, ingredients=()):
+        """
+        `ingredients` lista (ingrediente, adicionado, preço) do primeiro item.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(customer_name='Cliente', customer_phone=phone, total_amount=total,
+                                         payment_method=payment, change_amount=change)
+            for number, (name, quantity) in enumerate(items):
+                item = OrderItem.objects.create(order=order, product_name=name, quantity=quantity, unit_price='10.00')
+                if number == 0:
+                    for ingredient, is_added, price in ingredients:
+                        OrderItemIngredient.objects.create(order_item=item, ingredient=ingredient,
+                                                           is_added=is_added, price=price)
+            if when is not None:
+                Order.objects.filter(pk=order.pk).update(created_at=when)
+        return order
+
+
+class SpaceSavingTest(IsolatedTestCase):
+    """
+    As contagens estimadas nunca ficam abaixo da real nem acima dela mais o erro.
+    """
+
+    def stream(self, seed, length=5000):
+        generator = random.Random(seed)
+        # Poucos itens muito frequentes e uma cauda longa de itens raros
+        return [f'item {min(int(generator.paretovariate(1.2)), 500)}' for _ in range(length)]
+
+    def assertBounds(self, sketch, stream):
+        exact = {}
+        for item in stream:
+            exact[item] = exact.get(item, 0) + 1
+        for item, (count, error) in sketch.counters.items():
+            self.assertGreaterEqual(count, exact.get(item, 0), item)
+            self.assertLessEqual(count - error, exact.get(item, 0), item)
+        # Um item ausente nunca teve mais ocorrências que o menor contador
+        for item, count in exact.items():
+            if item not in sketch.counters:
+                self.assertLessEqual(count, sketch.min_count(), item)
+        return exact
+
+    def test_exact_below_capacity(self):
+        sketch = SpaceSaving(capacity=10)
+        for item, weight in (('X-Burguer', 3), ('Coca', 1), ('X-Burguer', 2)):
+            sketch.add(item, weight)
+        self.assertEqual(sketch.top(), [('X-Burguer', 5, 0), ('Coca', 1, 0)])
+        self.assertEqual(sketch.min_count(), 0)
+
+    def test_error_bounds_when_full(self):
+        stream = self.stream(1)
+        sketch = SpaceSaving(capacity=20)
+        for item in stream:
+            sketch.add(item)
+        self.assertEqual(len(sketch), 20)
+        exact = self.assertBounds(sketch, stream)
+        heaviest = max(exact, key=exact.get)
+        self.assertEqual(sketch.top(1)[0][0], heaviest)
+
+    def test_merge_keeps_bounds(self):
+        first, second = self.stream(2), self.stream(3)
+        merged = SpaceSaving(capacity=20)
+        for item in first:
+            merged.add(item)
+        other = SpaceSaving(capacity=20)
+        for item in second:
+            other.add(item)
+        merged.merge(other)
+        self.assertLessEqual(len(merged), 20)
+        self.assertBounds(merged, first + second)
+
+    def test_serialization(self):
+        sketch = SpaceSaving(capacity=2)
+        for item in ('a', 'b', 'c'):
+            sketch.add(item)
+        restored = SpaceSaving.from_dict(sketch.to_dict(), capacity=2)
+        self.assertEqual(restored.top(), sketch.top())
+
+
+class TopProductsTrackerTest(IsolatedTestCase):
+    """
+    As vendas registradas em um processo devem chegar ao banco sem depender
+    de uma nova venda ou consulta no mesmo processo.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tracker = TopProductsTracker()
+        self.addCleanup(self.stop)
+
+    def stop(self):
+        # Nada pendente para o atexit gravar depois que o banco de testes sumir
+        if self.tracker._timer is not None:
+            self.tracker._timer.cancel()
+        self.tracker._pending = {}
+
+    @override_settings(DASHBOARD_SKETCH_FLUSH_SECONDS=0)
+    def test_immediate_flush_and_windows(self):
+        now = timezone.now()
+        self.tracker.record(None, 'X-Burguer', 2, now)
+        self.tracker.record(None, 'Coca', 1, now)
+        self.tracker.record(None, 'Coca', 5, now - timedelta(days=2))
+        self.assertIsNone(self.tracker._timer)
+        # Intervalos de 5 minutos mais antigos que MINUTE_RETENTION são removidos
+        self.assertEqual(ProductSketch.objects.count(), 3)
+
+        self.assertEqual(self.tracker.top('hour', now=now), [(None, 'X-Burguer', 2, 0), (None, 'Coca', 1, 0)])
+        self.assertEqual(self.tracker.top('today', now=now), [(None, 'X-Burguer', 2, 0), (None, 'Coca', 1, 0)])
+        self.assertEqual(self.tracker.top('week', now=now), [(None, 'Coca', 6, 0), (None, 'X-Burguer', 2, 0)])
+        with self.assertRaises(ValueError):
+            self.tracker.top('month')
+
+    @override_settings(DASHBOARD_SKETCH_FLUSH_SECONDS=30)
+    def test_timer_flushes_idle_worker(self):
+        self.tracker.record(None, 'X-Burguer', 1)
+        self.tracker.record(None, 'X-Burguer', 1)
+        timer = self.tracker._timer
+        self.assertIsNotNone(timer)
+        self.assertTrue(timer.daemon)
+        self.assertFalse(ProductSketch.objects.exists())
+
+        timer.cancel()
+        # O que o timer executa, sem fechar a conexão do teste
+        with mock.patch.object(live, 'connections'):
+            self.tracker._flush_later()
+        self.assertIsNone(self.tracker._timer)
+        self.assertEqual(self.tracker.top('today'), [(None, 'X-Burguer', 2, 0)])
+
+    @override_settings(DASHBOARD_SKETCH_FLUSH_SECONDS=30)
+    def test_top_reads_pending_without_writing(self):
+        self.tracker.record(None, 'Coca', 3)
+        self.assertEqual(self.tracker.top('today'), [(None, 'Coca', 3, 0)])
+        self.assertEqual(self.tracker.top('hour'), [(None, 'Coca', 3, 0)])
+        # Gravar continua sendo papel do timer e do atexit
+        self.assertFalse(ProductSketch.objects.exists())
+        self.assertTrue(self.tracker._pending)
+
+    @override_settings(DASHBOARD_SKETCH_FLUSH_SECONDS=0)
+    def test_counts_follow_product_id(self):
+        category = Category.objects.create(name='Lanches')
+        product = Product.objects.create(name='X-Burguer', description='', price='20.00', category=category)
+        self.tracker.record(product.pk, 'X-Burguer', 2)
+        product.name = 'X-Burguer Duplo'
+        product.save()
+        self.tracker.record(product.pk, 'X-Burguer Duplo', 1)
+        self.assertEqual(self.tracker.top('today'), [(product.pk, 'X-Burguer Duplo', 3, 0)])
+
+    @override_settings(DASHBOARD_SKETCH_FLUSH_SECONDS=30)
+    def test_failed_flush_is_retried(self):
+        self.tracker.record(None, 'Coca', 1)
+        self.tracker._timer.cancel()
+        with mock.patch.object(live, 'connections'), \
+                mock.patch.object(ProductSketch.objects, 'select_for_update', side_effect=RuntimeError('fora do ar')), \
+                self.assertLogs(live.logger, 'WARNING'):
+            self.tracker._flush_later()
+        self.assertTrue(self.tracker._pending)
+        self.assertIsNotNone(self.tracker._timer)
+
+    def test_top_products_endpoint(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/dashboard/top_products/', {'limit': 'abc'}).status_code, 400)
+        self.assertEqual(client.get('/api/dashboard/top_products/', {'limit': 0}).status_code, 400)
+        self.assertEqual(client.get('/api/dashboard/top_products/', {'window': 'month'}).status_code, 400)
+        response = client.get('/api/dashboard/top_products/', {'window': 'week', 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['window'], 'week')
+
+
+class HyperLogLogTest(IsolatedTestCase):
+    """
+    A contagem de distintos deve ficar perto da real e a união deve ser exata
+    em relação aos sketches de cada dia.
+    """
+
+    def test_estimate_error(self):
+        for total in (10, 1000, 20000):
+            sketch = HyperLogLog()
+            for number in range(total):
+                sketch.add(f'{number:011d}')
+                sketch.add(f'{number:011d}')
+            self.assertAlmostEqual(sketch.count(), total, delta=max(1, total * 0.05))
+
+    def test_merge_is_union(self):
+        monday, tuesday = HyperLogLog(), HyperLogLog()
+        for number in range(3000):
+            monday.add(str(number))
+        for number in range(2000, 5000):
+            tuesday.add(str(number))
+        merged = HyperLogLog.from_bytes(monday.to_bytes()).merge(tuesday)
+        self.assertAlmostEqual(merged.count(), 5000, delta=250)
+        self.assertEqual(HyperLogLog.from_bytes(b'').count(), 0)
+        with self.assertRaises(ValueError):
+            monday.merge(HyperLogLog(precision=10))
+
+    def test_customer_key(self):
+        self.assertEqual(customer_key('+55 (11) 99999-0000'), '11999990000')
+        self.assertEqual(customer_key('11 99999-0000'), '11999990000')
+        self.assertEqual(customer_key(None), '')
+
+
+class UniqueCustomersTest(DashboardTestCase):
+    """
+    Clientes distintos por período, a partir dos sketches diários.
+    """
+
+    def test_daily_sketches_and_rebuild(self):
+        today = timezone.now()
+        self.order('+55 11 99999-0000', when=today)
+        self.order('(11) 99999-0000', when=today)
+        self.order('11 98888-0000', when=today - timedelta(days=1))
+        self.order('11 99999-0000', when=today - timedelta(days=1))
+        self.order('', when=today)
+
+        start, end = timezone.localdate(today) - timedelta(days=1), timezone.localdate(today)
+        self.assertEqual(DailyStats.objects.count(), 2)
+        self.assertEqual(unique_customers(end, end), 1)
+        self.assertEqual(unique_customers(start, end), 2)
+
+        rebuild_daily_stats()
+        self.assertEqual(unique_customers(start, end), 2)
+
+        response = APIClient().get('/api/dashboard/unique_customers/', {'start': start, 'end': end})
+        self.assertEqual(response.json()['unique_customers'], 2)
+        response = APIClient().get('/api/dashboard/unique_customers/', {'start': end, 'end': start})
+        self.assertEqual(response.status_code, 400)
+
+
+class IngredientConsumptionTest(DashboardTestCase):
+    """
+    O consumo diário de ingredientes considera a quantidade do item e o
+    preço gravado no pedido.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.bacon = Ingredient.objects.create(name='Bacon', price='3.00')
+        self.cebola = Ingredient.objects.create(name='Cebola', price='0.00')
+
+    def consumption(self, order_by='added', limit=None):
+        today = timezone.localdate()
+        return [
+            (row['ingredient_name'], row['added_count'], row['removed_count'], row['total_revenue'])
+            for row in ingredient_consumption(today, today, order_by, limit)
+        ]
+
+    def test_incremental_and_rebuild(self):
+        self.order(items=(('X-Burguer', 2),), ingredients=((self.bacon, True, '3.00'), (self.cebola, False, '0')))
+        self.order(ingredients=((self.bacon, True, '2.50'),))
+        self.order(items=(('X-Salada', 3),), ingredients=((self.cebola, False, '0'),))
+
+        expected = [('Bacon', 3, 0, Decimal('5.50')), ('Cebola', 0, 5, Decimal('0.00'))]
+        self.assertEqual(self.consumption(), expected)
+        self.assertEqual(self.consumption('removed'), expected[::-1])
+        self.assertEqual(self.consumption('revenue', limit=1), expected[:1])
+        self.assertEqual(IngredientStats.objects.count(), 2)
+
+        rebuild_daily_stats()
+        self.assertEqual(self.consumption(), expected)
+
+    def test_endpoint_validation(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/dashboard/ingredient_stats/', {'order_by': 'price'}).status_code, 400)
+        for limit in ('abc', '1.5', 0, -3):
+            response = client.get('/api/dashboard/ingredient_stats/', {'limit': limit})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('limit', response.json()['error'])
+        response = client.get('/api/dashboard/ingredient_stats/', {'order_by': 'removed', 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ingredients'], [])
+
+
+class PaymentStatsTest(DashboardTestCase):
+    """
+    Receita por forma de pagamento e fechamento de caixa a partir das
+    estatísticas por hora.
+    """
+
+    def test_normalize_payment_method(self):
+        cases = {
+            'Dinheiro': 'cash', 'PIX': 'pix', 'Cartão de Crédito': 'credit_card', 'débito': 'debit_card',
+            'Cartão': 'card', 'VR': 'voucher', 'Vale refeição': 'voucher', 'boleto': 'other',
+            '': 'unknown', None: 'unknown',
+        }
+        for value, code in cases.items():
+            self.assertEqual(normalize_payment_method(value), code, value)
+
+    def test_cash_reconciliation(self):
+        self.order(total='42.00', payment='Dinheiro', change='50.00')
+        self.order(total='30.00', payment='dinheiro')
+        self.order(total='25.00', payment='Pix')
+
+        today = timezone.localdate()
+        breakdown = {row['payment_code']: row for row in payment_breakdown(today, today)}
+        self.assertEqual(set(breakdown), {'cash', 'pix'})
+        self.assertEqual(breakdown['cash']['total_orders'], 2)
+        self.assertEqual(breakdown['cash']['cash_received'], Decimal('80.00'))
+        self.assertEqual(breakdown['cash']['change_given'], Decimal('8.00'))
+
+        now = timezone.now()
+        result = cash_reconciliation(now - timedelta(hours=1), now, opening_cash=Decimal('100'))
+        self.assertEqual(result['cash_orders'], 2)
+        self.assertEqual(result['cash_revenue'], Decimal('72.00'))
+        self.assertEqual(result['expected_cash'], Decimal('172.00'))
+        self.assertEqual(result['total_revenue'], Decimal('97.00'))
+
+        rebuild_daily_stats()
+        self.assertEqual(payment_breakdown(today, today), list(breakdown.values()))
+
+    def test_cancelled_and_deleted_orders_leave_the_stats(self):
+        bacon = Ingredient.objects.create(name='Bacon', price='3.00')
+        cancelled = self.order('11 98888-0000', total='42.00', payment='Dinheiro', change='50.00',
+                               ingredients=[(bacon, True, '3.00')])
+        deleted = self.order('11 97777-0000', total='30.00', payment='Dinheiro')
+        self.order('11 99999-0000', total='25.00', payment='Pix')
+        now = timezone.now()
+        today = timezone.localdate(now)
+
+        def snapshot():
+            result = cash_reconciliation(now, now)
+            return (result['cash_orders'], result['expected_cash'], result['total_revenue'],
+                    unique_customers(today, today), order_distribution(today, today)['total_orders'],
+                    [row['added_count'] for row in ingredient_consumption(today, today)])
+
+        self.assertEqual(snapshot(), (2, Decimal('72.00'), Decimal('97.00'), 3, 3, [1]))
+
+        cancelled.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            cancelled.save()
+        self.assertEqual(snapshot(), (1, Decimal('30.00'), Decimal('55.00'), 2, 2, []))
+
+        # Salvar de novo sem mudar o status não recalcula o dia
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Order.objects.get(pk=cancelled.pk).save()
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        self.assertEqual(snapshot(), (0, Decimal('0'), Decimal('25.00'), 1, 1, []))
+
+        cancelled.status = 'confirmed'
+        with self.captureOnCommitCallbacks(execute=True):
+            cancelled.save()
+        self.assertEqual(snapshot(), (1, Decimal('42.00'), Decimal('67.00'), 2, 2, [1]))
+
+        rebuild_daily_stats()
+        self.assertEqual(snapshot(), (1, Decimal('42.00'), Decimal('67.00'), 2, 2, [1]))
+
+    def test_cash_reconciliation_rounds_to_whole_hours(self):
+        moment = timezone.localtime().replace(hour=10, minute=20, second=0, microsecond=0)
+        result = cash_reconciliation(moment, moment + timedelta(hours=2))
+        self.assertEqual(result['start'], moment.replace(minute=0))
+        self.assertEqual(result['end'], moment.replace(hour=13, minute=0))
+        on_the_hour = moment.replace(minute=0)
+        self.assertEqual(cash_reconciliation(on_the_hour, on_the_hour.replace(hour=12))['end'],
+                         on_the_hour.replace(hour=12))
+
+    def test_endpoint_validation(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/dashboard/cash_reconciliation/', {'opening_cash': 'abc'}).status_code, 400)
+        self.assertEqual(client.get('/api/dashboard/cash_reconciliation/', {'start': 'ontem'}).status_code, 400)
+        response = client.get('/api/dashboard/cash_reconciliation/', {'opening_cash': '50'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['expected_cash'], 50)
+        self.assertEqual(client.get('/api/dashboard/payment_stats/').status_code, 200)
+
+
+class LogHistogramTest(IsolatedTestCase):
+    """
+    Os percentis estimados ficam dentro do erro relativo configurado.
+    """
+
+    def test_quantile_accuracy(self):
+        values = [random.Random(4).lognormvariate(3.5, 0.6) for _ in range(5000)]
+        histogram = LogHistogram(relative_accuracy=0.02)
+        for value in values:
+            histogram.add(value)
+        ordered = sorted(values)
+        for q in (0.5, 0.9, 0.99):
+            exact = ordered[max(int(q * len(ordered) + 0.999999) - 1, 0)]
+            self.assertLessEqual(abs(histogram.quantile(q) - exact) / exact, 0.02, q)
+
+    def test_zero_bucket_merge_and_serialization(self):
+        histogram = LogHistogram()
+        self.assertIsNone(histogram.quantile(0.5))
+        histogram.add(0, count=3)
+        histogram.add(10)
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        other = LogHistogram.from_dict(histogram.to_dict())
+        self.assertEqual(other.merge(histogram).total, 8)
+        self.assertEqual(other.buckets()[0], (0.0, 0.0, 6))
+        self.assertAlmostEqual(other.quantile(1), 10, delta=0.2)
+        with self.assertRaises(ValueError):
+            other.merge(LogHistogram(relative_accuracy=0.05))
+
+
+class OrderDistributionTest(DashboardTestCase):
+    """
+    Percentis do valor e da quantidade de itens dos pedidos do período.
+    """
+
+    def test_distribution(self):
+        for total, quantity in (('20.00', 1), ('30.00', 2), ('100.00', 5)):
+            self.order(total=total, items=(('X-Burguer', quantity),))
+        today = timezone.localdate()
+        data = order_distribution(today, today, (50, 100))
+        self.assertEqual(data['total_orders'], 3)
+        self.assertAlmostEqual(data['ticket']['percentiles']['p50'], 30, delta=0.6)
+        self.assertAlmostEqual(data['ticket']['percentiles']['p100'], 100, delta=2)
+        self.assertEqual(data['items']['percentiles'], {'p50': 2, 'p100': 5})
+
+        response = APIClient().get('/api/dashboard/order_distribution/', {'percentiles': '50,101'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_keeps_identical_orders_apart(self):
+        # Importação em lote: mesmo instante, valor, telefone e pagamento
+        moment = timezone.now().replace(microsecond=0)
+        self.order(total='30.00', items=(('X-Burguer', 1),), when=moment)
+        self.order(total='30.00', items=(('X-Salada', 2),), when=moment)
+
+        rebuild_daily_stats()
+        stats = DailyStats.objects.get()
+        self.assertEqual(stats.total_orders, 2)
+        self.assertEqual(stats.total_revenue, Decimal('60.00'))
+        items = LogHistogram.from_dict(stats.items_histogram)
+        self.assertEqual(items.total, 2)
+        self.assertAlmostEqual(items.quantile(1), 2, delta=0.05)
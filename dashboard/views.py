@@ -4,7 +4,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from datetime import timedelta
+from decimal import Decimal, InvalidOperation
 from .models import DailyStats, ProductStats, CategoryStats
 from .serializers import (
     DailyStatsSerializer, ProductStatsSerializer,
@@ -12,6 +14,55 @@ from .serializers import (
 )
 from orders.models import Order, OrderItem
 from products.models import Product, Category
+from .live import product_tracker, WINDOWS
+from .rollups import (
+    unique_customers, ingredient_consumption, INGREDIENT_ORDERING,
+    payment_breakdown, cash_reconciliation, order_distribution
+)
+
+def get_date_range(request, default_days):
+    """
+    Lê o período dos parâmetros 'start' e 'end' (AAAA-MM-DD).
+    Sem eles, usa os últimos `default_days` dias (parâmetro 'days').
+    """
+    today = timezone.localdate()
+    end = parse_date(request.query_params.get('end', '')) or today
+    start = parse_date(request.query_params.get('start', ''))
+    if start is None:
+        days = int(request.query_params.get('days', default_days))
+        start = end - timedelta(days=days)
+    if start > end:
+        raise ValueError('Data inicial maior que a data final')
+    return start, end
+
+def get_datetime_param(request, name, default):
+    """
+    Lê um instante (ISO 8601) dos parâmetros; sem fuso, usa o fuso do projeto.
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"Data/hora inválida em '{name}'")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def get_limit_param(request, default):
+    """
+    Lê o parâmetro 'limit' (inteiro maior que zero); sem ele, usa `default`.
+    """
+    value = request.query_params.get('limit')
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit deve ser um número inteiro')
+    if limit < 1:
+        raise ValueError('limit deve ser maior que zero')
+    return limit
 
 class DashboardViewSet(viewsets.ViewSet):
     """
@@ -157,3 +208,176 @@ class DashboardViewSet(viewsets.ViewSet):
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    @action(detail=False, methods=['get'])
+    def top_products(self, request):
+        """
+        Retorna os produtos mais vendidos em tempo real.
+        A janela pode ser 'hour' (última hora), 'today' ou 'week' (últimos 7 dias).
+        """
+        try:
+            window = request.query_params.get('window', 'today')
+            if window not in WINDOWS:
+                return Response(
+                    {'error': 'Janela inválida'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            limit = get_limit_param(request, 10)
+
+            products = [
+                {
+                    'product_id': product_id,
+                    'product_name': product_name,
+                    'quantity': quantity,
+                    'max_error': error
+                }
+                for product_id, product_name, quantity, error in product_tracker.top(window, limit)
+            ]
+            return Response({'window': window, 'products': products})
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def unique_customers(self, request):
+        """
+        Retorna o número aproximado de clientes distintos no período,
+        combinando os sketches HyperLogLog das estatísticas diárias.
+        """
+        try:
+            start, end = get_date_range(request, default_days=30)
+            return Response({
+                'start': start,
+                'end': end,
+                'unique_customers': unique_customers(start, end)
+            })
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def ingredient_stats(self, request):
+        """
+        Retorna o consumo de ingredientes no período a partir das estatísticas diárias.
+        Aceita 'order_by' (added, removed ou revenue) e 'limit' para o top-N.
+        """
+        try:
+            start, end = get_date_range(request, default_days=30)
+            order_by = request.query_params.get('order_by', 'added')
+            if order_by not in INGREDIENT_ORDERING:
+                raise ValueError('Ordenação inválida')
+            limit = get_limit_param(request, None)
+
+            return Response({
+                'start': start,
+                'end': end,
+                'ingredients': ingredient_consumption(start, end, order_by, limit)
+            })
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def payment_stats(self, request):
+        """
+        Retorna a receita por forma de pagamento no período.
+        """
+        try:
+            start, end = get_date_range(request, default_days=0)
+            return Response({
+                'start': start,
+                'end': end,
+                'payment_methods': payment_breakdown(start, end)
+            })
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def cash_reconciliation(self, request):
+        """
+        Retorna o fechamento de caixa de um turno.
+        Aceita 'start' e 'end' (data/hora ISO) e 'opening_cash' (fundo de troco);
+        sem período, considera o dia atual até agora.
+        """
+        try:
+            now = timezone.now()
+            start_of_day = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+            start = get_datetime_param(request, 'start', start_of_day)
+            end = get_datetime_param(request, 'end', now)
+            if start > end:
+                raise ValueError('Data inicial maior que a data final')
+            try:
+                opening_cash = Decimal(request.query_params.get('opening_cash', '0'))
+            except InvalidOperation:
+                raise ValueError('Fundo de troco inválido')
+
+            return Response(cash_reconciliation(start, end, opening_cash))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get'])
+    def order_distribution(self, request):
+        """
+        Retorna percentis e histograma do valor dos pedidos e dos itens por pedido.
+        Aceita 'percentiles' (ex: 50,90,99) além do período.
+        """
+        try:
+            start, end = get_date_range(request, default_days=30)
+            percentiles = [
+                float(value)
+                for value in request.query_params.get('percentiles', '50,90,99').split(',')
+                if value.strip()
+            ]
+            if any(p < 0 or p > 100 for p in percentiles):
+                raise ValueError('Percentil inválido')
+
+            data = order_distribution(start, end, percentiles)
+            data.update({'start': start, 'end': end})
+            return Response(data)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,73 @@
+"""
+Representação compacta dos pedidos para a tela da cozinha.
+
+Os pedidos em aberto são lidos com uma única consulta values() (pedido +
+itens + nome do cliente, via LEFT JOIN) e os ingredientes dos itens com mais
+uma. O resultado é montado em dicionários simples, sem os campos do DRF,
+com só o que a cozinha usa: produto, quantidade, observações e adicionais.
+"""
+from django.utils import timezone
+
+from .models import Order, OrderItemIngredient
+
+KITCHEN_STATUSES = ('pending', 'preparing', 'ready')
+
+
+def kitchen_orders(statuses=KITCHEN_STATUSES):
+    """
+    Retorna os pedidos com os status informados, do mais antigo para o mais
+    novo (ordem de preparo).
+    """
+    rows = Order.objects.filter(status__in=statuses).order_by('created_at', 'id', 'items__id').values_list(
+        'id', 'status', 'created_at', 'notes', 'customer_name', 'client_order__customer_name',
+        'items__id', 'items__product_name', 'items__quantity', 'items__notes', 'items__item_type',
+    )
+
+    orders = []
+    items = {}
+    current = None
+    for (order_id, status, created_at, notes, customer_name, client_name,
+         item_id, product_name, quantity, item_notes, item_type) in rows:
+        if current is None or current['id'] != order_id:
+            current = {
+                'id': order_id,
+                'status': status,
+                'created_at': timezone.localtime(created_at).isoformat(),
+                'customer_name': client_name or customer_name,
+                'notes': notes,
+                'items': [],
+            }
+            orders.append(current)
+        if item_id is not None:
+            item = {
+                'id': item_id,
+                'product_name': product_name,
+                'quantity': quantity,
+                'notes': item_notes,
+                'item_type': item_type,
+                'added': [],
+                'removed': [],
+            }
+            current['items'].append(item)
+            items[item_id] = item
+
+    if items:
+        ingredients = OrderItemIngredient.objects.filter(order_item__order__status__in=statuses).order_by('id').values_list(
+            'order_item_id', 'ingredient__name', 'is_added'
+        )
+        for item_id, name, is_added in ingredients:
+            # O pedido pode ter mudado de status entre as duas consultas
+            item = items.get(item_id)
+            if item is not None:
+                item['added' if is_added else 'removed'].append(name)
+    return orders
+
+
+def kitchen_board():
+    """
+    Retorna os pedidos em aberto agrupados por status.
+    """
+    board = {status: [] for status in KITCHEN_STATUSES}
+    for order in kitchen_orders(KITCHEN_STATUSES):
+        board[order['status']].append(order)
+    return board
@@ -0,0 +1,17 @@
+"""
+Funções de lote (ver app.loaders) para dados de pedidos.
+"""
+from collections import defaultdict
+
+from .models import OrderItemIngredient
+
+
+def ingredient_prices(item_ids):
+    """
+    Soma dos preços dos ingredientes personalizados de cada item de pedido.
+    """
+    prices = defaultdict(list)
+    queryset = OrderItemIngredient.objects.filter(order_item_id__in=item_ids).values_list('order_item_id', 'price')
+    for item_id, price in queryset:
+        prices[item_id].append(price)
+    return {item_id: sum(prices[item_id]) for item_id in item_ids}
@@ -0,0 +1,78 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from orders.kitchen import kitchen_orders, KITCHEN_STATUSES
+from orders.models import Order, OrderItem, OrderItemIngredient
+from orders.serializers import OrderSerializer
+from products.models import Category, Product, Ingredient
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de montagem da tela da cozinha (dados de teste descartados ao final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200, help='Quantidade de pedidos em aberto')
+        parser.add_argument('--items', type=int, default=3, help='Itens por pedido')
+        parser.add_argument('--repeat', type=int, default=20, help='Repetições de cada medição')
+
+    def _seed(self, orders, items_per_order):
+        category = Category.objects.create(name='Benchmark')
+        ingredients = [Ingredient.objects.create(name=f'Adicional {i}', price=2) for i in range(4)]
+        products = [
+            Product.objects.create(name=f'Produto {i}', description='', price=20, category=category)
+            for i in range(10)
+        ]
+        created = Order.objects.bulk_create([
+            Order(customer_name=f'Cliente {i}', customer_phone='0', status=KITCHEN_STATUSES[i % 3], total_amount=60)
+            for i in range(orders)
+        ])
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[i % 10], product_name=products[i % 10].name,
+                      quantity=1 + i % 3, unit_price=20, notes='sem cebola' if i % 4 == 0 else '')
+            for order in created for i in range(items_per_order)
+        ])
+        OrderItemIngredient.objects.bulk_create([
+            OrderItemIngredient(order_item=item, ingredient=ingredients[i % 4], is_added=i % 2 == 0, price=2)
+            for item in order_items for i in range(2)
+        ])
+
+    def _measure(self, repeat, build):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = build()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000, len(body)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                self._seed(options['orders'], options['items'])
+
+                kitchen_ms, kitchen_size = self._measure(
+                    repeat, lambda: json.dumps(kitchen_orders()).encode('utf-8')
+                )
+                generic_ms, generic_size = self._measure(
+                    max(1, repeat // 4),
+                    lambda: JSONRenderer().render(OrderSerializer(
+                        Order.objects.filter(status__in=KITCHEN_STATUSES).order_by('created_at'), many=True
+                    ).data)
+                )
+
+                self.stdout.write(f"Pedidos em aberto: {options['orders']} ({options['items']} itens cada)")
+                self.stdout.write(f'Cozinha (projeção): {kitchen_ms:.1f} ms, {kitchen_size} bytes')
+                self.stdout.write(f'OrderSerializer:    {generic_ms:.1f} ms, {generic_size} bytes')
+                raise Rollback()
+        except Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark concluído (dados de teste descartados)'))
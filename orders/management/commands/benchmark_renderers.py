@@ -0,0 +1,61 @@
+import io
+
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from app.renderers import FastJSONRenderer, FastJSONParser, MessagePackRenderer, MessagePackParser, orjson, msgpack
+from clientes.projections import ProductProjection
+from clientes.serializers import CategorySerializer, with_ingredients
+from orders.models import Order
+from orders.projections import OrderProjection
+from products.models import Category, Product
+from .benchmark_serializers import Command as SerializerBenchmark, Rollback
+
+
+class Command(SerializerBenchmark):
+    help = 'Compara JSON do DRF, orjson e MessagePack nos pedidos e no cardápio (dados de teste descartados ao final)'
+
+    def _formats(self):
+        formats = [('JSON (DRF)', JSONRenderer(), JSONParser())]
+        if orjson is not None:
+            formats.append(('JSON (orjson)', FastJSONRenderer(), FastJSONParser()))
+        else:
+            self.stdout.write(self.style.WARNING('orjson não instalado'))
+        if msgpack is not None:
+            formats.append(('MessagePack', MessagePackRenderer(), MessagePackParser()))
+        else:
+            self.stdout.write(self.style.WARNING('msgpack não instalado'))
+        return formats
+
+    def _compare_formats(self, label, repeat, data):
+        self.stdout.write(label)
+        baseline = None
+        for name, renderer, parser in self._formats():
+            encode_ms, body = self._measure(repeat, lambda: renderer.render(data))
+            decode_ms, _ = self._measure(repeat, lambda: parser.parse(io.BytesIO(body), parser.media_type, {}))
+            baseline = baseline or (encode_ms, decode_ms)
+            self.stdout.write(
+                f'  {name}: codifica {encode_ms:.2f} ms ({baseline[0] / encode_ms:.1f}x), '
+                f'decodifica {decode_ms:.2f} ms ({baseline[1] / decode_ms:.1f}x), {len(body)} bytes'
+            )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                self._seed(options['orders'], options['items'], options['products'])
+                orders = OrderProjection().serialize(Order.objects.order_by('-created_at'))
+                # Mesmo conteúdo das listagens de categorias e produtos da vitrine
+                products = with_ingredients(Product.objects.filter(is_active=True)).order_by('created_at')
+                menu = {
+                    'categories': CategorySerializer(Category.objects.filter(is_active=True), many=True).data,
+                    'products': ProductProjection().serialize(products),
+                }
+
+                self._compare_formats(f"Pedidos ({options['orders']} x {options['items']} itens)", repeat, orders)
+                self._compare_formats(f"Cardápio ({options['products']} produtos)", repeat, menu)
+                raise Rollback()
+        except Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark concluído (dados de teste descartados)'))
@@ -0,0 +1,110 @@
+import contextlib
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from app.serializers import SparseFields, prefetch_requested
+from clientes.projections import ProductProjection
+from clientes.serializers import ProductSerializer as StoreProductSerializer, with_ingredients
+from orders.models import Order, OrderItem, OrderItemIngredient
+from orders.projections import OrderProjection
+from orders.serializers import OrderSerializer
+from orders.views import ORDER_SELECT, ORDER_PREFETCH, ORDER_EXPANDABLE
+from products.models import Category, Product, Ingredient, IngredientCategory, ProductIngredient
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara os serializers do DRF com as projeções values() nas listagens (dados de teste descartados ao final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100, help='Quantidade de pedidos')
+        parser.add_argument('--items', type=int, default=3, help='Itens por pedido')
+        parser.add_argument('--products', type=int, default=60, help='Produtos ativos no cardápio')
+        parser.add_argument('--repeat', type=int, default=10, help='Repetições de cada medição')
+
+    def _seed(self, orders, items_per_order, product_count):
+        category = Category.objects.create(name='Benchmark')
+        ingredient_category = IngredientCategory.objects.create(name='Benchmark')
+        ingredients = [
+            Ingredient.objects.create(name=f'Adicional {i}', price=2, category=ingredient_category if i % 2 else None)
+            for i in range(8)
+        ]
+        products = Product.objects.bulk_create([
+            Product(name=f'Produto {i}', description='Descrição do produto', price=20, category=category)
+            for i in range(product_count)
+        ])
+        ProductIngredient.objects.bulk_create([
+            ProductIngredient(product=product, ingredient=ingredients[(p + i) % 8], group_name=f'Grupo {i % 2}')
+            for p, product in enumerate(products) for i in range(4)
+        ])
+        created = Order.objects.bulk_create([
+            Order(customer_name=f'Cliente {i}', customer_phone='0', status='pending', total_amount=60)
+            for i in range(orders)
+        ])
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[i % product_count], product_name=products[i % product_count].name,
+                      quantity=1, unit_price=20)
+            for order in created for i in range(items_per_order)
+        ])
+        OrderItemIngredient.objects.bulk_create([
+            OrderItemIngredient(order_item=item, ingredient=ingredients[(n + i) % 8], is_added=True, price=2)
+            for n, item in enumerate(order_items) for i in range(2)
+        ])
+
+    def _measure(self, repeat, build):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = build()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000, body
+
+    def _quiet(self, build):
+        # O OrderSerializer imprime mensagens de depuração para cada ingrediente
+        with contextlib.redirect_stdout(io.StringIO()):
+            return build()
+
+    def _compare(self, label, repeat, serializer, projection):
+        serializer_ms, expected = self._measure(repeat, serializer)
+        projection_ms, body = self._measure(repeat, projection)
+        self.stdout.write(
+            f'{label}: serializer {serializer_ms:.1f} ms, projeção {projection_ms:.1f} ms '
+            f'({serializer_ms / projection_ms:.1f}x), {len(body)} bytes, '
+            f"{'idêntico' if body == expected else 'DIFERENTE'}"
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        renderer = JSONRenderer()
+        try:
+            with transaction.atomic():
+                self._seed(options['orders'], options['items'], options['products'])
+                orders = Order.objects.order_by('-created_at')
+                # Mesmos select_related/prefetch_related da listagem do OrderViewSet
+                prefetched = prefetch_requested(
+                    orders, SparseFields(), select=ORDER_SELECT, prefetch=ORDER_PREFETCH, expandable=ORDER_EXPANDABLE
+                )
+                products = with_ingredients(Product.objects.filter(is_active=True)).order_by('created_at')
+
+                self._compare(
+                    f"Pedidos ({options['orders']} x {options['items']} itens)", repeat,
+                    lambda: self._quiet(lambda: renderer.render(OrderSerializer(prefetched.all(), many=True).data)),
+                    lambda: renderer.render(OrderProjection().serialize(orders.all())),
+                )
+                self._compare(
+                    f"Produtos da vitrine ({options['products']})", repeat,
+                    lambda: renderer.render(StoreProductSerializer(products.all(), many=True).data),
+                    lambda: renderer.render(ProductProjection().serialize(products.all())),
+                )
+                raise Rollback()
+        except Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark concluído (dados de teste descartados)'))
@@ -29,6 +29,10 @@ class Order(models.Model):
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
         ordering = ['-created_at']
+        indexes = [
+            # Fila da cozinha: pedidos em aberto por status, em ordem de chegada
+            models.Index(fields=['status', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Pedido #{self.id} - {self.customer_name}"
@@ -0,0 +1,51 @@
+"""
+Projeções (ver app.projection) equivalentes aos serializers de pedidos,
+usadas nas listagens de pedidos.
+"""
+from app.projection import Projection
+from products.loaders import product_ids_by_name, ingredient_groups
+from products.projections import ProductProjection
+from .serializers import OrderSerializer, OrderItemSerializer, OrderItemIngredientSerializer
+
+
+class OrderItemIngredientProjection(Projection):
+    serializer_class = OrderItemIngredientSerializer
+    columns = ('order_item__product_id', 'order_item__product_name')
+
+    def prepare(self, rows):
+        # Mesmas regras de OrderItemIngredientSerializer.get_group_name, em lote
+        names = {row['order_item__product_name'] for row in rows if row['order_item__product_id'] is None}
+        products = product_ids_by_name(list(names)) if names else {}
+        for row in rows:
+            product_id = row['order_item__product_id']
+            row['_product_id'] = product_id if product_id is not None else products[row['order_item__product_name']]
+        pairs = {(row['_product_id'], row['ingredient_id']) for row in rows if row['_product_id'] is not None}
+        self._groups = ingredient_groups(list(pairs)) if pairs else {}
+
+    def get_group_name(self, row):
+        return self._groups.get((row['_product_id'], row['ingredient_id']), 'Outros')
+
+
+class OrderItemProjection(Projection):
+    serializer_class = OrderItemSerializer
+    nested = {'product': ProductProjection, 'ingredients': OrderItemIngredientProjection}
+
+    def get_total_price(self, row):
+        base_price = row['unit_price'] * row['quantity']
+        ingredients_price = sum(ingredient['price'] for ingredient in row['ingredients'])
+        return base_price + ingredients_price
+
+
+class OrderProjection(Projection):
+    serializer_class = OrderSerializer
+    nested = {'items': OrderItemProjection}
+    columns = ('client_order__customer_name', 'client_order__customer_phone', 'client_order__customer_address')
+
+    def get_customer_name(self, row):
+        return row['client_order__customer_name']
+
+    def get_customer_phone(self, row):
+        return row['client_order__customer_phone']
+
+    def get_customer_address(self, row):
+        return row['client_order__customer_address']
@@ -1,10 +1,15 @@
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from app.loaders import BatchLoadingMixin, BatchListSerializer, get_loader
+from app.serializers import SparseFieldsMixin
 from .models import Order, OrderItem, OrderItemIngredient
 from products.serializers import ProductSerializer, IngredientSerializer
 from products.models import Product, Ingredient, ProductIngredient
+from products.loaders import product_ids_by_name, ingredient_groups
+from .loaders import ingredient_prices
 
-class OrderItemIngredientSerializer(serializers.ModelSerializer):
+class OrderItemIngredientSerializer(BatchLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo OrderItemIngredient.
     Inclui informações do ingrediente relacionado.
@@ -22,33 +27,35 @@ class OrderItemIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'order_item', 'ingredient', 'ingredient_id',
                  'is_added', 'price', 'created_at', 'updated_at', 'group_name')
         read_only_fields = ('id', 'created_at', 'updated_at')
+        expandable_fields = ('ingredient',)
+        list_serializer_class = BatchListSerializer
+
+    def _group_key(self, obj):
+        item = obj.order_item
+        product_id = item.product_id
+        if product_id is None:
+            # Item sem produto associado: busca o produto pelo nome
+            product_id = get_loader(self, product_ids_by_name).load(item.product_name)
+        return product_id, obj.ingredient_id
+
+    def register(self, instances):
+        if 'group_name' not in self.fields:
+            return
+        get_loader(self, product_ids_by_name).prime(
+            obj.order_item.product_name for obj in instances if obj.order_item.product_id is None
+        )
+        get_loader(self, ingredient_groups, default='Outros').prime(
+            key for key in map(self._group_key, instances) if key[0] is not None
+        )
 
     def get_group_name(self, obj):
-        try:
-            # Primeiro tenta pegar o produto do order_item
-            product = obj.order_item.product
-            # Se não tiver product, tenta buscar pelo nome
-            if not product:
-                product_name = obj.order_item.product_name
-                product = Product.objects.filter(name__iexact=product_name).first()
-                if product:
-                    print(f"[AUTO-FIX] Produto associado dinamicamente para OrderItem {obj.order_item.id}: {product.name}")
-                else:
-                    print(f"[DEBUG] Produto não encontrado para o OrderItem {obj.order_item.id} (nem por nome)")
-                    return 'Outros'
-            # Busca o ProductIngredient para este produto e ingrediente
-            try:
-                pi = ProductIngredient.objects.get(product=product, ingredient=obj.ingredient)
-                print(f"[DEBUG] Produto: {product.name}, Ingrediente: {obj.ingredient.name}, Grupo: {pi.group_name}")
-                return pi.group_name
-            except ProductIngredient.DoesNotExist:
-                print(f"[DEBUG] Produto: {product.name}, Ingrediente: {obj.ingredient.name}, Grupo não encontrado!")
-                return 'Outros'
-        except Exception as e:
-            print(f"[DEBUG] Erro ao buscar group_name: {e}")
+        # Grupo do ingrediente no produto (ProductIngredient); 'Outros' se não houver um único vínculo
+        product_id, ingredient_id = self._group_key(obj)
+        if product_id is None:
             return 'Outros'
+        return get_loader(self, ingredient_groups, default='Outros').load((product_id, ingredient_id))
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(BatchLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo OrderItem.
     Inclui informações do produto e ingredientes personalizados.
@@ -69,16 +76,28 @@ class OrderItemSerializer(serializers.ModelSerializer):
                  'unit_price', 'notes', 'ingredients', 'total_price',
                  'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
+        # O produto completo só sai com ?expand=items.product (ver app.serializers)
+        expandable_fields = ('product',)
+        list_serializer_class = BatchListSerializer
+
+    def register(self, instances):
+        if 'total_price' in self.fields:
+            get_loader(self, ingredient_prices).prime(
+                obj.pk for obj in instances if 'ingredients' not in getattr(obj, '_prefetched_objects_cache', {})
+            )
 
     def get_total_price(self, obj):
         """
         Calcula o preço total do item incluindo ingredientes personalizados.
         """
         base_price = obj.unit_price * obj.quantity
-        ingredients_price = sum(ing.price for ing in obj.ingredients.all())
+        if 'ingredients' in getattr(obj, '_prefetched_objects_cache', {}):
+            ingredients_price = sum(ing.price for ing in obj.ingredients.all())
+        else:
+            ingredients_price = get_loader(self, ingredient_prices).load(obj.pk)
         return base_price + ingredients_price
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(BatchLoadingMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo Order.
     Inclui informações dos itens do pedido.
@@ -96,6 +115,7 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ('id', 'customer_name', 'customer_phone', 'customer_address', 'status', 'status_display', 'total_amount',
                  'notes', 'items', 'created_at', 'updated_at', 'payment_method', 'change_amount')
         read_only_fields = ('id', 'created_at', 'updated_at')
+        list_serializer_class = BatchListSerializer
 
     def get_customer_name(self, obj):
         if hasattr(obj, 'client_order'):
@@ -129,11 +149,12 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         fields = ('customer_name', 'customer_phone', 'customer_address', 'notes', 'items', 'total_amount', 'payment_method', 'change_amount')
         read_only_fields = ('id', 'created_at', 'updated_at', 'status')
 
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         total_amount = validated_data.pop('total_amount', 0)
-        payment_method = validated_data.get('payment_method')
-        change_amount = validated_data.get('change_amount')
+        payment_method = validated_data.pop('payment_method', None)
+        change_amount = validated_data.pop('change_amount', None)
         
         # Validação extra: todo item deve ter product_id
         for idx, item in enumerate(items_data):
@@ -1,3 +1,357 @@
-from django.test import TestCase
+import contextlib
+import datetime
+import decimal
+import io
+import json
+import unittest
+import uuid
 
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from app.loaders import BatchLoader, get_loader
+from app.renderers import FastJSONRenderer, msgpack
+from app.serializers import SparseFields
+from app.testing import IsolatedTestCase
+from client_orders.models import ClientOrder
+from products.models import Category, Product, Ingredient, IngredientCategory, ProductIngredient
+from .models import Order, OrderItem, OrderItemIngredient
+from .kitchen import kitchen_orders
+from .loaders import ingredient_prices
+from .projections import OrderProjection
+from .serializers import OrderSerializer
+
+
+class OrderProjectionTest(IsolatedTestCase):
+    """
+    A projeção da listagem de pedidos deve gerar o mesmo JSON que o OrderSerializer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Lanches')
+        sauces = IngredientCategory.objects.create(name='Molhos')
+        cheese = Ingredient.objects.create(name='Queijo', price='3.50', category=sauces)
+        onion = Ingredient.objects.create(name='Cebola', price='1.00')
+        burger = Product.objects.create(name='X-Burguer', description='Pão e carne', price='25.90',
+                                        category=category, image='products/x.png')
+        juice = Product.objects.create(name='Suco', description='', price='8.00', category=category)
+        ProductIngredient.objects.create(product=burger, ingredient=cheese, group_name='Adicionais')
+        # Ingrediente ligado duas vezes ao produto: o serializer responde 'Outros'
+        ProductIngredient.objects.create(product=burger, ingredient=onion, group_name='Retirar')
+        ProductIngredient.objects.create(product=burger, ingredient=onion, group_name='Extras')
+
+        first = Order.objects.create(customer_name='Ana', customer_phone='1', status='pending',
+                                     total_amount='37.40', payment_method='pix')
+        item = OrderItem.objects.create(order=first, product=burger, product_name=burger.name,
+                                        quantity=2, unit_price='25.90', notes='bem passado')
+        OrderItemIngredient.objects.create(order_item=item, ingredient=cheese, is_added=True, price='3.50')
+        OrderItemIngredient.objects.create(order_item=item, ingredient=onion, is_added=False, price='0.00')
+        OrderItem.objects.create(order=first, product=juice, product_name=juice.name, quantity=1, unit_price='8.00')
+
+        second = Order.objects.create(customer_name='Bruno', customer_phone='2', status='delivered',
+                                      total_amount='25.90', change_amount='50.00')
+        ClientOrder.objects.create(order=second, customer_name='Bruno Silva', customer_phone='99',
+                                   customer_address='Rua A, 1', total_amount='25.90')
+        # Item sem produto: o grupo é buscado pelo nome do produto
+        legacy = OrderItem.objects.create(order=second, product=None, product_name='x-burguer',
+                                          quantity=1, unit_price='25.90')
+        OrderItemIngredient.objects.create(order_item=legacy, ingredient=cheese, is_added=True, price='3.50')
+
+        Order.objects.create(customer_name='Carla', customer_phone='3', status='cancelled', total_amount='0')
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def expected(self, queryset, context=None):
+        # O serializer imprime mensagens de depuração ao buscar os grupos
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.render(OrderSerializer(queryset, many=True, context=context or {}).data)
+
+    def test_matches_order_serializer(self):
+        queryset = Order.objects.order_by('-created_at')
+        self.assertEqual(self.render(OrderProjection().serialize(queryset)), self.expected(queryset))
+
+    def test_matches_order_serializer_with_request(self):
+        request = Request(APIRequestFactory().get('/api/orders/'))
+        queryset = Order.objects.order_by('-created_at')
+        self.assertEqual(
+            self.render(OrderProjection(context={'request': request}).serialize(queryset)),
+            self.expected(queryset, {'request': request}),
+        )
+
+    def test_list_endpoint(self):
+        response = APIClient().get('/api/orders/')
+        self.assertEqual(response.status_code, 200)
+        request = response.wsgi_request
+        expected = self.expected(Order.objects.order_by('-created_at'), {'request': Request(request)})
+        self.assertEqual(self.render(response.data['results']), expected)
+
+
+class RendererTest(IsolatedTestCase):
+    """
+    Os renderers/parsers rápidos devem ser equivalentes aos do DRF.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Lanches')
+        product = Product.objects.create(name='X-Burguer', description='Pão e carne', price='25.90', category=category)
+        cheese = Ingredient.objects.create(name='Queijo', price='3.50')
+        cls.order = Order.objects.create(customer_name='Ana', customer_phone='1', status='pending',
+                                         total_amount='29.40', payment_method='pix')
+        item = OrderItem.objects.create(order=cls.order, product=product, product_name=product.name,
+                                        quantity=1, unit_price='25.90')
+        OrderItemIngredient.objects.create(order_item=item, ingredient=cheese, is_added=True, price='3.50')
+
+    def test_fast_json_matches_json_renderer(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            orders = OrderSerializer(Order.objects.all(), many=True).data
+        payloads = [
+            orders,
+            {
+                'decimal': decimal.Decimal('10.50'), 'utc': timezone.now(), 'local': timezone.localtime(),
+                'date': datetime.date(2024, 1, 2), 'time': datetime.time(10, 30, 1, 5), 'uuid': uuid.uuid4(),
+                'lazy': gettext_lazy('Pedido'), 'text': 'açaí \u2028 "x"\n', 1: (1, 2), 'big': 2 ** 70,
+            },
+        ]
+        for data in payloads:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_json_parser(self):
+        response = APIClient().post(f'/api/orders/{self.order.pk}/update-status/', '{"status": "preparing"}',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'preparing')
+
+    @unittest.skipUnless(msgpack, 'msgpack não instalado')
+    def test_msgpack_list(self):
+        client = APIClient()
+        body = json.loads(client.get('/api/orders/', HTTP_ACCEPT='application/json').content)
+        response = client.get('/api/orders/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), body)
+        self.assertEqual(client.get('/api/orders/?format=msgpack').content, response.content)
+
+    @unittest.skipUnless(msgpack, 'msgpack não instalado')
+    def test_msgpack_parser(self):
+        response = APIClient().post(f'/api/orders/{self.order.pk}/update-status/', msgpack.packb({'status': 'ready'}),
+                                    content_type='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'ready')
+
+    @unittest.skipUnless(msgpack, 'msgpack não instalado')
+    def test_invalid_msgpack(self):
+        response = APIClient().post(f'/api/orders/{self.order.pk}/update-status/', b'\xc1',
+                                    content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsTest(IsolatedTestCase):
+    """
+    ?fields= e ?expand= devem podar a resposta e as consultas, sem mudar a
+    resposta completa.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Lanches')
+        cheese = Ingredient.objects.create(name='Queijo', price='3.50')
+        cls.burger = Product.objects.create(name='X-Burguer', description='', price='25.90', category=category)
+        ProductIngredient.objects.create(product=cls.burger, ingredient=cheese, group_name='Adicionais')
+        for number in range(3):
+            order = Order.objects.create(customer_name='Ana', customer_phone='1', total_amount='29.40')
+            item = OrderItem.objects.create(order=order, product=cls.burger, product_name=cls.burger.name,
+                                            quantity=1, unit_price='25.90')
+            OrderItemIngredient.objects.create(order_item=item, ingredient=cheese, is_added=True, price='3.50')
+        cls.order = order
+
+    def get(self, url, **params):
+        # O serializer imprime mensagens de depuração ao buscar os grupos
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = APIClient().get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_spec(self):
+        spec = SparseFields(['id', 'items.product', 'items.ingredients'], ['items.ingredients.ingredient'])
+        self.assertFalse(spec.includes('items.quantity'))
+        self.assertTrue(spec.includes('items.product', expandable=True))
+        self.assertTrue(spec.includes('items.ingredients.price'))
+        self.assertTrue(spec.includes('items.ingredients.ingredient', expandable=True))
+        self.assertFalse(SparseFields(['id'], ['items.product']).includes('items'))
+        self.assertFalse(SparseFields(expand=['items.product']).includes('items.ingredients.ingredient',
+                                                                            expandable=True))
+        self.assertTrue(SparseFields().includes('anything', expandable=True))
+        self.assertFalse(SparseFields())
+
+    def test_fields(self):
+        url = f'/api/orders/{self.order.pk}/'
+        full = self.get(url)
+        self.assertEqual(full['items'][0]['product']['name'], 'X-Burguer')
+
+        data = self.get(url, fields='id,items.product_name,items.quantity')
+        self.assertEqual(data, {'id': self.order.pk, 'items': [{'product_name': 'X-Burguer', 'quantity': 1}]})
+        # Relação pedida explicitamente em ?fields= sai, mas as relações dela só com ?expand=
+        product = self.get(url, fields='items.product')['items'][0]['product']
+        self.assertEqual(product['name'], 'X-Burguer')
+        self.assertEqual(product['category'], self.burger.category_id)
+        self.assertNotIn('available_ingredients', product)
+        product = self.get(url, fields='items.product', expand='items.product.category')['items'][0]['product']
+        self.assertEqual(product['category'], full['items'][0]['product']['category'])
+
+    def test_expand(self):
+        url = f'/api/orders/{self.order.pk}/'
+        full = self.get(url)
+        data = self.get(url, expand='items.ingredients.ingredient')
+        item = data['items'][0]
+        # Chave estrangeira não expandida vira só o id
+        self.assertEqual(item['product'], self.burger.pk)
+        self.assertEqual(item['ingredients'], full['items'][0]['ingredients'])
+        self.assertEqual(data['total_amount'], full['total_amount'])
+
+    def test_list_skips_unrequested_relations(self):
+        client = APIClient()
+        with contextlib.redirect_stdout(io.StringIO()), CaptureQueriesContext(connection) as full:
+            client.get('/api/orders/')
+        with CaptureQueriesContext(connection) as sparse:
+            response = client.get('/api/orders/', {'fields': 'id,status'})
+        self.assertEqual(response.json()['results'][0], {'id': self.order.pk, 'status': 'pending'})
+        self.assertLess(len(sparse), len(full))
+        self.assertFalse(any('products_product' in query['sql'] for query in sparse.captured_queries))
+
+
+class KitchenTest(IsolatedTestCase):
+    """
+    A fila da cozinha deve sair em ordem de preparo, com os adicionais e
+    retiradas de cada item, em duas consultas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Lanches')
+        cheese = Ingredient.objects.create(name='Queijo', price='3.50')
+        onion = Ingredient.objects.create(name='Cebola', price='1.00')
+        burger = Product.objects.create(name='X-Burguer', description='', price='25.90', category=category)
+
+        cls.first = Order.objects.create(customer_name='Ana', customer_phone='1', total_amount='29.40',
+                                         status='pending', notes='sem pressa')
+        item = OrderItem.objects.create(order=cls.first, product=burger, product_name='X-Burguer', quantity=2,
+                                        unit_price='25.90', notes='bem passado')
+        OrderItemIngredient.objects.create(order_item=item, ingredient=cheese, is_added=True, price='3.50')
+        OrderItemIngredient.objects.create(order_item=item, ingredient=onion, is_added=False, price='0.00')
+        OrderItem.objects.create(order=cls.first, product=None, product_name='Suco', quantity=1, unit_price='8.00')
+
+        cls.second = Order.objects.create(customer_name='Bruno', customer_phone='2', total_amount='25.90',
+                                          status='preparing')
+        ClientOrder.objects.create(order=cls.second, customer_name='Bruno Silva', customer_phone='99',
+                                   customer_address='Rua A, 1', total_amount='25.90')
+        OrderItem.objects.create(order=cls.second, product=burger, product_name='X-Burguer', quantity=1,
+                                 unit_price='25.90')
+        # Pedido sem itens e pedido fora da cozinha
+        cls.empty = Order.objects.create(customer_name='Carla', customer_phone='3', total_amount='0',
+                                         status='ready')
+        Order.objects.create(customer_name='Davi', customer_phone='4', total_amount='10', status='delivered')
+        # O mais antigo é preparado primeiro
+        Order.objects.filter(pk=cls.first.pk).update(created_at=timezone.now() - datetime.timedelta(minutes=10))
+
+    def test_kitchen_orders(self):
+        with self.assertNumQueries(2):
+            orders = kitchen_orders()
+        self.assertEqual([order['id'] for order in orders], [self.first.pk, self.second.pk, self.empty.pk])
+        first = orders[0]
+        self.assertEqual(first['notes'], 'sem pressa')
+        self.assertEqual(
+            [(item['product_name'], item['quantity'], item['notes'], item['added'], item['removed'])
+             for item in first['items']],
+            [('X-Burguer', 2, 'bem passado', ['Queijo'], ['Cebola']), ('Suco', 1, '', [], [])],
+        )
+        # Pedido feito pela loja usa o nome do cliente do pedido online
+        self.assertEqual(orders[1]['customer_name'], 'Bruno Silva')
+        self.assertEqual(orders[2]['items'], [])
+
+    def test_endpoints(self):
+        client = APIClient()
+        board = client.get('/api/orders/kitchen/').json()
+        self.assertEqual({status: [order['id'] for order in orders] for status, orders in board.items()},
+                         {'pending': [self.first.pk], 'preparing': [self.second.pk], 'ready': [self.empty.pk]})
+        for status, order in (('pending', self.first), ('preparing', self.second), ('ready', self.empty)):
+            response = client.get(f'/api/orders/{status}/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([o['id'] for o in response.json()], [order.pk])
+
+
+class BatchLoaderTest(IsolatedTestCase):
+    """
+    Os loaders devem resolver as chaves de todas as linhas em uma consulta,
+    em vez de uma por linha.
+    """
+
+    def test_loader(self):
+        calls = []
+
+        def double(keys):
+            calls.append(sorted(keys))
+            return {key: key * 2 for key in keys if key != 3}
+
+        loader = BatchLoader(double, default=-1)
+        loader.prime([1, 2, 3])
+        self.assertEqual(loader.load(2), 4)
+        self.assertEqual(loader.load(3), -1)
+        self.assertEqual(loader.load_many([1, 2, 4]), [2, 4, 8])
+        loader.prime([1, 2])
+        self.assertEqual(loader.load(1), 2)
+        self.assertEqual(calls, [[1, 2, 3], [4]])
+
+    def test_loader_scope(self):
+        request = Request(APIRequestFactory().get('/api/orders/'))
+        first = OrderSerializer(context={'request': request})
+        second = OrderSerializer(context={'request': request})
+        self.assertIs(get_loader(first, ingredient_prices), get_loader(second, ingredient_prices))
+        # Sem request, cada serializer raiz tem os próprios loaders
+        self.assertIsNot(get_loader(OrderSerializer(), ingredient_prices),
+                         get_loader(OrderSerializer(), ingredient_prices))
+
+    def create_orders(self, count):
+        category = Category.objects.create(name=f'Lanches {count}')
+        cheese = Ingredient.objects.create(name=f'Queijo {count}', price='3.50')
+        product = Product.objects.create(name=f'X-Burguer {count}', description='', price='25.90',
+                                         category=category)
+        ProductIngredient.objects.create(product=product, ingredient=cheese, group_name='Adicionais')
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(customer_name='Ana', customer_phone='1', total_amount='29.40')
+            item = OrderItem.objects.create(order=order, product=product, product_name=product.name,
+                                            quantity=1, unit_price='25.90')
+            OrderItemIngredient.objects.create(order_item=item, ingredient=cheese, is_added=True, price='3.50')
+            # Item sem produto: o grupo é buscado pelo nome
+            legacy = OrderItem.objects.create(order=order, product=None, product_name=product.name.lower(),
+                                              quantity=1, unit_price='25.90')
+            OrderItemIngredient.objects.create(order_item=legacy, ingredient=cheese, is_added=True, price='3.50')
+            orders.append(order.pk)
+        # Mesmo carregamento da listagem; os grupos dos ingredientes ficam com os loaders
+        return Order.objects.filter(pk__in=orders).select_related('client_order').prefetch_related(
+            'items__ingredients__ingredient__category', 'items__product__category',
+            'items__product__ingredients__ingredient__category',
+        )
+
+    def serialize(self, queryset):
+        with contextlib.redirect_stdout(io.StringIO()), CaptureQueriesContext(connection) as queries:
+            data = OrderSerializer(queryset, many=True).data
+        return data, len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        small, small_queries = self.serialize(self.create_orders(2))
+        large, large_queries = self.serialize(self.create_orders(6))
+        self.assertEqual(len(large), 6)
+        self.assertEqual(large_queries, small_queries)
+        item = large[0]['items'][1]
+        self.assertEqual(item['ingredients'][0]['group_name'], 'Adicionais')
+        self.assertEqual(decimal.Decimal(str(item['total_price'])), decimal.Decimal('29.40'))
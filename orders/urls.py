@@ -13,5 +13,9 @@ urlpatterns = [
         'delete': 'destroy'
     }), name='order-detail'),
     path('<int:pk>/update-status/', OrderViewSet.as_view({'post': 'update_status'}), name='order-update-status'),
+    path('kitchen/', OrderViewSet.as_view({'get': 'kitchen'}), name='order-kitchen'),
+    path('pending/', OrderViewSet.as_view({'get': 'pending'}), name='order-pending'),
+    path('preparing/', OrderViewSet.as_view({'get': 'preparing'}), name='order-preparing'),
+    path('ready/', OrderViewSet.as_view({'get': 'ready'}), name='order-ready'),
     path('printer-settings/', PrinterSettingsView.as_view(), name='printer-settings'),
 ] 
\ No newline at end of file
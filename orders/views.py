@@ -11,6 +11,28 @@ from .serializers import (
     OrderUpdateSerializer, OrderItemSerializer
 )
 from settings.models import Settings
+from settings.cache import get_settings
+from .kitchen import kitchen_orders, kitchen_board
+from app.serializers import SparseFields, prefetch_requested
+from app.projection import ProjectionListMixin
+from app.streaming import stream_list
+from .projections import OrderProjection
+
+# Relações carregadas para cada campo do OrderSerializer (só as pedidas em ?fields=/?expand=)
+ORDER_SELECT = (
+    ('customer_name', 'client_order'),
+    ('customer_phone', 'client_order'),
+    ('customer_address', 'client_order'),
+)
+ORDER_PREFETCH = (
+    ('items', 'items'),
+    ('items.total_price', 'items__ingredients'),
+    ('items.ingredients', 'items__ingredients__ingredient__category'),
+    ('items.ingredients.group_name', 'items__product'),
+    ('items.product', 'items__product__category'),
+    ('items.product', 'items__product__ingredients__ingredient__category'),
+)
+ORDER_EXPANDABLE = ('items.product', 'items.ingredients.ingredient')
 
 class CreateOrderView(views.APIView):
     """
@@ -20,7 +42,7 @@ class CreateOrderView(views.APIView):
         serializer = OrderCreateSerializer(data=request.data)
         if serializer.is_valid():
             # Pegar as configurações do sistema
-            settings = Settings.objects.first()
+            settings = get_settings()
             if not settings:
                 return Response(
                     {'error': 'Nenhuma configuração encontrada'},
@@ -34,11 +56,13 @@ class CreateOrderView(views.APIView):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ProjectionListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de pedidos.
     """
     serializer_class = OrderSerializer
+    # A listagem usa a projeção equivalente ao OrderSerializer (ver app.projection)
+    projection_class = OrderProjection
     http_method_names = ['get', 'put', 'patch', 'delete', 'post']
 
     def get_serializer_class(self):
@@ -55,7 +79,13 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         Retorna todos os pedidos.
         """
-        return Order.objects.all().order_by('-created_at')
+        queryset = Order.objects.all().order_by('-created_at')
+        if self.request.method == 'GET':
+            queryset = prefetch_requested(
+                queryset, SparseFields.from_request(self.request),
+                select=ORDER_SELECT, prefetch=ORDER_PREFETCH, expandable=ORDER_EXPANDABLE
+            )
+        return queryset
 
     def create(self, request, *args, **kwargs):
         """
@@ -64,7 +94,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             # Pegar as configurações do sistema
-            settings = Settings.objects.first()
+            settings = get_settings()
             if not settings:
                 return Response(
                     {'error': 'Nenhuma configuração encontrada'},
@@ -98,32 +128,34 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(order)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def kitchen(self, request):
+        """
+        Retorna os pedidos em aberto (pendentes, em preparo e prontos)
+        agrupados por status, no formato compacto da cozinha.
+        """
+        return Response(kitchen_board())
+
     @action(detail=False, methods=['get'])
     def pending(self, request):
         """
         Retorna pedidos pendentes.
         """
-        orders = self.get_queryset().filter(status='pending')
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+        return Response(kitchen_orders(('pending',)))
 
     @action(detail=False, methods=['get'])
     def preparing(self, request):
         """
         Retorna pedidos em preparo.
         """
-        orders = self.get_queryset().filter(status='preparing')
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+        return Response(kitchen_orders(('preparing',)))
 
     @action(detail=False, methods=['get'])
     def ready(self, request):
         """
         Retorna pedidos prontos.
         """
-        orders = self.get_queryset().filter(status='ready')
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+        return Response(kitchen_orders(('ready',)))
 
     @action(detail=False, methods=['get'])
     def today(self, request):
@@ -182,16 +214,16 @@ class ListOrdersView(views.APIView):
     View para listar pedidos.
     """
     def get(self, request, *args, **kwargs):
-        orders = Order.objects.all().order_by('-created_at')
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        projection = OrderProjection()
+        orders = projection.values(Order.objects.all().order_by('-created_at'))
+        return stream_list(request, orders, projection.serialize)
 
 class PrinterSettingsView(views.APIView):
     """
     View para gerenciar configurações da impressora.
     """
     def get(self, request):
-        settings = Settings.objects.first()
+        settings = get_settings()
         return Response({
             'printer_name': settings.printer_name if settings else None
         })
@@ -0,0 +1,53 @@
+"""
+Funções de lote (ver app.loaders) para dados de produtos.
+"""
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import Product, ProductIngredient
+
+
+def product_ids_by_name(names):
+    """
+    Id do produto de cada nome, sem diferenciar maiúsculas (mesmo resultado
+    de Product.objects.filter(name__iexact=nome).first()).
+    """
+    query = Q()
+    for name in names:
+        query |= Q(name__iexact=name)
+    found = {}
+    for product_id, name in Product.objects.filter(query).values_list('pk', 'name'):
+        found.setdefault(name.lower(), product_id)
+    return {name: found.get(name.lower()) for name in names}
+
+
+def product_ingredients(product_ids):
+    """
+    Ingredientes (com ingrediente e subcategoria) de cada produto.
+    """
+    found = defaultdict(list)
+    queryset = ProductIngredient.objects.filter(product_id__in=product_ids).select_related(
+        'ingredient', 'ingredient__category'
+    ).order_by('pk')
+    for product_ingredient in queryset:
+        found[product_ingredient.product_id].append(product_ingredient)
+    return found
+
+
+def ingredient_groups(pairs):
+    """
+    Grupo de cada par (produto, ingrediente). Pares sem vínculo, ou com mais
+    de um, ficam de fora.
+    """
+    counts = defaultdict(int)
+    groups = {}
+    queryset = ProductIngredient.objects.filter(
+        product_id__in={product_id for product_id, _ in pairs},
+        ingredient_id__in={ingredient_id for _, ingredient_id in pairs},
+    ).values_list('product_id', 'ingredient_id', 'group_name')
+    for product_id, ingredient_id, group_name in queryset:
+        counts[product_id, ingredient_id] += 1
+        groups[product_id, ingredient_id] = group_name
+    return {pair: group for pair, group in groups.items() if counts[pair] == 1}
+
@@ -0,0 +1,33 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from app import images
+
+
+class Command(BaseCommand):
+    help = 'Gera as variantes (tamanhos reduzidos, WebP e placeholder) das imagens já enviadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Gera de novo mesmo as que já têm variantes')
+        parser.add_argument('--workers', type=int, default=None, help='Processos em paralelo (padrão: um por CPU)')
+
+    def handle(self, *args, **options):
+        tasks = []
+        for model, field_name in images.TRACKED:
+            queryset = model._default_manager.exclude(Q(**{f'{field_name}__isnull': True}) | Q(**{field_name: ''}))
+            for instance in queryset.only('pk', field_name, images.variants_field(field_name)):
+                variants = getattr(instance, images.variants_field(field_name)) or {}
+                if options['force'] or variants.get('source') != getattr(instance, field_name).name:
+                    tasks.append((model._meta.label, instance.pk, field_name))
+
+        failed = 0
+        with images.create_pool(options['workers']) as executor:
+            futures = {executor.submit(images.process, *task, force=options['force']): task for task in tasks}
+            for future in as_completed(futures):
+                label, pk, field_name = futures[future]
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(f'{label} {pk} ({field_name}): {future.exception()}')
+        self.stdout.write(self.style.SUCCESS(f'Imagens processadas: {len(tasks) - failed} de {len(tasks)}'))
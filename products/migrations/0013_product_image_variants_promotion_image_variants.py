@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_promotion_image_alter_promotion_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes da imagem'),
+        ),
+        migrations.AddField(
+            model_name='promotion',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes da imagem'),
+        ),
+    ]
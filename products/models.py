@@ -27,6 +27,8 @@ class Product(models.Model):
     description = models.TextField(verbose_name='Descrição')
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Preço')
     image = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name='Imagem')
+    # Mapa das versões reduzidas geradas em segundo plano (ver app.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Variantes da imagem')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', verbose_name='Categoria')
     is_active = models.BooleanField(default=True, verbose_name='Ativo')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -106,6 +108,8 @@ class Promotion(models.Model):
     description = models.TextField(verbose_name='Descrição')
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Preço')
     image = models.ImageField(upload_to='promotions/', blank=True, null=True, verbose_name='Imagem')
+    # Mapa das versões reduzidas geradas em segundo plano (ver app.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Variantes da imagem')
     is_active = models.BooleanField(default=True, verbose_name='Ativa')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
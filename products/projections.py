@@ -0,0 +1,15 @@
+"""
+Projeções (ver app.projection) equivalentes aos serializers de produtos.
+"""
+from app.images import srcset
+from app.projection import Projection
+from .models import Product
+from .serializers import ProductSerializer
+
+
+class ProductProjection(Projection):
+    serializer_class = ProductSerializer
+    columns = ('image_variants',)
+
+    def get_image_variants(self, row):
+        return srcset(row['image_variants'], Product._meta.get_field('image').storage, self.context.get('request'))
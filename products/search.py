@@ -0,0 +1,34 @@
+"""
+Busca da administração do cardápio: todos os produtos, categorias e
+ingredientes, inclusive os inativos (que não estão no snapshot da vitrine),
+lidos do banco com values_list (ver app.search). O índice acompanha os
+carimbos de versão do catálogo.
+"""
+from app import versioning
+from app.search import IndexStore, named_document, product_document
+from .models import Category, Ingredient, Product, ProductIngredient
+from .signals import CATALOG_STAMPS
+
+
+def catalog_documents():
+    """
+    Documentos de busca do catálogo completo.
+    """
+    product_ingredients = {}
+    for product_id, name in ProductIngredient.objects.values_list('product_id', 'ingredient__name').order_by('pk'):
+        product_ingredients.setdefault(product_id, []).append(name)
+
+    documents = []
+    products = Product.objects.values_list('id', 'name', 'description', 'is_active', 'category_id', 'category__name')
+    for product_id, name, description, is_active, category_id, category_name in products.order_by('pk'):
+        documents.append(product_document(
+            product_id, name, category_id, category_name, product_ingredients.get(product_id, ()), description,
+            is_active=is_active,
+        ))
+    for model in (Category, Ingredient):
+        for pk, name, description, is_active in model.objects.values_list('id', 'name', 'description', 'is_active'):
+            documents.append(named_document(model._meta.model_name, pk, name, description, is_active=is_active))
+    return documents
+
+
+catalog_index = IndexStore(lambda: versioning.version(*CATALOG_STAMPS), catalog_documents)
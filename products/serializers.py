@@ -1,9 +1,11 @@
 from rest_framework import serializers
+from app.images import srcset
+from app.serializers import SparseFieldsMixin
 from .models import Category, Product, Ingredient, ProductIngredient, IngredientCategory, Promotion, PromotionItem, PromotionReward
 from django.conf import settings as django_settings
 import json
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo Category.
     """
@@ -12,12 +14,12 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'description', 'is_active', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
-class IngredientCategorySerializer(serializers.ModelSerializer):
+class IngredientCategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = IngredientCategory
         fields = ('id', 'name', 'description')
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo Ingredient.
     """
@@ -26,14 +28,14 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ['id', 'name', 'price', 'category']
 
-class ProductIngredientSerializer(serializers.ModelSerializer):
+class ProductIngredientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ingredient = IngredientSerializer(read_only=True)
 
     class Meta:
         model = ProductIngredient
         fields = ['id', 'ingredient', 'group_name', 'is_required', 'max_quantity']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo Product.
     Inclui informações da categoria e ingredientes disponíveis.
@@ -45,13 +47,15 @@ class ProductSerializer(serializers.ModelSerializer):
         source='category'
     )
     available_ingredients = ProductIngredientSerializer(many=True, read_only=True, source='ingredients')
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = ('id', 'category', 'category_id', 'name',
-                 'description', 'price', 'image', 'is_active',
+                 'description', 'price', 'image', 'image_variants', 'is_active',
                  'available_ingredients', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
+        expandable_fields = ('category', 'available_ingredients')
 
     def to_representation(self, instance):
         """
@@ -59,27 +63,18 @@ class ProductSerializer(serializers.ModelSerializer):
         """
         representation = super().to_representation(instance)
         # Garante que available_ingredients seja uma lista vazia se não houver ingredientes
-        if not representation.get('available_ingredients'):
+        if 'available_ingredients' in self.fields and not representation.get('available_ingredients'):
             representation['available_ingredients'] = []
         return representation
 
+    def get_image_variants(self, obj):
+        return srcset(obj.image_variants, obj.image.storage, self.context.get('request'))
+
 class ProductDetailSerializer(ProductSerializer):
     class Meta(ProductSerializer.Meta):
         fields = ProductSerializer.Meta.fields
 
-    def get_total_orders(self, obj):
-        """
-        Retorna o total de pedidos que incluem este produto.
-        """
-        return obj.orderitem_set.count()
-
-    def get_total_revenue(self, obj):
-        """
-        Retorna a receita total gerada por este produto.
-        """
-        return sum(item.unit_price * item.quantity for item in obj.orderitem_set.all())
-
-class PromotionItemSerializer(serializers.ModelSerializer):
+class PromotionItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo PromotionItem.
     Inclui informações do produto relacionado.
@@ -95,8 +90,9 @@ class PromotionItemSerializer(serializers.ModelSerializer):
         model = PromotionItem
         fields = ('id', 'promotion', 'product', 'product_id', 'quantity', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
+        expandable_fields = ('product',)
 
-class PromotionRewardSerializer(serializers.ModelSerializer):
+class PromotionRewardSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo PromotionReward.
     Inclui informações do produto que pode ser escolhido como brinde.
@@ -112,8 +108,9 @@ class PromotionRewardSerializer(serializers.ModelSerializer):
         model = PromotionReward
         fields = ('id', 'promotion', 'product', 'product_id', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
+        expandable_fields = ('product',)
 
-class PromotionSerializer(serializers.ModelSerializer):
+class PromotionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer para o modelo Promotion.
     Inclui informações dos itens e brindes disponíveis.
@@ -121,10 +118,11 @@ class PromotionSerializer(serializers.ModelSerializer):
     items = PromotionItemSerializer(many=True, read_only=True)
     rewards = PromotionRewardSerializer(many=True, read_only=True)
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Promotion
-        fields = ('id', 'name', 'description', 'price', 'image', 'is_active',
+        fields = ('id', 'name', 'description', 'price', 'image', 'image_variants', 'is_active',
                  'items', 'rewards', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
@@ -136,6 +134,9 @@ class PromotionSerializer(serializers.ModelSerializer):
             return f"{django_settings.MEDIA_URL}{obj.image}"
         return None
 
+    def get_image_variants(self, obj):
+        return srcset(obj.image_variants, obj.image.storage, self.context.get('request'))
+
     def get_savings_amount(self, obj):
         """
         Calcula quanto o cliente economiza com a promoção.
@@ -0,0 +1,24 @@
+from app import versioning, response_cache, images, storage
+from .models import (
+    Category, Product, Ingredient, ProductIngredient, IngredientCategory,
+    Promotion, PromotionItem, PromotionReward
+)
+
+CATALOG_MODELS = (
+    Category, Product, Ingredient, ProductIngredient, IngredientCategory,
+    Promotion, PromotionItem, PromotionReward,
+)
+# Versão do cardápio: muda a cada gravação em qualquer model do catálogo
+CATALOG_STAMPS = tuple(versioning.model_stamp(model) for model in CATALOG_MODELS)
+
+for model in CATALOG_MODELS:
+    versioning.track(model)
+    response_cache.track(model)
+
+# Versões reduzidas das imagens do cardápio
+images.track(Product, 'image')
+images.track(Promotion, 'image')
+
+# Libera a imagem anterior quando ela é trocada ou o registro é removido
+storage.track(Product, 'image')
+storage.track(Promotion, 'image')
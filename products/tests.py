@@ -1,3 +1,418 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+from contextlib import closing
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from app import images, streaming
+from app.storage import ContentAddressedStorage
+from app.testing import IsolatedTestCase
+from .models import Category, Product, Promotion, Ingredient, IngredientCategory, ProductIngredient
+from .serializers import IngredientSerializer, ProductSerializer
+
+
+class StreamingListTest(IsolatedTestCase):
+    """
+    As listagens em streaming devem gerar o mesmo JSON que o JSONRenderer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Lanches')
+        sauces = IngredientCategory.objects.create(name='Molhos')
+        ingredients = [
+            Ingredient.objects.create(name=f'Ingrediente {i}', price='1.50', category=sauces if i % 2 else None)
+            for i in range(5)
+        ]
+        for i in range(5):
+            product = Product.objects.create(name=f'Produto {i}', description='Pão "especial" ', price='10.00',
+                                             category=cls.category)
+            ProductIngredient.objects.create(product=product, ingredient=ingredients[i], group_name='Extras')
+
+    def setUp(self):
+        super().setUp()
+        # Blocos pequenos para exercitar a junção entre eles
+        patcher = mock.patch.object(streaming, 'STREAM_CHUNK_SIZE', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url):
+        response = APIClient().get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_available_ingredients(self):
+        _, body = self.get('/api/products/ingredients/available/')
+        expected = JSONRenderer().render(IngredientSerializer(Ingredient.objects.all(), many=True).data)
+        self.assertEqual(body, expected)
+
+    def test_product_list(self):
+        response, body = self.get('/api/products/products/')
+        context = {'request': Request(response.wsgi_request)}
+        expected = JSONRenderer().render(ProductSerializer(Product.objects.all(), many=True, context=context).data)
+        self.assertEqual(body, expected)
+        self.assertIn('ETag', response)
+
+    def test_category_products(self):
+        _, body = self.get(f'/api/products/categories/{self.category.pk}/products/')
+        expected = JSONRenderer().render(ProductSerializer(Product.objects.filter(category=self.category), many=True).data)
+        self.assertEqual(body, expected)
+
+    def test_empty_list(self):
+        _, body = self.get('/api/products/products/?category=0')
+        self.assertEqual(body, b'[]')
+
+
+@override_settings(IMAGE_WORKERS=0)
+class ImageVariantsTest(IsolatedTestCase):
+    """
+    Cada imagem enviada deve ganhar versões reduzidas, WebP e placeholder.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Lanches')
+
+    def upload(self, instance, name, size=(800, 600), format='JPEG'):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'orange').save(buffer, format)
+        instance.image.save(name, ContentFile(buffer.getvalue()), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+        instance.refresh_from_db()
+        return instance
+
+    def files(self, variants):
+        return [name for key in ('jpeg', 'webp') for _, name in variants[key]]
+
+    def test_variants_generated_on_upload(self):
+        product = self.upload(Product(name='X-Burguer', description='', price='25.90', category=self.category), 'x.jpg')
+        variants = product.image_variants
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual((variants['width'], variants['height']), (800, 600))
+        self.assertEqual([width for width, _ in variants['jpeg']], [160, 320, 640, 800])
+        self.assertEqual([width for width, _ in variants['webp']], [160, 320, 640, 800])
+        for name in self.files(variants):
+            self.assertTrue(product.image.storage.exists(name))
+        with product.image.storage.open(variants['webp'][0][1]) as file, Image.open(file) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (160, 120)))
+        self.assertTrue(variants['placeholder'].startswith('data:image/webp;base64,'))
+
+        item = APIClient().get('/api/clientes/products/', HTTP_ACCEPT='application/json').json()[0]
+        self.assertEqual(item['image_variants']['placeholder'], variants['placeholder'])
+        self.assertEqual(
+            item['image_variants']['srcset']['webp'].split(', ')[0],
+            'http://testserver/media/%s 160w' % variants['webp'][0][1],
+        )
+
+    def test_replaced_image_removes_old_variants(self):
+        promotion = self.upload(Promotion(name='Combo', description='', price='30.00'), 'combo.jpg')
+        old = self.files(promotion.image_variants)
+        promotion = self.upload(promotion, 'combo2.png', size=(300, 200), format='PNG')
+        self.assertEqual([width for width, _ in promotion.image_variants['jpeg']], [160, 300])
+        for name in old:
+            self.assertFalse(promotion.image.storage.exists(name))
+
+        promotion.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            promotion.save()
+        promotion.refresh_from_db()
+        self.assertEqual(promotion.image_variants, {})
+
+    def test_forced_rebuild_keeps_reference_counts(self):
+        product = self.upload(Product(name='X-Burguer', description='', price='25.90', category=self.category), 'x.jpg')
+        storage = product.image.storage
+        names = self.files(product.image_variants)
+        for _ in range(3):
+            images.process(Product._meta.label, product.pk, 'image', force=True)
+            product.refresh_from_db()
+            # Mesmo conteúdo, mesmos nomes: a reconstrução não acumula referências
+            self.assertEqual(self.files(product.image_variants), names)
+            self.assertEqual({storage.references(name) for name in names}, {1})
+
+        product.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, {})
+        for name in names:
+            self.assertFalse(storage.exists(name))
+            self.assertEqual(storage.references(name), 0)
+
+    def test_deleted_instance_releases_variants(self):
+        product = self.upload(Product(name='X-Burguer', description='', price='25.90', category=self.category), 'x.jpg')
+        storage = product.image.storage
+        names = self.files(product.image_variants)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        for name in names:
+            self.assertFalse(storage.exists(name))
+            self.assertEqual(storage.references(name), 0)
+
+    def test_instance_deleted_while_processing(self):
+        product = self.upload(Product(name='X-Burguer', description='', price='25.90', category=self.category), 'x.jpg')
+        storage = product.image.storage
+        names = self.files(product.image_variants)
+        build_variants = images.build_variants
+
+        def build_after_delete(*args):
+            Product.objects.filter(pk=product.pk).delete()
+            return build_variants(*args)
+
+        with mock.patch.object(images, 'build_variants', side_effect=build_after_delete), \
+                self.captureOnCommitCallbacks(execute=True):
+            images.process(Product._meta.label, product.pk, 'image', force=True)
+        for name in names:
+            self.assertFalse(storage.exists(name))
+
+    def test_invalid_image_is_not_retried(self):
+        product = Product(name='Suco', description='', price='8.00', category=self.category)
+        product.image.save('suco.jpg', ContentFile(b'nao e imagem'), save=False)
+        with self.assertLogs('app.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, {'source': product.image.name})
+        self.assertIsNone(ProductSerializer(product).data['image_variants'])
+        with mock.patch.object(images, 'schedule') as schedule, self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        schedule.assert_not_called()
+
+
+class ContentAddressedStorageTest(IsolatedTestCase):
+    """
+    Arquivos iguais devem ser gravados uma vez, sob o hash do conteúdo.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.storage = ContentAddressedStorage()
+
+    def test_deduplicates_with_reference_count(self):
+        content = b'foto do produto' * 100
+        digest = hashlib.sha256(content).hexdigest()
+        first = self.storage.save('products/Foto.JPG', ContentFile(content))
+        second = self.storage.save('promotions/outra.jpg', ContentFile(content))
+        self.assertEqual(first, f'{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        self.assertEqual(second, first)
+        self.assertEqual(self.storage.references(first), 2)
+        # Um único arquivo em disco, mais o contador de referências
+        filename = os.path.basename(first)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.storage.path(first)))), [filename, filename + '.refs'])
+
+        self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))
+        self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertEqual(self.storage.references(first), 0)
+        self.assertFalse(os.path.exists(self.storage.path(first) + '.refs'))
+
+    def test_large_upload_is_moved_from_disk(self):
+        content = os.urandom(256 * 1024)
+        upload = TemporaryUploadedFile('grande.png', 'image/png', len(content), None)
+        upload.write(content)
+        upload.seek(0)
+        name = self.storage.save('products/grande.png', upload)
+        self.assertTrue(name.endswith(hashlib.sha256(content).hexdigest() + '.png'))
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), content)
+        upload.close()
+
+    def test_model_uploads_share_file(self):
+        category = Category.objects.create(name='Lanches')
+        names = []
+        for name in ('x.jpg', 'x-copia.jpg'):
+            product = Product(name=name, description='', price='1.00', category=category)
+            product.image.save(name, ContentFile(b'mesma foto' * 50), save=False)
+            names.append(product.image.name)
+        self.assertEqual(names[0], names[1])
+        self.assertEqual(default_storage.references(names[0]), 2)
+
+    @override_settings(IMAGE_WORKERS=0)
+    def test_replaced_and_deleted_files_are_released(self):
+        category = Category.objects.create(name='Lanches')
+        photo = b'mesma foto' * 50
+        records = [Product(name='X-Burguer', description='', price='1.00', category=category),
+                   Promotion(name='Combo', description='', price='1.00')]
+        for record in records:
+            record.image = SimpleUploadedFile('x.jpg', photo)
+            with self.captureOnCommitCallbacks(execute=True):
+                record.save()
+        product, promotion = records
+        shared = product.image.name
+        self.assertEqual(promotion.image.name, shared)
+        self.assertEqual(default_storage.references(shared), 2)
+
+        # O mesmo conteúdo enviado de novo não soma referência
+        product.image = SimpleUploadedFile('x-de-novo.jpg', photo)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(product.image.name, shared)
+        self.assertEqual(default_storage.references(shared), 2)
+
+        product.image = SimpleUploadedFile('outra.jpg', b'outra foto' * 50)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(default_storage.references(shared), 1)
+        self.assertTrue(default_storage.exists(shared))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promotion.delete()
+        self.assertFalse(default_storage.exists(shared))
+
+        replacement = product.image.name
+        product.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertFalse(default_storage.exists(replacement))
+
+    def test_media_cache_headers(self):
+        name = self.storage.save('products/x.txt', ContentFile(b'conteudo'))
+        legacy = self.storage.path('products/antigo.txt')
+        os.makedirs(os.path.dirname(legacy))
+        with open(legacy, 'wb') as file:
+            file.write(b'antigo')
+
+        # As respostas de arquivo precisam ser fechadas, como faz o servidor WSGI
+        with closing(self.client.get('/media/' + name)) as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        with closing(self.client.get('/media/products/antigo.txt')) as response:
+            self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(self.client.get('/media/%s.refs' % name).status_code, 404)
+        self.assertIn(self.client.get('/media/../manage.py').status_code, (400, 404))
+
+
+class MediaServingTest(IsolatedTestCase):
+    """
+    Sem servidor da frente, a view atende Range e requisições condicionais;
+    com MEDIA_SENDFILE, só indica o arquivo ao servidor.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 4
+        self.name = ContentAddressedStorage().save('products/x.bin', ContentFile(self.content))
+        self.url = '/media/' + self.name
+
+    def get(self, path, **extra):
+        # As respostas de arquivo precisam ser fechadas, como faz o servidor WSGI
+        response = self.client.get(path, **extra)
+        self.addCleanup(response.close)
+        return response
+
+    def test_range_requests(self):
+        response = self.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        response = self.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(response['Content-Range'], 'bytes 1020-1023/1024')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-4:])
+
+        response = self.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_conditional_requests(self):
+        response = self.get(self.url)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        etag = response['ETag']
+        self.assertEqual(etag, '"%s"' % hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(self.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # If-Range de outra versão: o arquivo inteiro, não o trecho
+        response = self.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outro"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        response = self.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    def test_front_server_headers(self):
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.content, b'')
+
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.get(self.url)
+        self.assertEqual(response['X-Sendfile'], ContentAddressedStorage().path(self.name))
+
+
+class CatalogSearchTest(IsolatedTestCase):
+    """
+    A busca da administração deve incluir os itens inativos.
+    """
+
+    def test_includes_inactive_items(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(name='Pizzas', is_active=False)
+            product = Product.objects.create(name='Pizza Calabresa', description='', price='40.00',
+                                             category=category, is_active=False)
+        response = APIClient().get('/api/products/products/search/', {'q': 'pizza'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([(r['type'], r['id'], r['is_active']) for r in results],
+                         [('product', product.id, False), ('category', category.id, False)])
+
+
+class ConditionalRequestTest(IsolatedTestCase):
+    """
+    As views do catálogo devem responder 304 sem consultar o banco enquanto
+    os carimbos de versão não mudarem.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='Lanches')
+        self.client = APIClient()
+
+    def test_if_none_match(self):
+        response = self.client.get('/api/products/categories/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/categories/', HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get('/api/products/categories/', HTTP_IF_NONE_MATCH='*').status_code, 304)
+        # URLs e formatos diferentes têm validadores diferentes
+        self.assertNotEqual(self.client.get('/api/products/categories/?page=1')['ETag'], etag)
+        self.assertNotEqual(self.client.get('/api/products/categories/', HTTP_ACCEPT='text/html')['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/products/categories/', {'name': 'Bebidas'}, format='json',
+                                        HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get('/api/products/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(f'/api/products/categories/{self.category.pk}/')['Last-Modified']
+        response = self.client.get(f'/api/products/categories/{self.category.pk}/',
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        # If-None-Match tem precedência sobre If-Modified-Since
+        response = self.client.get(f'/api/products/categories/{self.category.pk}/',
+                                   HTTP_IF_MODIFIED_SINCE=last_modified, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/products/categories/{self.category.pk}/',
+                                   HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
@@ -12,16 +12,24 @@ from .serializers import (
     PromotionCreateSerializer
 )
 import json
+from app.conditional import ConditionalMixin
+from app.response_cache import cache_response
+from app.serializers import SparseFields, prefetch_requested
+from app.search import search_request
+from app.streaming import StreamingListMixin, stream_list
+from .search import catalog_index
+from .signals import CATALOG_STAMPS
 
 
 # Create your views here.
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de categorias.
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    conditional_stamps = CATALOG_STAMPS
     pagination_class = None  # ✅ desativa com segurança e clareza
 
 
@@ -37,16 +45,18 @@ class CategoryViewSet(viewsets.ModelViewSet):
         Retorna todos os produtos de uma categoria específica.
         """
         category = self.get_object()
-        products = Product.objects.filter(category=category)
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        products = Product.objects.filter(category=category).select_related('category').prefetch_related(
+            'ingredients__ingredient__category'
+        )
+        return stream_list(request, products, lambda chunk: ProductSerializer(chunk, many=True).data)
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalMixin, StreamingListMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de produtos.
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    conditional_stamps = CATALOG_STAMPS
     pagination_class = None  # ✅ desativa com segurança e clareza
 
 
@@ -71,6 +81,13 @@ class ProductViewSet(viewsets.ModelViewSet):
         category_id = self.request.query_params.get('category', None)
         if category_id is not None:
             queryset = queryset.filter(category_id=category_id)
+        if self.request.method == 'GET':
+            queryset = prefetch_requested(
+                queryset, SparseFields.from_request(self.request),
+                select=(('category', 'category'),),
+                prefetch=(('available_ingredients', 'ingredients__ingredient__category'),),
+                expandable=('category', 'available_ingredients')
+            )
         return queryset
 
     def perform_create(self, serializer):
@@ -291,12 +308,25 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-class IngredientViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Busca produtos, categorias e ingredientes (inclusive inativos) sem
+        diferenciar acentos, completando a última palavra digitada.
+        Parâmetros: q, type (product,category,ingredient) e limit.
+        """
+        try:
+            return Response(search_request(catalog_index, request))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class IngredientViewSet(ConditionalMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de ingredientes.
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    conditional_stamps = CATALOG_STAMPS
 
     def get_queryset(self):
         return Ingredient.objects.all()
@@ -309,16 +339,22 @@ class IngredientViewSet(viewsets.ModelViewSet):
         """
         Retorna todos os ingredientes disponíveis.
         """
-        ingredients = Ingredient.objects.all()
-        serializer = IngredientSerializer(ingredients, many=True)
-        return Response(serializer.data)
+        ingredients = Ingredient.objects.select_related('category')
+        return stream_list(request, ingredients, lambda chunk: IngredientSerializer(chunk, many=True).data)
 
-class PromotionViewSet(viewsets.ModelViewSet):
+# Tabelas incluídas na representação de uma promoção (itens e brindes com seus produtos)
+PROMOTION_TAGS = (
+    'promotion', 'promotionitem', 'promotionreward', 'product', 'category',
+    'productingredient', 'ingredient', 'ingredientcategory',
+)
+
+class PromotionViewSet(ConditionalMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de promoções.
     """
     queryset = Promotion.objects.all()
     serializer_class = PromotionSerializer
+    conditional_stamps = CATALOG_STAMPS
 
     def get_serializer_class(self):
         """
@@ -343,6 +379,10 @@ class PromotionViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    @cache_response(ttl=300, tags=PROMOTION_TAGS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def update(self, request, *args, **kwargs):
         print("Dados recebidos na atualização:", request.data)
         print("Arquivos recebidos:", request.FILES)
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Settings, OpeningHour
+from .models import Settings, OpeningHour, OpeningOverride
 
 # Register your models here.
 admin.site.register(Settings)
 admin.site.register(OpeningHour)
+admin.site.register(OpeningOverride)
@@ -0,0 +1,104 @@
+import copy
+import threading
+from datetime import timedelta
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from app import versioning
+from .models import Settings, OpeningHour, OpeningOverride
+from .schedule import OpeningSchedule
+
+SETTINGS_STAMPS = (
+    versioning.model_stamp(Settings),
+    versioning.model_stamp(OpeningHour),
+    versioning.model_stamp(OpeningOverride),
+)
+
+
+def upcoming_overrides():
+    """
+    Exceções que ainda podem afetar o horário (a partir de ontem, por causa
+    dos períodos que terminam depois da meia-noite).
+    """
+    return OpeningOverride.objects.filter(end_date__gte=timezone.localdate() - timedelta(days=1))
+
+
+class SettingsCache:
+    """
+    Cache local do processo para as configurações (singleton), seus horários
+    e a tabela de horários compilada (OpeningSchedule).
+
+    A validade é conferida pelos carimbos de versão de Settings, OpeningHour
+    e OpeningOverride, que são alterados por sinais a cada gravação. Conferir
+    a versão custa um os.stat por carimbo, então os caminhos mais usados
+    deixam de consultar o banco.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def _load(self):
+        # A versão é lida antes da consulta: se houver uma gravação no meio,
+        # a próxima chamada enxerga a versão nova e recarrega.
+        current = versioning.version(*SETTINGS_STAMPS)
+        settings = Settings.objects.prefetch_related(
+            'opening_hours',
+            Prefetch('opening_overrides', queryset=upcoming_overrides(), to_attr='upcoming_overrides')
+        ).first()
+        schedule = OpeningSchedule(
+            settings.opening_hours.all() if settings else (),
+            settings.upcoming_overrides if settings else ()
+        )
+        return current, settings, schedule
+
+    def _current(self):
+        entry = self._entry
+        if entry is None or entry[0] != versioning.version(*SETTINGS_STAMPS):
+            with self._lock:
+                entry = self._entry = self._load()
+        return entry
+
+    def get(self):
+        """
+        Retorna uma cópia das configurações com os horários já carregados,
+        ou None se o sistema ainda não foi configurado.
+        """
+        settings = self._current()[1]
+        # Cópia rasa para que alterações feitas pelo chamador não vazem para o cache
+        return copy.copy(settings) if settings is not None else None
+
+    def schedule(self, settings=None):
+        """
+        Retorna os horários compilados. Se `settings` não for a instância em
+        cache (ex: outro registro), compila a partir dos horários dela.
+        """
+        _, cached, schedule = self._current()
+        if settings is None or (cached is not None and cached.pk == settings.pk):
+            return schedule
+        return OpeningSchedule(
+            settings.opening_hours.all(),
+            upcoming_overrides().filter(settings=settings)
+        )
+
+    def invalidate(self):
+        self._entry = None
+
+
+settings_cache = SettingsCache()
+
+
+def get_settings():
+    """
+    Retorna as configurações do sistema a partir do cache local.
+    Use apenas para leitura; para alterar, busque a instância no banco.
+    """
+    return settings_cache.get()
+
+
+def get_schedule(settings=None):
+    """
+    Retorna os horários de funcionamento compilados (ver settings.schedule).
+    """
+    return settings_cache.schedule(settings)
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0008_openinghour_next_day_closing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Data inicial')),
+                ('end_date', models.DateField(verbose_name='Data final')),
+                ('kind', models.CharField(choices=[('closed', 'Fechado'), ('custom', 'Horário especial'), ('holiday', 'Horário de feriado')], default='closed', max_length=10, verbose_name='Tipo')),
+                ('opening_time', models.TimeField(blank=True, null=True, verbose_name='Horário de Abertura')),
+                ('closing_time', models.TimeField(blank=True, null=True, verbose_name='Horário de Fechamento')),
+                ('next_day_closing', models.BooleanField(default=False, help_text='Indica se o fechamento é no dia seguinte')),
+                ('description', models.CharField(blank=True, max_length=100, verbose_name='Descrição')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('settings', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_overrides', to='settings.settings')),
+            ],
+            options={
+                'verbose_name': 'Exceção de Horário',
+                'verbose_name_plural': 'Exceções de Horário',
+                'ordering': ['start_date', 'id'],
+                'indexes': [models.Index(fields=['settings', 'end_date', 'start_date'], name='settings_op_setting_a314be_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0009_openingoverride'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='settings',
+            name='business_photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes da foto'),
+        ),
+    ]
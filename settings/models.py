@@ -3,7 +3,6 @@ from django.utils.text import slugify
 from django.db.models import JSONField
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-import pytz
 from datetime import datetime, time
 
 class OpeningHour(models.Model):
@@ -43,34 +42,8 @@ class OpeningHour(models.Model):
         """
         Verifica se o restaurante está aberto no momento atual
         """
-        now = timezone.now().astimezone(pytz.timezone('America/Sao_Paulo'))
-        current_time = now.time()
-        current_day = now.weekday()
-
-        if not self.is_open:
-            return False
-
-        # Se o fechamento é no dia seguinte
-        if self.next_day_closing:
-            # Se estamos no dia da abertura
-            if current_day == self.day_of_week:
-                # Se já passou do horário de abertura
-                return current_time >= self.opening_time
-            # Se estamos no dia do fechamento
-            elif current_day == (self.day_of_week + 1) % 7:
-                # Se ainda não passou do horário de fechamento
-                return current_time <= self.closing_time
-            # Se estamos em um dia entre a abertura e o fechamento (para casos de múltiplos dias)
-            elif self.day_of_week > current_day:
-                # Se o dia de abertura é depois do dia atual (ex: domingo > segunda)
-                # significa que o período começou no dia anterior
-                return True
-            return False
-        else:
-            # Se o fechamento é no mesmo dia
-            if current_day == self.day_of_week:
-                return self.opening_time <= current_time <= self.closing_time
-            return False
+        from .schedule import OpeningSchedule
+        return OpeningSchedule([self]).is_open(holiday=self.is_holiday)
 
 class Settings(models.Model):
     """
@@ -81,6 +54,8 @@ class Settings(models.Model):
     business_address = models.CharField(max_length=200, verbose_name='Endereço')
     business_email = models.EmailField(verbose_name='E-mail')
     business_photo = models.ImageField(upload_to='restaurant_photos/', null=True, blank=True, verbose_name='Foto do Restaurante')
+    # Mapa das versões reduzidas geradas em segundo plano (ver app.images)
+    business_photo_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Variantes da foto')
     business_slug = models.SlugField(max_length=100, unique=True, null=True, blank=True, verbose_name='Link Personalizado')
     opening_time = models.TimeField(verbose_name='Horário de Abertura')
     closing_time = models.TimeField(verbose_name='Horário de Fechamento')
@@ -106,28 +81,54 @@ class Settings(models.Model):
         super().save(*args, **kwargs)
 
     def is_open_now(self):
-        now = timezone.now().astimezone(pytz.timezone('America/Sao_Paulo'))
-        weekday = now.weekday()
-        time_now = now.time()
+        """
+        Verifica se o estabelecimento está aberto agora, usando a tabela de
+        horários compilada (sem consulta ao banco quando está em cache).
+        """
+        from .cache import get_schedule
+        return get_schedule(self).is_open()
+
+class OpeningOverride(models.Model):
+    """
+    Exceção ao horário semanal para uma data ou período (feriados,
+    fechamentos pontuais, horário especial).
+    """
+    KIND_CLOSED = 'closed'
+    KIND_CUSTOM = 'custom'
+    KIND_HOLIDAY = 'holiday'
+    KIND_CHOICES = [
+        (KIND_CLOSED, 'Fechado'),
+        (KIND_CUSTOM, 'Horário especial'),
+        (KIND_HOLIDAY, 'Horário de feriado'),
+    ]
+    settings = models.ForeignKey('Settings', on_delete=models.CASCADE, related_name='opening_overrides')
+    start_date = models.DateField(verbose_name='Data inicial')
+    end_date = models.DateField(verbose_name='Data final')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_CLOSED, verbose_name='Tipo')
+    opening_time = models.TimeField(null=True, blank=True, verbose_name='Horário de Abertura')
+    closing_time = models.TimeField(null=True, blank=True, verbose_name='Horário de Fechamento')
+    next_day_closing = models.BooleanField(default=False, help_text='Indica se o fechamento é no dia seguinte')
+    description = models.CharField(max_length=100, blank=True, verbose_name='Descrição')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['start_date', 'id']
+        indexes = [
+            models.Index(fields=['settings', 'end_date', 'start_date']),
+        ]
+        verbose_name = 'Exceção de Horário'
+        verbose_name_plural = 'Exceções de Horário'
 
-        for oh in self.opening_hours.filter(is_open=True):
-            day = oh.day_of_week
-            open_time = oh.opening_time
-            close_time = oh.closing_time
+    def __str__(self):
+        if self.start_date == self.end_date:
+            return f"{self.start_date} - {self.get_kind_display()}"
+        return f"{self.start_date} a {self.end_date} - {self.get_kind_display()}"
 
-            if oh.next_day_closing:
-                # Se hoje é o dia da abertura e já passou da abertura
-                if weekday == day and time_now >= open_time:
-                    return True
-                # Se hoje é o dia do fechamento e ainda não passou do fechamento
-                if weekday == (day + 1) % 7 and time_now <= close_time:
-                    return True
-                # Se estamos em um dia entre a abertura e o fechamento (para casos de múltiplos dias)
-                if day > weekday:
-                    # Se o dia de abertura é depois do dia atual (ex: domingo > segunda)
-                    # significa que o período começou no dia anterior
-                    return True
-            else:
-                if weekday == day and open_time <= time_now <= close_time:
-                    return True
-        return False
+    def clean(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError('A data final deve ser igual ou posterior à data inicial')
+        if self.kind == self.KIND_CUSTOM:
+            if not self.opening_time or not self.closing_time:
+                raise ValidationError('Informe os horários de abertura e fechamento')
+            if self.closing_time < self.opening_time:
+                self.next_day_closing = True
@@ -0,0 +1,324 @@
+"""
+Horário de funcionamento compilado em uma tabela de intervalos da semana.
+
+Os horários (OpeningHour) são convertidos em intervalos [início, fim) medidos
+em minutos desde segunda-feira 00:00. Fechamentos no dia seguinte viram um
+intervalo que atravessa a meia-noite, e o de domingo para segunda é dividido
+em dois. Com os inícios ordenados, "está aberto?", "fecha quando?" e "abre
+quando?" são respondidos com uma busca binária, sem banco de dados.
+
+Exceções por data (OpeningOverride) ficam em um calendário à parte, que
+substitui o plano da semana apenas nos dias cobertos por alguma exceção.
+"""
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.utils import timezone
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def minute_of_week(moment):
+    """
+    Retorna o minuto da semana (fuso do projeto) de um instante.
+    """
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def _local(moment):
+    return timezone.localtime(moment or timezone.now()).replace(second=0, microsecond=0)
+
+
+def _interval(opening_time, closing_time, next_day_closing=False):
+    """
+    Converte um horário em um intervalo [início, fim) em minutos desde a
+    meia-noite do dia, ou None se o intervalo for vazio.
+    """
+    start = _minutes(opening_time)
+    end = _minutes(closing_time)
+    if next_day_closing or closing_time < opening_time:
+        end += MINUTES_PER_DAY
+    return (start, end) if end > start else None
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _day_intervals(opening_hours):
+    """
+    Agrupa os intervalos abertos por dia da semana.
+    """
+    days = {day: [] for day in range(7)}
+    for oh in opening_hours:
+        interval = _interval(oh.opening_time, oh.closing_time, oh.next_day_closing) if oh.is_open else None
+        if interval:
+            days[oh.day_of_week].append(interval)
+    return days
+
+
+class WeeklySchedule:
+    """
+    Tabela ordenada de intervalos em que o estabelecimento está aberto.
+    """
+
+    def __init__(self, intervals=()):
+        merged = _merge(intervals)
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    @classmethod
+    def compile(cls, opening_hours):
+        """
+        Compila os horários abertos em intervalos.
+        """
+        intervals = []
+        for day, day_intervals in _day_intervals(opening_hours).items():
+            for start, end in day_intervals:
+                start += day * MINUTES_PER_DAY
+                end += day * MINUTES_PER_DAY
+                if end > MINUTES_PER_WEEK:
+                    # Domingo com fechamento na segunda: divide na virada da semana
+                    intervals.append((start, MINUTES_PER_WEEK))
+                    intervals.append((0, end - MINUTES_PER_WEEK))
+                else:
+                    intervals.append((start, end))
+        return cls(intervals)
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def _index(self, minute):
+        """
+        Retorna o índice do intervalo que contém `minute`, ou None.
+        """
+        index = bisect_right(self.starts, minute) - 1
+        if index >= 0 and minute < self.ends[index]:
+            return index
+        return None
+
+    def is_open_at(self, minute):
+        return self._index(minute) is not None
+
+    def closing_minute(self, minute):
+        """
+        Retorna o minuto (podendo passar do fim da semana) em que o intervalo
+        atual termina, ou None se estiver fechado.
+        """
+        index = self._index(minute)
+        if index is None:
+            return None
+        end = self.ends[index]
+        # Intervalo que continua depois da virada da semana
+        if end == MINUTES_PER_WEEK and self.starts[0] == 0 and index != 0:
+            end += self.ends[0]
+        return end
+
+    def opening_minute(self, minute):
+        """
+        Retorna o próximo minuto (podendo passar do fim da semana) em que
+        abre, ou None se não houver nenhum horário.
+        """
+        if not self.starts:
+            return None
+        index = bisect_right(self.starts, minute)
+        candidates = [(start, 0) for start in self.starts[index:]]
+        candidates += [(start, MINUTES_PER_WEEK) for start in self.starts[:index + 1]]
+        for start, offset in candidates:
+            # O intervalo que começa na segunda 00:00 pode ser só a continuação
+            # do período de domingo, e não uma nova abertura
+            if start == 0 and self.ends[-1] == MINUTES_PER_WEEK and len(self.starts) > 1:
+                continue
+            return start + offset
+        return self.starts[0] + MINUTES_PER_WEEK
+
+    # Consultas por instante
+
+    def is_open(self, moment=None):
+        """
+        Verifica se está aberto no instante (padrão: agora).
+        """
+        return self.is_open_at(minute_of_week(_local(moment)))
+
+    def closes_at(self, moment=None):
+        """
+        Retorna quando o período atual termina, ou None se estiver fechado.
+        """
+        local = _local(moment)
+        current = minute_of_week(local)
+        end = self.closing_minute(current)
+        return None if end is None else local + timedelta(minutes=end - current)
+
+    def next_open(self, moment=None):
+        """
+        Retorna quando abre novamente, ou None se não houver horários.
+        """
+        local = _local(moment)
+        current = minute_of_week(local)
+        start = self.opening_minute(current)
+        return None if start is None else local + timedelta(minutes=start - current)
+
+
+class OverrideCalendar:
+    """
+    Exceções por data combinadas com o plano de cada dia da semana.
+
+    As exceções são expandidas em um dicionário data -> exceção e o plano de
+    cada dia consultado fica em cache, então uma consulta custa algumas
+    buscas em dicionário, independente de quantas exceções existam.
+    """
+    MAX_CACHED_DAYS = 1024
+    # Até onde procurar a próxima abertura (ex: fechado para reforma)
+    LOOKAHEAD_DAYS = 366
+
+    def __init__(self, overrides, regular_days, holiday_days):
+        self.by_date = {}
+        # Períodos mais longos primeiro: a exceção mais específica (ou a mais nova) prevalece
+        ordered = sorted(overrides, key=lambda o: (o.start_date - o.end_date, o.pk or 0))
+        for override in ordered:
+            day = override.start_date
+            while day <= override.end_date:
+                self.by_date[day] = override
+                day += timedelta(days=1)
+        self.regular_days = regular_days
+        self.holiday_days = holiday_days
+        self._plans = {}
+
+    def __bool__(self):
+        return bool(self.by_date)
+
+    def plan(self, day, holiday=False):
+        """
+        Retorna os intervalos que abrem no dia (minutos desde a meia-noite,
+        podendo passar de 24h quando fecha no dia seguinte).
+        """
+        key = (day, holiday)
+        plan = self._plans.get(key)
+        if plan is None:
+            if len(self._plans) >= self.MAX_CACHED_DAYS:
+                self._plans.clear()
+            plan = self._plans[key] = self._build_plan(day, holiday)
+        return plan
+
+    def _build_plan(self, day, holiday):
+        weekday = day.weekday()
+        override = self.by_date.get(day)
+        if override is None:
+            return (self.holiday_days if holiday else self.regular_days)[weekday]
+        if override.kind == 'holiday':
+            return self.holiday_days[weekday]
+        if override.kind == 'custom' and override.opening_time and override.closing_time:
+            interval = _interval(override.opening_time, override.closing_time, override.next_day_closing)
+            return [interval] if interval else []
+        return []
+
+    def intervals(self, day, holiday=False):
+        """
+        Intervalos abertos do dia, incluindo o que continua do dia anterior
+        (com início negativo), mesclados e ordenados.
+        """
+        carried = [
+            (start - MINUTES_PER_DAY, end - MINUTES_PER_DAY)
+            for start, end in self.plan(day - timedelta(days=1), holiday)
+            if end > MINUTES_PER_DAY
+        ]
+        return _merge(carried + list(self.plan(day, holiday)))
+
+    def _containing(self, day, minute, holiday):
+        for start, end in self.intervals(day, holiday):
+            if start <= minute < end:
+                return end
+        return None
+
+    # Consultas por instante
+
+    def is_open(self, moment=None, holiday=False):
+        local = _local(moment)
+        return self._containing(local.date(), local.hour * 60 + local.minute, holiday) is not None
+
+    def closes_at(self, moment=None, holiday=False):
+        local = _local(moment)
+        day = local.date()
+        current = local.hour * 60 + local.minute
+        end = self._containing(day, current, holiday)
+        if end is None:
+            return None
+        # Segue o período enquanto ele continuar no dia seguinte
+        days = 0
+        while end >= MINUTES_PER_DAY and days < self.LOOKAHEAD_DAYS:
+            days += 1
+            end -= MINUTES_PER_DAY
+            following = self._containing(day + timedelta(days=days), end, holiday)
+            if following is None:
+                break
+            end = following
+        return local + timedelta(minutes=days * MINUTES_PER_DAY + end - current)
+
+    def next_open(self, moment=None, holiday=False):
+        local = _local(moment)
+        day = local.date()
+        current = local.hour * 60 + local.minute
+        for days in range(self.LOOKAHEAD_DAYS):
+            for start, _ in self.intervals(day + timedelta(days=days), holiday):
+                # Início negativo é continuação do dia anterior, não uma nova abertura
+                if start < 0 or (days == 0 and start <= current):
+                    continue
+                return local + timedelta(minutes=days * MINUTES_PER_DAY + start - current)
+        return None
+
+
+class OpeningSchedule:
+    """
+    Horários compilados de um estabelecimento: semana normal e de feriado,
+    mais o calendário de exceções por data. Na tabela de feriado, os dias da
+    semana sem horário de feriado cadastrado seguem o horário normal.
+    """
+
+    def __init__(self, opening_hours, overrides=()):
+        opening_hours = list(opening_hours)
+        holiday_days = {oh.day_of_week for oh in opening_hours if oh.is_holiday}
+        regular_hours = [oh for oh in opening_hours if not oh.is_holiday]
+        holiday_hours = [oh for oh in opening_hours if oh.is_holiday == (oh.day_of_week in holiday_days)]
+        self.regular = WeeklySchedule.compile(regular_hours)
+        self.holiday = WeeklySchedule.compile(holiday_hours)
+        self.calendar = OverrideCalendar(overrides, _day_intervals(regular_hours), _day_intervals(holiday_hours))
+
+    def table(self, holiday=False):
+        return self.holiday if holiday else self.regular
+
+    def is_open(self, moment=None, holiday=False):
+        if self.calendar:
+            return self.calendar.is_open(moment, holiday)
+        return self.table(holiday).is_open(moment)
+
+    def closes_at(self, moment=None, holiday=False):
+        if self.calendar:
+            return self.calendar.closes_at(moment, holiday)
+        return self.table(holiday).closes_at(moment)
+
+    def next_open(self, moment=None, holiday=False):
+        if self.calendar:
+            return self.calendar.next_open(moment, holiday)
+        return self.table(holiday).next_open(moment)
+
+    def status(self, moment=None, holiday=False):
+        """
+        Retorna o estado atual para exibição na loja.
+        """
+        is_open = self.is_open(moment, holiday)
+        return {
+            'is_open': is_open,
+            'closes_at': self.closes_at(moment, holiday) if is_open else None,
+            'next_open_at': None if is_open else self.next_open(moment, holiday),
+        }
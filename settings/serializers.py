@@ -1,11 +1,88 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Settings, OpeningHour
+from app import versioning, response_cache
+from app.images import srcset
+from .models import Settings, OpeningHour, OpeningOverride
 from datetime import datetime, time
+import json
+
+def parse_opening_hours(raw):
+    """
+    Converte o campo opening_hours recebido (lista, JSON ou lista com um JSON,
+    como chega em multipart) em uma lista de dicionários.
+    """
+    if isinstance(raw, list) and len(raw) == 1 and isinstance(raw[0], (str, list)):
+        raw = raw[0]
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            raise ValueError('Formato inválido dos horários')
+    if isinstance(raw, dict):
+        raw = [raw]
+    if not isinstance(raw, list) or not all(isinstance(item, dict) for item in raw):
+        raise ValueError('Formato inválido dos horários')
+
+    entries = []
+    for item in raw:
+        entry = dict(item)
+        entry.pop('id', None)
+        entry.setdefault('opening_time', '08:00')
+        entry.setdefault('closing_time', '18:00')
+        entries.append(entry)
+    return entries
+
+class OpeningHourListSerializer(serializers.ListSerializer):
+    """
+    Substitui a grade semanal de horários de uma só vez.
+    """
+    UPDATE_FIELDS = ['opening_time', 'closing_time', 'is_open', 'next_day_closing']
+
+    def validate(self, attrs):
+        keys = [(item['day_of_week'], item.get('is_holiday', False)) for item in attrs]
+        if len(keys) != len(set(keys)):
+            raise serializers.ValidationError('Há dias da semana repetidos nos horários')
+        return attrs
+
+    def update(self, settings, validated_data):
+        """
+        Grava só a diferença entre os horários atuais e os novos
+        (bulk_create, bulk_update e delete) em uma única transação.
+        """
+        existing = {(oh.day_of_week, oh.is_holiday): oh for oh in settings.opening_hours.all()}
+        to_create = []
+        to_update = []
+        for item in validated_data:
+            key = (item['day_of_week'], item.get('is_holiday', False))
+            current = existing.pop(key, None)
+            if current is None:
+                to_create.append(OpeningHour(settings=settings, **item))
+                continue
+            changed = False
+            for field in self.UPDATE_FIELDS:
+                if field in item and getattr(current, field) != item[field]:
+                    setattr(current, field, item[field])
+                    changed = True
+            if changed:
+                to_update.append(current)
+
+        with transaction.atomic():
+            if existing:
+                OpeningHour.objects.filter(pk__in=[oh.pk for oh in existing.values()]).delete()
+            if to_update:
+                OpeningHour.objects.bulk_update(to_update, self.UPDATE_FIELDS)
+            if to_create:
+                OpeningHour.objects.bulk_create(to_create)
+            # bulk_create/bulk_update não disparam sinais
+            versioning.bump_on_commit(versioning.model_stamp(OpeningHour))
+            transaction.on_commit(lambda: response_cache.purge(response_cache.model_tag(OpeningHour)))
+        return settings.opening_hours.all()
 
 class OpeningHourSerializer(serializers.ModelSerializer):
     class Meta:
         model = OpeningHour
         fields = ['id', 'day_of_week', 'opening_time', 'closing_time', 'is_open', 'is_holiday', 'next_day_closing']
+        list_serializer_class = OpeningHourListSerializer
 
     def validate(self, data):
         opening_time = data.get('opening_time')
@@ -20,12 +97,44 @@ class OpeningHourSerializer(serializers.ModelSerializer):
                 
         return data
 
+class OpeningOverrideSerializer(serializers.ModelSerializer):
+    """
+    Serializer para exceções de horário por data.
+    """
+    class Meta:
+        model = OpeningOverride
+        fields = ['id', 'start_date', 'end_date', 'kind', 'opening_time', 'closing_time',
+                  'next_day_closing', 'description', 'created_at']
+        read_only_fields = ['created_at']
+        # Sem data final, a exceção vale só para a data inicial
+        extra_kwargs = {'end_date': {'required': False}}
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None)) or start_date
+        data['end_date'] = end_date
+        if end_date < start_date:
+            raise serializers.ValidationError({'end_date': 'A data final deve ser igual ou posterior à data inicial'})
+
+        kind = data.get('kind', getattr(self.instance, 'kind', OpeningOverride.KIND_CLOSED))
+        if kind == OpeningOverride.KIND_CUSTOM:
+            opening_time = data.get('opening_time', getattr(self.instance, 'opening_time', None))
+            closing_time = data.get('closing_time', getattr(self.instance, 'closing_time', None))
+            if not opening_time or not closing_time:
+                raise serializers.ValidationError('Informe os horários de abertura e fechamento')
+            # Recalculado a cada gravação: um PATCH de 18h-02h para 10h-14h desfaz a virada
+            data['next_day_closing'] = closing_time < opening_time
+        else:
+            data['next_day_closing'] = False
+        return data
+
 class SettingsSerializer(serializers.ModelSerializer):
     """
     Serializer para o model Settings.
     """
     opening_hours = OpeningHourSerializer(many=True, read_only=True)
     business_photo = serializers.ImageField(required=False, allow_null=True)
+    business_photo_variants = serializers.SerializerMethodField()
     business_slug = serializers.SlugField(required=False, allow_null=True)
     
     class Meta:
@@ -42,4 +151,7 @@ class SettingsSerializer(serializers.ModelSerializer):
             'delivery_fee': {'required': False},
             'minimum_order_value': {'required': False},
             'tax_rate': {'required': False},
-        } 
\ No newline at end of file
+        }
+
+    def get_business_photo_variants(self, obj):
+        return srcset(obj.business_photo_variants, obj.business_photo.storage, self.context.get('request'))
@@ -0,0 +1,16 @@
+from app import versioning, response_cache, images, storage
+from .models import Settings, OpeningHour, OpeningOverride
+
+# Qualquer gravação em Settings, OpeningHour ou OpeningOverride invalida o cache das configurações
+versioning.track(Settings)
+versioning.track(OpeningHour)
+versioning.track(OpeningOverride)
+
+for model in (Settings, OpeningHour, OpeningOverride):
+    response_cache.track(model)
+
+# Versões reduzidas da foto da loja
+images.track(Settings, 'business_photo')
+
+# Libera a foto anterior quando ela é trocada
+storage.track(Settings, 'business_photo')
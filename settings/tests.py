@@ -1,3 +1,288 @@
-from django.test import TestCase
+import datetime
+import os
 
-# Create your tests here.
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app import versioning
+from app.testing import IsolatedTestCase
+from .cache import SETTINGS_STAMPS, get_settings, settings_cache
+from .models import OpeningHour, OpeningOverride, Settings
+from .schedule import OpeningSchedule
+from .serializers import OpeningOverrideSerializer, parse_opening_hours
+
+
+def at(day, hour, minute=0):
+    """
+    Instante no fuso do projeto; 2024-01-01 é uma segunda-feira.
+    """
+    return timezone.make_aware(datetime.datetime(2024, 1, day, hour, minute))
+
+
+def opening_hour(day_of_week, opening, closing, **fields):
+    return OpeningHour(day_of_week=day_of_week, opening_time=datetime.time(*opening),
+                       closing_time=datetime.time(*closing), **fields)
+
+
+def create_settings(**fields):
+    values = {
+        'business_name': 'Restaurante',
+        'business_phone': '11999999999',
+        'business_address': 'Rua A, 1',
+        'business_email': 'contato@restaurante.com',
+        'business_slug': 'restaurante',
+        'opening_time': datetime.time(10, 0),
+        'closing_time': datetime.time(22, 0),
+    }
+    values.update(fields)
+    return Settings.objects.create(**values)
+
+
+class VersioningTest(IsolatedTestCase):
+
+    def test_bump_changes_version(self):
+        self.assertEqual(versioning.get('tests.stamp'), '0')
+        self.assertIsNone(versioning.last_modified('tests.stamp'))
+        seen = set()
+        for _ in range(5):
+            versioning.bump('tests.stamp')
+            seen.add(versioning.get('tests.stamp'))
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(os.path.getsize(os.path.join(versioning.stamps_dir(), 'tests.stamp')), 0)
+        self.assertIsNotNone(versioning.last_modified('tests.stamp', 'tests.other'))
+        self.assertEqual(versioning.version('tests.stamp', 'tests.other'),
+                         versioning.get('tests.stamp') + '-0')
+
+    def test_bump_on_commit_waits_for_commit(self):
+        before = versioning.get('tests.stamp')
+        with self.captureOnCommitCallbacks() as callbacks:
+            versioning.bump_on_commit('tests.stamp')
+            self.assertEqual(versioning.get('tests.stamp'), before)
+        self.assertEqual(versioning.get('tests.stamp'), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(versioning.get('tests.stamp'), before)
+
+    def test_tracked_model_bumps_after_commit(self):
+        before = versioning.version(*SETTINGS_STAMPS)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_settings()
+            self.assertEqual(versioning.version(*SETTINGS_STAMPS), before)
+        self.assertNotEqual(versioning.version(*SETTINGS_STAMPS), before)
+
+
+class SettingsCacheTest(IsolatedTestCase):
+
+    def test_reloads_only_after_change(self):
+        self.assertIsNone(get_settings())
+        with self.captureOnCommitCallbacks(execute=True):
+            settings = create_settings()
+        self.assertEqual(get_settings().business_name, 'Restaurante')
+
+        with self.assertNumQueries(0):
+            cached = get_settings()
+            settings_cache.schedule()
+        # Alterações na cópia não vazam para o cache
+        cached.business_name = 'Outro'
+        self.assertEqual(get_settings().business_name, 'Restaurante')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.business_name = 'Novo Nome'
+            settings.save()
+        self.assertEqual(get_settings().business_name, 'Novo Nome')
+
+
+class OpeningScheduleTest(IsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Segunda a sexta 10h-22h, sábado 18h-02h, domingo fechado
+        hours = [opening_hour(day, (10, 0), (22, 0)) for day in range(5)]
+        hours.append(opening_hour(5, (18, 0), (2, 0)))
+        hours.append(opening_hour(6, (10, 0), (22, 0), is_open=False))
+        self.schedule = OpeningSchedule(hours)
+
+    def test_regular_week(self):
+        self.assertEqual(self.schedule.status(at(1, 9)),
+                         {'is_open': False, 'closes_at': None, 'next_open_at': at(1, 10)})
+        self.assertEqual(self.schedule.status(at(1, 12)),
+                         {'is_open': True, 'closes_at': at(1, 22), 'next_open_at': None})
+        self.assertFalse(self.schedule.is_open(at(1, 22)))
+        self.assertEqual(self.schedule.next_open(at(5, 23)), at(6, 18))
+
+    def test_next_day_closing(self):
+        self.assertTrue(self.schedule.is_open(at(7, 1, 30)))
+        self.assertEqual(self.schedule.closes_at(at(6, 23)), at(7, 2))
+        self.assertFalse(self.schedule.is_open(at(7, 3)))
+        self.assertEqual(self.schedule.next_open(at(7, 3)), at(8, 10))
+
+    def test_sunday_into_monday(self):
+        schedule = OpeningSchedule([opening_hour(6, (20, 0), (2, 0)), opening_hour(0, (18, 0), (23, 0))])
+        self.assertTrue(schedule.is_open(at(8, 1)))
+        self.assertEqual(schedule.closes_at(at(7, 21)), at(8, 2))
+        # A continuação do domingo não conta como abertura de segunda
+        self.assertEqual(schedule.next_open(at(8, 3)), at(8, 18))
+
+    def test_holiday_hours(self):
+        schedule = OpeningSchedule([
+            opening_hour(0, (10, 0), (22, 0)),
+            opening_hour(1, (10, 0), (22, 0)),
+            opening_hour(0, (12, 0), (14, 0), is_holiday=True),
+        ])
+        self.assertTrue(schedule.is_open(at(1, 11)))
+        self.assertFalse(schedule.is_open(at(1, 11), holiday=True))
+        self.assertEqual(schedule.next_open(at(1, 11), holiday=True), at(1, 12))
+        # Terça não tem horário de feriado: segue o normal
+        self.assertTrue(schedule.is_open(at(2, 11), holiday=True))
+
+    def test_empty_schedule(self):
+        self.assertEqual(OpeningSchedule([]).status(at(1, 12)),
+                         {'is_open': False, 'closes_at': None, 'next_open_at': None})
+
+
+class OpeningHoursUpdateTest(IsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings = create_settings()
+        self.client = APIClient()
+
+    def patch(self, hours, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch('/api/settings/me/', {'opening_hours': hours, **data}, format='json')
+
+    def hours(self):
+        return {oh.day_of_week: oh for oh in self.settings.opening_hours.all()}
+
+    def test_parse_opening_hours(self):
+        self.assertEqual(parse_opening_hours(['[{"id": 3, "day_of_week": 1}]']),
+                         [{'day_of_week': 1, 'opening_time': '08:00', 'closing_time': '18:00'}])
+        self.assertEqual(parse_opening_hours({'day_of_week': 2, 'opening_time': '09:00'}),
+                         [{'day_of_week': 2, 'opening_time': '09:00', 'closing_time': '18:00'}])
+        for raw in ('{nope', [1, 2], 'null'):
+            with self.assertRaises(ValueError):
+                parse_opening_hours(raw)
+
+    def test_writes_only_the_difference(self):
+        response = self.patch([
+            {'day_of_week': 0, 'opening_time': '10:00', 'closing_time': '22:00'},
+            {'day_of_week': 1, 'opening_time': '10:00', 'closing_time': '22:00'},
+            {'day_of_week': 2, 'opening_time': '10:00', 'closing_time': '22:00'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['opening_hours']), 3)
+        before = self.hours()
+        stamp = versioning.get(versioning.model_stamp(OpeningHour))
+
+        response = self.patch([
+            {'day_of_week': 0, 'opening_time': '10:00', 'closing_time': '22:00'},
+            {'day_of_week': 1, 'opening_time': '18:00', 'closing_time': '02:00'},
+            {'day_of_week': 3, 'opening_time': '11:00', 'closing_time': '15:00'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        after = self.hours()
+        self.assertEqual(sorted(after), [0, 1, 3])
+        # Dias existentes mantêm o registro; o que saiu da grade é removido
+        self.assertEqual(after[0].pk, before[0].pk)
+        self.assertEqual(after[1].pk, before[1].pk)
+        self.assertEqual(after[1].closing_time, datetime.time(2, 0))
+        self.assertTrue(after[1].next_day_closing)
+        self.assertNotEqual(versioning.get(versioning.model_stamp(OpeningHour)), stamp)
+        # O cache das configurações enxerga a grade nova
+        self.assertEqual(sorted(oh.day_of_week for oh in get_settings().opening_hours.all()), [0, 1, 3])
+
+    def test_invalid_hours_save_nothing(self):
+        for hours in (
+            [{'day_of_week': 0}, {'day_of_week': 0}],
+            [{'day_of_week': 9}],
+            '{nope',
+        ):
+            response = self.patch(hours, business_name='Outro Nome')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('opening_hours', response.json())
+        self.settings.refresh_from_db()
+        self.assertEqual(self.settings.business_name, 'Restaurante')
+        self.assertEqual(self.hours(), {})
+
+
+class OpeningOverrideTest(IsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.settings = create_settings()
+        for day in range(7):
+            self.settings.opening_hours.create(day_of_week=day, opening_time=datetime.time(10, 0),
+                                               closing_time=datetime.time(22, 0))
+        self.client = APIClient()
+
+    def request(self, method, path, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)('/api/settings/overrides/' + path, data, format='json')
+
+    def test_serializer_recomputes_next_day_closing(self):
+        override = OpeningOverride.objects.create(
+            settings=self.settings, start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 1),
+            kind=OpeningOverride.KIND_CUSTOM, opening_time=datetime.time(18, 0),
+            closing_time=datetime.time(2, 0), next_day_closing=True,
+        )
+        serializer = OpeningOverrideSerializer(override, data={'opening_time': '10:00', 'closing_time': '14:00'},
+                                               partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertFalse(serializer.validated_data['next_day_closing'])
+
+        serializer = OpeningOverrideSerializer(override, data={'closing_time': '01:00'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertTrue(serializer.validated_data['next_day_closing'])
+
+        serializer = OpeningOverrideSerializer(override, data={'kind': 'closed'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertFalse(serializer.validated_data['next_day_closing'])
+
+    def test_validation(self):
+        serializer = OpeningOverrideSerializer(data={'start_date': '2024-01-02', 'end_date': '2024-01-01'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('end_date', serializer.errors)
+        serializer = OpeningOverrideSerializer(data={'start_date': '2024-01-02', 'kind': 'custom'})
+        self.assertFalse(serializer.is_valid())
+        serializer = OpeningOverrideSerializer(data={'start_date': '2024-01-02'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['end_date'], datetime.date(2024, 1, 2))
+
+    def test_patch_between_overnight_and_same_day(self):
+        today = timezone.localdate()
+        response = self.request('post', '', {
+            'start_date': today.isoformat(), 'kind': 'custom', 'opening_time': '18:00', 'closing_time': '02:00',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()['next_day_closing'])
+        path = '%d/' % response.json()['id']
+        midnight = timezone.make_aware(datetime.datetime.combine(today, datetime.time(23, 30)))
+        self.assertEqual(settings_cache.schedule().closes_at(midnight), midnight + datetime.timedelta(hours=2, minutes=30))
+
+        response = self.request('patch', path, {'opening_time': '10:00', 'closing_time': '14:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['next_day_closing'])
+        schedule = settings_cache.schedule()
+        self.assertFalse(schedule.is_open(midnight))
+        noon = midnight.replace(hour=12, minute=0)
+        self.assertEqual(schedule.closes_at(noon), noon.replace(hour=14))
+
+        response = self.request('patch', path, {'kind': 'closed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['next_day_closing'])
+        self.assertFalse(settings_cache.schedule().is_open(noon))
+
+    def test_closed_period_and_holiday(self):
+        self.settings.opening_hours.create(day_of_week=0, is_holiday=True, opening_time=datetime.time(12, 0),
+                                           closing_time=datetime.time(14, 0))
+        # 2024-01-01 (segunda) é feriado; 2024-01-02 e 03 fechado para reforma
+        OpeningOverride.objects.create(settings=self.settings, start_date=datetime.date(2024, 1, 1),
+                                       end_date=datetime.date(2024, 1, 1), kind=OpeningOverride.KIND_HOLIDAY)
+        OpeningOverride.objects.create(settings=self.settings, start_date=datetime.date(2024, 1, 2),
+                                       end_date=datetime.date(2024, 1, 3))
+        schedule = OpeningSchedule(self.settings.opening_hours.all(), OpeningOverride.objects.all())
+        self.assertFalse(schedule.is_open(at(1, 11)))
+        self.assertTrue(schedule.is_open(at(1, 13)))
+        self.assertEqual(schedule.status(at(2, 12)),
+                         {'is_open': False, 'closes_at': None, 'next_open_at': at(4, 10)})
+        self.assertTrue(schedule.is_open(at(4, 12)))
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import SettingsDetailView
+from .views import SettingsDetailView, OpeningOverrideListCreateView, OpeningOverrideDetailView
 
 urlpatterns = [
     path('me/', SettingsDetailView.as_view(), name='settings-detail'),
+    path('overrides/', OpeningOverrideListCreateView.as_view(), name='opening-override-list'),
+    path('overrides/<int:pk>/', OpeningOverrideDetailView.as_view(), name='opening-override-detail'),
 ] 
\ No newline at end of file
@@ -1,21 +1,31 @@
 from django.shortcuts import render
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import generics, status
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
-from .models import Settings, OpeningHour
-from .serializers import SettingsSerializer, OpeningHourSerializer
-import json
-from datetime import datetime
+from rest_framework.exceptions import ValidationError
+from .models import Settings, OpeningOverride
+from .serializers import SettingsSerializer, OpeningHourSerializer, OpeningOverrideSerializer, parse_opening_hours
+from .cache import get_settings, SETTINGS_STAMPS
+from app.conditional import ConditionalMixin
 
 # Create your views here.
 
-class SettingsDetailView(generics.RetrieveUpdateAPIView):
+class SettingsDetailView(ConditionalMixin, generics.RetrieveUpdateAPIView):
     """
     API para recuperar e atualizar as configurações do sistema.
     """
     serializer_class = SettingsSerializer
+    conditional_stamps = SETTINGS_STAMPS
 
     def get_object(self):
-        
+        # Leituras usam o cache; alterações sempre partem da instância do banco
+        if self.request.method in SAFE_METHODS:
+            cached = get_settings()
+            if cached is not None:
+                return cached
+
         obj, created = Settings.objects.get_or_create(
             defaults={
                 "business_name": "Meu Negócio",
@@ -41,58 +51,32 @@ class SettingsDetailView(generics.RetrieveUpdateAPIView):
             # Remove opening_hours dos dados se existir
             opening_hours_data = data.pop('opening_hours', None)
             
-            # Atualiza as configurações básicas
+            # Valida as configurações básicas
             serializer = self.get_serializer(instance, data=data, partial=True)
             serializer.is_valid(raise_exception=True)
-            self.perform_update(serializer)
 
-            # Atualiza os horários de funcionamento
+            # Valida a grade de horários inteira antes de gravar qualquer coisa
+            hours_serializer = None
             if opening_hours_data:
                 try:
-                    # Se vier como string (por multipart), faz o parse
-                    if isinstance(opening_hours_data, str):
-                        # Remove colchetes extras se existirem
-                        if opening_hours_data.startswith('[') and opening_hours_data.endswith(']'):
-                            opening_hours_data = opening_hours_data[1:-1]
-                        opening_hours_data = json.loads(opening_hours_data)
-                    
-                    # Se for uma lista com um único item string, faz parse novamente
-                    if isinstance(opening_hours_data, list) and len(opening_hours_data) == 1 and isinstance(opening_hours_data[0], str):
-                        opening_hours_data = json.loads(opening_hours_data[0])
-                    
-                    # Remove horários existentes
-                    instance.opening_hours.all().delete()
-                    
-                    # Cria novos horários
-                    for oh_data in opening_hours_data:
-                        # Garante que os dados estão no formato correto
-                        day_of_week = int(oh_data.get('day_of_week', 0))
-                        opening_time = str(oh_data.get('opening_time', '08:00'))
-                        closing_time = str(oh_data.get('closing_time', '18:00'))
-                        is_open = bool(oh_data.get('is_open', True))
-                        is_holiday = bool(oh_data.get('is_holiday', False))
-                        
-                        # Cria o horário de funcionamento
-                        opening_hour = OpeningHour.objects.create(
-                            settings=instance,
-                            day_of_week=day_of_week,
-                            opening_time=opening_time,
-                            closing_time=closing_time,
-                            is_open=is_open,
-                            is_holiday=is_holiday
-                        )
-                        
-                        # Chama o método clean para definir next_day_closing
-                        opening_hour.clean()
-                        opening_hour.save()
-
-                except Exception as e:
-                    print(f"Erro ao processar horários: {str(e)}")
-                    print(f"Dados recebidos: {opening_hours_data}")
+                    entries = parse_opening_hours(opening_hours_data)
+                except ValueError as e:
                     return Response(
                         {"opening_hours": str(e)},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+                hours_serializer = OpeningHourSerializer(data=entries, many=True)
+                if not hours_serializer.is_valid():
+                    return Response(
+                        {"opening_hours": hours_serializer.errors},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+            # Grava configurações e horários juntos: ou tudo, ou nada
+            with transaction.atomic():
+                self.perform_update(serializer)
+                if hours_serializer is not None:
+                    hours_serializer.update(instance, hours_serializer.validated_data)
 
             # Retorna os dados atualizados
             return Response(self.get_serializer(instance).data)
@@ -103,3 +87,30 @@ class SettingsDetailView(generics.RetrieveUpdateAPIView):
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+class OpeningOverrideListCreateView(ConditionalMixin, generics.ListCreateAPIView):
+    """
+    API para listar e cadastrar exceções de horário (feriados, fechamentos
+    e horários especiais). Use ?upcoming=true para listar só as futuras.
+    """
+    serializer_class = OpeningOverrideSerializer
+    queryset = OpeningOverride.objects.all()
+
+    def get_queryset(self):
+        queryset = OpeningOverride.objects.all()
+        if self.request.query_params.get('upcoming') == 'true':
+            queryset = queryset.filter(end_date__gte=timezone.localdate())
+        return queryset
+
+    def perform_create(self, serializer):
+        settings = Settings.objects.first()
+        if settings is None:
+            raise ValidationError({'error': 'Configurações não encontradas'})
+        serializer.save(settings=settings)
+
+class OpeningOverrideDetailView(ConditionalMixin, generics.RetrieveUpdateDestroyAPIView):
+    """
+    API para consultar, alterar e remover uma exceção de horário.
+    """
+    serializer_class = OpeningOverrideSerializer
+    queryset = OpeningOverride.objects.all()